@@ -105,10 +105,23 @@ def create_app(config_class=Config):
         # Create database tables
         db.create_all()
         
+        # Background queue for lab uploads, in the same instance database
+        from .utils.lab_jobs import init_lab_jobs
+        init_lab_jobs(app)
+
+        # Write-behind buffer for HHQ autosaves, flushed on an interval and at shutdown
+        from .utils.hhq_autosave import init_hhq_autosave
+        init_hhq_autosave(app)
+
+        # Worker processes for roadmap and HHQ PDFs, started by the first download
+        from .utils.pdf_rendering import init_pdf_rendering
+        init_pdf_rendering(app)
+        
         # Register CLI commands
-        from .commands import create_admin_command, recreate_db_command
+        from .commands import create_admin_command, recreate_db_command, export_roadmaps_command
         app.cli.add_command(create_admin_command)
         app.cli.add_command(recreate_db_command)
+        app.cli.add_command(export_roadmaps_command)
     
     # Exempt auth routes from CSRF (moved outside app context)
     csrf.exempt(auth.bp)
@@ -1,3 +1,4 @@
+import os
 import click
 from flask.cli import with_appcontext
 from .extensions import db
@@ -27,4 +28,48 @@ def recreate_db_command():
     """Recreate the database."""
     db.drop_all()
     db.create_all()
-    click.echo('Database recreated successfully!') 
\ No newline at end of file
+    click.echo('Database recreated successfully!') 
+
+
+@click.command('export-roadmaps')
+@click.argument('client_ids', nargs=-1)
+@click.option('--search', default=None, help='Export every client whose name or email matches (all clients if omitted).')
+@click.option('--output', 'output_dir', type=click.Path(file_okay=False), help='Write one PDF per client into this directory.')
+@click.option('--zip', 'zip_path', type=click.Path(dir_okay=False), help='Write all PDFs into this ZIP file.')
+@click.option('--workers', default=os.cpu_count() or 2, show_default=True, help='Rendering processes.')
+@with_appcontext
+def export_roadmaps_command(client_ids, search, output_dir, zip_path, workers):
+    """Render visual roadmap PDFs for many clients at once."""
+    from pdf_render_pool import PDFRenderPool
+    from .utils.cohort_export import CohortExport, cohort_client_ids
+
+    if bool(output_dir) == bool(zip_path):
+        raise click.UsageError('Give exactly one of --output or --zip.')
+
+    ids = cohort_client_ids(client_ids, search)
+    if not ids:
+        click.echo('No clients to export.')
+        return
+    click.echo(f'Exporting roadmaps for {len(ids)} clients with {workers} workers...')
+
+    def progress(stats):
+        click.echo(f"  {stats['done'] + stats['failed']}/{stats['total']} "
+                   f"({stats['failed']} failed, {stats['roadmaps_per_second']} roadmaps/sec)")
+
+    pool = PDFRenderPool(workers=workers, max_pending=workers * 2)
+    try:
+        export = CohortExport(ids, pool, progress=progress)
+        if output_dir:
+            export.write_directory(output_dir)
+        else:
+            with open(zip_path, 'wb') as zip_file:
+                for chunk in export.stream_zip():
+                    zip_file.write(chunk)
+    finally:
+        pool.shutdown()
+
+    stats = export.stats()
+    click.echo(f"Exported {stats['done']} roadmaps in {stats['seconds']}s "
+               f"({stats['roadmaps_per_second']} roadmaps/sec), {stats['failed']} failed.")
+    for client_id, error in export.failed.items():
+        click.echo(f'  {client_id}: {error}')
@@ -11,7 +11,7 @@ from werkzeug.utils import secure_filename
 from PIL import Image
 import mimetypes
 
-from ..utils.supabase_client import get_supabase_client
+from ..utils.supabase_client import get_supabase_client, return_supabase_client
 
 client_images_bp = Blueprint('client_images', __name__)
 
@@ -120,7 +120,10 @@ def upload_client_image(client_id):
             'created_at': datetime.utcnow().isoformat()
         }
         
-        result = supabase.table('client_images').insert(image_data).execute()
+        try:
+            result = supabase.table('client_images').insert(image_data).execute()
+        finally:
+            return_supabase_client(supabase)
         
         if result.data:
             flash(f'Image "{original_filename}" uploaded successfully', 'success')
@@ -142,7 +145,10 @@ def get_client_images(client_id):
     """Get all images for a specific client"""
     try:
         supabase = get_supabase_client()
-        result = supabase.table('client_images').select('*').eq('client_id', client_id).eq('is_active', True).order('display_order', desc=False).execute()
+        try:
+            result = supabase.table('client_images').select('*').eq('client_id', client_id).eq('is_active', True).order('display_order', desc=False).execute()
+        finally:
+            return_supabase_client(supabase)
         
         return jsonify({
             'success': True,
@@ -158,18 +164,20 @@ def delete_client_image(client_id, image_id):
     """Delete a client image"""
     try:
         supabase = get_supabase_client()
-        
-        # Get image info first
-        result = supabase.table('client_images').select('*').eq('id', image_id).eq('client_id', client_id).execute()
-        
-        if not result.data:
-            flash('Image not found', 'error')
-            return redirect(url_for('clients.view_client', client_id=client_id))
-        
-        image_info = result.data[0]
-        
-        # Delete from database
-        supabase.table('client_images').update({'is_active': False}).eq('id', image_id).execute()
+        try:
+            # Get image info first
+            result = supabase.table('client_images').select('*').eq('id', image_id).eq('client_id', client_id).execute()
+            
+            if not result.data:
+                flash('Image not found', 'error')
+                return redirect(url_for('clients.view_client', client_id=client_id))
+            
+            image_info = result.data[0]
+            
+            # Delete from database
+            supabase.table('client_images').update({'is_active': False}).eq('id', image_id).execute()
+        finally:
+            return_supabase_client(supabase)
         
         # Optionally delete physical file
         file_path = os.path.join(current_app.root_path, '..', image_info['file_path'])
@@ -1,8 +1,8 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_required, current_user
 from datetime import datetime
-from ..utils.supabase_client import fetch_clients, create_client, update_client, delete_client, fetch_hhq_responses_for_client, fetch_client_by_id, fetch_health_history_questions, save_lab_results, fetch_lab_results_for_client
-from ..utils.lab_extractor import process_pdf
+from ..utils.supabase_client import fetch_clients_page, CLIENT_PAGE_SIZE, create_client, update_client, delete_client, fetch_hhq_responses_for_client, fetch_client_by_id, fetch_health_history_questions, fetch_lab_results_for_client
+from ..utils.lab_jobs import submit_lab_upload, get_lab_job
 import json
 import pytz
 import os
@@ -22,22 +22,32 @@ def format_mt(dt_str):
 def index():
     try:
         search_query = request.form.get('search', '') if request.method == 'POST' else request.args.get('search', '')
-        print("Attempting to fetch clients...")
-        all_clients = fetch_clients()
-        print(f"Successfully fetched {len(all_clients)} clients")
-        
-        if search_query:
-            clients = [c for c in all_clients if search_query.lower() in (
-                f"{c.get('first_name', '')} {c.get('last_name', '')} {c.get('email', '')}".lower())]
-        else:
-            clients = all_clients
-            
-        return render_template('clients/index.html', clients=clients, search_query=search_query)
+        # One page at a time, searched on the server
+        page = fetch_clients_page(search=search_query, after=request.args.get('after'))
+        return render_template('clients/index.html', clients=page['clients'], search_query=search_query,
+                               next_cursor=page['next_cursor'], paged=bool(request.args.get('after')))
     except Exception as e:
         print(f"Error in clients index route: {str(e)}")
         flash(f"Error loading clients: {str(e)}", 'danger')
         return render_template('clients/index.html', clients=[], search_query=search_query)
 
+@bp.route('/page')
+@login_required
+def page():
+    """
+    JSON page of the client list.
+    ?search= filters by name or email, ?after= is the previous page's next_cursor,
+    ?limit= sets the page size and ?fields= a comma-separated column projection.
+    """
+    fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()]
+    try:
+        limit = int(request.args.get('limit', CLIENT_PAGE_SIZE))
+    except ValueError:
+        return jsonify({'error': 'limit must be a number'}), 400
+    kwargs = {'columns': fields} if fields else {}
+    return jsonify(fetch_clients_page(search=request.args.get('search'), after=request.args.get('after'),
+                                      limit=limit, **kwargs))
+
 @bp.route('/new', methods=['GET', 'POST'])
 @login_required
 def new():
@@ -93,8 +103,7 @@ def view(id):
 @bp.route('/<id>/edit', methods=['GET', 'POST'])
 @login_required
 def edit(id):
-    clients = fetch_clients()
-    client = next((c for c in clients if str(c['id']) == str(id)), None)
+    client = fetch_client_by_id(id)
     if not client:
         flash('Client not found', 'danger')
         return redirect(url_for('clients.index'))
@@ -181,6 +190,15 @@ def upload_lab(client_id):
         flash('Please upload a PDF file', 'error')
         return redirect(url_for('clients.view', id=client_id))
 
+    # Optional collection date of the draw; the stored lab panel is keyed by it
+    collected_on = request.form.get('collected_on') or None
+    if collected_on:
+        try:
+            collected_on = datetime.strptime(collected_on, '%Y-%m-%d').date().isoformat()
+        except ValueError:
+            flash('Invalid collection date', 'error')
+            return redirect(url_for('clients.view', id=client_id))
+
     try:
         # Create uploads directory if it doesn't exist
         upload_dir = 'uploads'
@@ -193,22 +211,16 @@ def upload_lab(client_id):
         file_path = os.path.join(upload_dir, safe_filename)
         file.save(file_path)
         
-        # Process the PDF and extract lab results
-        print(f"Processing PDF file: {file_path}")
-        extracted_results = process_pdf(file_path)
-        
-        if not extracted_results:
-            flash('No lab results could be extracted from this PDF. Please verify it\'s a LabCorp report.', 'warning')
-            return redirect(url_for('clients.view', id=client_id))
+        # Extraction, mapping and the Supabase insert run in the background job queue
+        print(f"Queueing PDF file: {file_path}")
+        job_id = submit_lab_upload(client_id, file_path, collected_on=collected_on)
+        status_url = url_for('clients.lab_job_status', client_id=client_id, job_id=job_id)
         
-        # Save results to Supabase
-        save_lab_results(client_id, extracted_results)
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify({'job_id': job_id, 'status': 'queued', 'status_url': status_url}), 202
         
-        # Clean up the uploaded file
-        os.remove(file_path)
-        
-        flash(f'Lab results uploaded successfully! Extracted {len(extracted_results)} test results.', 'success')
-        return redirect(url_for('clients.view', id=client_id))
+        flash('Lab results uploaded. Extracting test results in the background...', 'info')
+        return redirect(url_for('clients.view', id=client_id, lab_job=job_id))
         
     except Exception as e:
         print(f"Error uploading lab results: {str(e)}")
@@ -218,12 +230,31 @@ def upload_lab(client_id):
         flash(f'Error processing lab results: {str(e)}', 'error')
         return redirect(url_for('clients.view', id=client_id))
 
+@bp.route('/<client_id>/lab_jobs/<job_id>')
+@login_required
+def lab_job_status(client_id, job_id):
+    """Status of a background lab upload, for polling."""
+    job = get_lab_job(job_id)
+    if not job or job['payload'].get('client_id') != str(client_id):
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify({
+        'job_id': job['id'],
+        'status': job['status'],
+        'stage': job['stage'],
+        'attempts': job['attempts'],
+        'max_attempts': job['max_attempts'],
+        'result': job['result'],
+        'error': job['error'],
+        'timings': job['timings'],
+        'created_at': job['created_at'],
+        'updated_at': job['updated_at'],
+    })
+
 @bp.route('/<id>/lab-results')
 @login_required
 def view_all_lab_results(id):
     """View all lab results for a client in detail."""
-    clients = fetch_clients()
-    client = next((c for c in clients if str(c['id']) == str(id)), None)
+    client = fetch_client_by_id(id)
     if not client:
         flash('Client not found', 'danger')
         return redirect(url_for('clients.index'))
@@ -22,8 +22,11 @@ from app.utils.supabase_client import (
     fetch_hhq_responses_dict,
     fetch_hhq_responses_dict_for_attempt,
     create_hhq_attempt,
-    upsert_hhq_answers_partial
+    upsert_hhq_answers_partial,
+    fetch_hhq_variable_index
 )
+from app.utils.hhq_autosave import buffer_autosave, flush_autosave
+from app.utils.hhq_layout import hhq_layout_index
 
 bp = Blueprint('hhq', __name__, url_prefix='/hhq')
 
@@ -174,66 +177,17 @@ def hhq_form(client_id):
     form = HHQForm()
     print(f"DEBUG: form data after instantiation: {[ (f, getattr(form, f).data) for f in form._fields ]}")
     
-    # Get all questions and organize by section
-    questions = fetch_health_history_questions()
-    if not questions:
+    # Sections for the client's sex, built once per question catalog version
+    layout = hhq_layout_index.get(client.get('sex'))
+    if not layout:
         flash('Unable to load questionnaire questions. Please try again later.', 'error')
         return redirect(url_for('main.index'))
-
-    # Group questions by section - keep section as text, map to numeric index
-    sections = {}
-    section_names = []
-    for question in questions:
-        section_name = question.get('section', 'Unknown')
-        if section_name not in sections:
-            sections[section_name] = []
-            section_names.append(section_name)
-        sections[section_name].append(question)
-    
-    # Filter out gender-specific sections based on client's sex
-    client_sex = client.get('sex', '').lower()
-    print(f"DEBUG: Client sex: {client_sex}")
-    print(f"DEBUG: Available sections before filtering: {section_names}")
-    
-    if client_sex == 'male':
-        # Remove Female Hormone Health section
-        female_section = 'Female Hormone Health'
-        if female_section in sections:
-            del sections[female_section]
-            if female_section in section_names:
-                section_names.remove(female_section)
-                print(f"DEBUG: Removed female section for male client")
-    elif client_sex == 'female':
-        # Remove Male Hormone Health History section
-        male_section = 'Male Hormone Health History'
-        if male_section in sections:
-            del sections[male_section]
-            if male_section in section_names:
-                section_names.remove(male_section)
-                print(f"DEBUG: Removed male section for female client")
-    else:
-        print(f"DEBUG: Unknown client sex: {client_sex}, not filtering sections")
-    
-    print(f"DEBUG: Available sections after filtering: {section_names}")
-    
-    # Sort sections by the order they appear and questions within sections
-    for section_name in sections:
-        sections[section_name].sort(key=lambda q: int(q.get('question_order', 0)))
     
     # Determine current step/section from request
-    current_step = int(request.form.get('step', request.args.get('step', 0)))
-    if current_step < 0:
-        current_step = 0
-    elif current_step >= len(section_names):
-        current_step = len(section_names) - 1
-    
-    current_section_name = section_names[current_step]
-    current_section_questions = sections[current_section_name]
-    # Get the field names that correspond to this section's questions - convert to form field names
-    current_section_fields = [q['variable_name'].replace('-', '_') for q in current_section_questions]
-    
-    # Get section title - use the section name directly or fall back to generic title
-    current_section_title = current_section_name if current_section_name != 'Unknown' else f"Section {current_step + 1}"
+    current_step, current_section = layout.step(int(request.form.get('step', request.args.get('step', 0))))
+    current_section_questions = current_section.questions
+    current_section_fields = current_section.field_names
+    current_section_title = current_section.title
     
     # Get attempt_id from request
     attempt_id = request.args.get('attempt_id') or request.form.get('attempt_id')
@@ -241,6 +195,10 @@ def hhq_form(client_id):
         flash('Invalid HHQ link: missing attempt ID.', 'error')
         return redirect(url_for('main.index'))
 
+    # Buffered autosaves are written before the form is prefilled, navigated or submitted
+    if request.headers.get('X-Requested-With') != 'XMLHttpRequest':
+        flush_autosave(client_id, attempt_id)
+
     # Always prefill from saved responses for this attempt
     saved_answers = fetch_hhq_responses_dict_for_attempt(client_id, attempt_id)
     print(f"DEBUG: fetched saved_answers for attempt: {saved_answers}")
@@ -297,7 +255,7 @@ def hhq_form(client_id):
             # Don't save FALSE values during navigation to avoid overwriting previous TRUE values
             for question in current_section_questions:
                 db_field_name = question['variable_name']
-                form_field_name = form.get_form_field_name(db_field_name)
+                form_field_name = layout.form_fields[db_field_name]
                 if hasattr(form, form_field_name):
                     value = getattr(form, form_field_name).data
                     # Only save TRUE values during navigation
@@ -307,7 +265,7 @@ def hhq_form(client_id):
             # For auto-save, also only save TRUE values from current section to avoid overwrites
             for question in current_section_questions:
                 db_field_name = question['variable_name']
-                form_field_name = form.get_form_field_name(db_field_name)
+                form_field_name = layout.form_fields[db_field_name]
                 if hasattr(form, form_field_name):
                     value = getattr(form, form_field_name).data
                     # Only save TRUE values during auto-save too
@@ -318,11 +276,13 @@ def hhq_form(client_id):
         if answers:
             print(f"DEBUG: answers to upsert: {answers}")
             try:
-                # Use a new function that only updates True values without overwriting False ones
-                upsert_hhq_answers_partial(client_id, answers, attempt_id)
-                
                 if is_auto_save:
+                    # Merged with earlier autosaves and written in bulk by the autosave buffer
+                    buffer_autosave(client_id, attempt_id, answers)
                     return jsonify({'success': True})
+
+                # Use a new function that only updates True values without overwriting False ones
+                upsert_hhq_answers_partial(client_id, answers, attempt_id, previous=saved_answers)
                     
             except Exception as e:
                 error_msg = f"Error saving HHQ responses: {str(e)}"
@@ -334,7 +294,7 @@ def hhq_form(client_id):
 
         # Handle navigation for non-auto-save requests
         if not is_auto_save:
-            if form.next_step.data and current_step < len(section_names) - 1:
+            if form.next_step.data and current_step < len(layout) - 1:
                 return redirect(url_for('hhq.hhq_form', client_id=client_id, attempt_id=attempt_id, step=current_step + 1))
             elif form.prev_step.data and current_step > 0:
                 return redirect(url_for('hhq.hhq_form', client_id=client_id, attempt_id=attempt_id, step=current_step - 1))
@@ -343,7 +303,7 @@ def hhq_form(client_id):
                 return redirect(url_for('hhq.save_exit', client_id=client_id, attempt_id=attempt_id))
             else:
                 # Submit form or continue
-                if current_step < len(section_names) - 1:
+                if current_step < len(layout) - 1:
                     return redirect(url_for('hhq.hhq_form', client_id=client_id, attempt_id=attempt_id, step=current_step + 1))
                 else:
                     # Form completed - save complete record with all answers
@@ -353,13 +313,9 @@ def hhq_form(client_id):
                     debug_false_count = 0
                     
                     # Only process questions from sections that were shown to the client
-                    filtered_questions = []
-                    for section_name in section_names:  # section_names is already filtered by gender
-                        filtered_questions.extend(sections[section_name])
-                    
-                    for question in filtered_questions:  # Use filtered questions, not all questions
+                    for question in layout.questions:  # Already filtered by gender
                         db_field_name = question['variable_name']
-                        form_field_name = form.get_form_field_name(db_field_name)
+                        form_field_name = layout.form_fields[db_field_name]
                         if hasattr(form, form_field_name):
                             value = getattr(form, form_field_name).data
                             bool_value = bool(value)
@@ -375,7 +331,7 @@ def hhq_form(client_id):
                     
                     try:
                         # Use the original function for complete save
-                        upsert_individual_hhq_answers(client_id, complete_answers, attempt_id)
+                        upsert_individual_hhq_answers(client_id, complete_answers, attempt_id, previous=saved_answers)
                         flash('Health History Questionnaire completed successfully!', 'success')
                         return redirect(url_for('hhq.complete', client_id=client_id))
                     except Exception as e:
@@ -387,10 +343,49 @@ def hhq_form(client_id):
     return render_template('hhq/form.html', 
                          form=form,
                          current_step=current_step,
-                         total_sections=len(section_names),
+                         total_sections=len(layout),
                          current_section=current_section_title,
                          current_section_fields=current_section_fields,
-                         attempt_id=attempt_id)
+                         attempt_id=attempt_id,
+                         autosave_url=url_for('hhq.autosave', client_id=client_id))
+
+@bp.route('/<client_id>/autosave', methods=['POST'])
+def autosave(client_id):
+    """
+    Save changed answers without building the form.
+    Expects JSON {"attempt_id": ..., "answers": {variable_name: value}} holding only what changed.
+    """
+    payload = request.get_json(silent=True) or {}
+    attempt_id = payload.get('attempt_id')
+    answers = payload.get('answers')
+    if not attempt_id or not isinstance(answers, dict):
+        return jsonify({'success': False, 'error': 'attempt_id and answers are required'}), 400
+    try:
+        uuid.UUID(str(attempt_id))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid attempt ID'}), 400
+
+    known_variables = fetch_hhq_variable_index()
+    if not known_variables:
+        return jsonify({'success': False, 'error': 'Unable to load questionnaire questions'}), 503
+
+    changed, rejected = {}, []
+    for name, value in answers.items():
+        variable_name = known_variables.get(name)
+        if variable_name is None or not isinstance(value, (bool, str)):
+            rejected.append(name)
+        else:
+            changed[variable_name] = value
+    if rejected:
+        return jsonify({'success': False, 'error': 'Unknown questions or invalid answers', 'rejected': sorted(rejected)}), 400
+
+    try:
+        saved = buffer_autosave(client_id, attempt_id, changed)
+    except Exception as e:
+        error_msg = f"Error saving HHQ responses: {str(e)}"
+        print(error_msg)
+        return jsonify({'success': False, 'error': error_msg}), 500
+    return jsonify({'success': True, 'saved': saved})
 
 @bp.route('/<client_id>/complete')
 def complete(client_id):
@@ -429,21 +424,19 @@ def download_hhq(token):
         else:
             hhq_response['client'] = {}
 
-    # Generate PDF
-    from app.utils.pdf_generator import generate_hhq_pdf
-    import tempfile
-    import os
-
-    with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp:
-        pdf_path = generate_hhq_pdf(hhq_response, tmp.name)
+    # Generate PDF in the rendering pool, in memory
+    from app.utils.pdf_rendering import busy_response, render_hhq_pdf
+    from pdf_render_pool import RenderPoolSaturated
+    import io
 
     try:
-        client_last_name = hhq_response.get('client', {}).get('last_name', 'client')
-        filename = f"HHQ_{client_last_name}_{token}.pdf"
-        return send_file(pdf_path, as_attachment=True, download_name=filename)
-    finally:
-        if os.path.exists(pdf_path):
-            os.remove(pdf_path)
+        pdf_bytes = render_hhq_pdf(hhq_response)
+    except RenderPoolSaturated as e:
+        return busy_response(e)
+
+    client_last_name = hhq_response.get('client', {}).get('last_name', 'client')
+    filename = f"HHQ_{client_last_name}_{token}.pdf"
+    return send_file(io.BytesIO(pdf_bytes), as_attachment=True, download_name=filename, mimetype='application/pdf')
 
 @bp.route('/<client_id>/save_exit')
 def save_exit(client_id):
@@ -656,66 +649,17 @@ def client_hhq_form(client_id):
     form = HHQForm()
     print(f"DEBUG: form data after instantiation: {[ (f, getattr(form, f).data) for f in form._fields ]}")
     
-    # Get all questions and organize by section
-    questions = fetch_health_history_questions()
-    if not questions:
+    # Sections for the client's sex, built once per question catalog version
+    layout = hhq_layout_index.get(client.get('sex'))
+    if not layout:
         flash('Unable to load questionnaire questions. Please try again later.', 'error')
         return redirect(url_for('main.index'))
-
-    # Group questions by section - keep section as text, map to numeric index
-    sections = {}
-    section_names = []
-    for question in questions:
-        section_name = question.get('section', 'Unknown')
-        if section_name not in sections:
-            sections[section_name] = []
-            section_names.append(section_name)
-        sections[section_name].append(question)
-    
-    # Filter out gender-specific sections based on client's sex
-    client_sex = client.get('sex', '').lower()
-    print(f"DEBUG: Client sex: {client_sex}")
-    print(f"DEBUG: Available sections before filtering: {section_names}")
-    
-    if client_sex == 'male':
-        # Remove Female Hormone Health section
-        female_section = 'Female Hormone Health'
-        if female_section in sections:
-            del sections[female_section]
-            if female_section in section_names:
-                section_names.remove(female_section)
-                print(f"DEBUG: Removed female section for male client")
-    elif client_sex == 'female':
-        # Remove Male Hormone Health History section
-        male_section = 'Male Hormone Health History'
-        if male_section in sections:
-            del sections[male_section]
-            if male_section in section_names:
-                section_names.remove(male_section)
-                print(f"DEBUG: Removed male section for female client")
-    else:
-        print(f"DEBUG: Unknown client sex: {client_sex}, not filtering sections")
-    
-    print(f"DEBUG: Available sections after filtering: {section_names}")
-    
-    # Sort sections by the order they appear and questions within sections
-    for section_name in sections:
-        sections[section_name].sort(key=lambda q: int(q.get('question_order', 0)))
     
     # Determine current step/section from request
-    current_step = int(request.form.get('step', request.args.get('step', 0)))
-    if current_step < 0:
-        current_step = 0
-    elif current_step >= len(section_names):
-        current_step = len(section_names) - 1
-    
-    current_section_name = section_names[current_step]
-    current_section_questions = sections[current_section_name]
-    # Get the field names that correspond to this section's questions - convert to form field names
-    current_section_fields = [q['variable_name'].replace('-', '_') for q in current_section_questions]
-    
-    # Get section title - use the section name directly or fall back to generic title
-    current_section_title = current_section_name if current_section_name != 'Unknown' else f"Section {current_step + 1}"
+    current_step, current_section = layout.step(int(request.form.get('step', request.args.get('step', 0))))
+    current_section_questions = current_section.questions
+    current_section_fields = current_section.field_names
+    current_section_title = current_section.title
     
     # Get attempt_id from request
     attempt_id = request.args.get('attempt_id') or request.form.get('attempt_id')
@@ -723,6 +667,10 @@ def client_hhq_form(client_id):
         flash('Invalid HHQ link: missing attempt ID.', 'error')
         return redirect(url_for('main.index'))
 
+    # Buffered autosaves are written before the form is prefilled, navigated or submitted
+    if request.headers.get('X-Requested-With') != 'XMLHttpRequest':
+        flush_autosave(client_id, attempt_id)
+
     # Always prefill from saved responses for this attempt
     saved_answers = fetch_hhq_responses_dict_for_attempt(client_id, attempt_id)
     print(f"DEBUG: fetched saved_answers for attempt: {saved_answers}")
@@ -779,7 +727,7 @@ def client_hhq_form(client_id):
             # Don't save FALSE values during navigation to avoid overwriting previous TRUE values
             for question in current_section_questions:
                 db_field_name = question['variable_name']
-                form_field_name = form.get_form_field_name(db_field_name)
+                form_field_name = layout.form_fields[db_field_name]
                 if hasattr(form, form_field_name):
                     value = getattr(form, form_field_name).data
                     # Only save TRUE values during navigation
@@ -789,7 +737,7 @@ def client_hhq_form(client_id):
             # For auto-save, also only save TRUE values from current section to avoid overwrites
             for question in current_section_questions:
                 db_field_name = question['variable_name']
-                form_field_name = form.get_form_field_name(db_field_name)
+                form_field_name = layout.form_fields[db_field_name]
                 if hasattr(form, form_field_name):
                     value = getattr(form, form_field_name).data
                     # Only save TRUE values during auto-save too
@@ -800,11 +748,13 @@ def client_hhq_form(client_id):
         if answers:
             print(f"DEBUG: answers to upsert: {answers}")
             try:
-                # Use a new function that only updates True values without overwriting False ones
-                upsert_hhq_answers_partial(client_id, answers, attempt_id)
-                
                 if is_auto_save:
+                    # Merged with earlier autosaves and written in bulk by the autosave buffer
+                    buffer_autosave(client_id, attempt_id, answers)
                     return jsonify({'success': True})
+
+                # Use a new function that only updates True values without overwriting False ones
+                upsert_hhq_answers_partial(client_id, answers, attempt_id, previous=saved_answers)
                     
             except Exception as e:
                 error_msg = f"Error saving HHQ responses: {str(e)}"
@@ -816,7 +766,7 @@ def client_hhq_form(client_id):
 
         # Handle navigation for non-auto-save requests
         if not is_auto_save:
-            if form.next_step.data and current_step < len(section_names) - 1:
+            if form.next_step.data and current_step < len(layout) - 1:
                 return redirect(url_for('hhq.client_hhq_form', client_id=client_id, attempt_id=attempt_id, step=current_step + 1))
             elif form.prev_step.data and current_step > 0:
                 return redirect(url_for('hhq.client_hhq_form', client_id=client_id, attempt_id=attempt_id, step=current_step - 1))
@@ -825,7 +775,7 @@ def client_hhq_form(client_id):
                 return redirect(url_for('hhq.save_exit', client_id=client_id, attempt_id=attempt_id))
             else:
                 # Submit form or continue
-                if current_step < len(section_names) - 1:
+                if current_step < len(layout) - 1:
                     return redirect(url_for('hhq.client_hhq_form', client_id=client_id, attempt_id=attempt_id, step=current_step + 1))
                 else:
                     # Form completed - save complete record with all answers
@@ -835,13 +785,9 @@ def client_hhq_form(client_id):
                     debug_false_count = 0
                     
                     # Only process questions from sections that were shown to the client
-                    filtered_questions = []
-                    for section_name in section_names:  # section_names is already filtered by gender
-                        filtered_questions.extend(sections[section_name])
-                    
-                    for question in filtered_questions:  # Use filtered questions, not all questions
+                    for question in layout.questions:  # Already filtered by gender
                         db_field_name = question['variable_name']
-                        form_field_name = form.get_form_field_name(db_field_name)
+                        form_field_name = layout.form_fields[db_field_name]
                         if hasattr(form, form_field_name):
                             value = getattr(form, form_field_name).data
                             bool_value = bool(value)
@@ -857,7 +803,7 @@ def client_hhq_form(client_id):
                     
                     try:
                         # Use the original function for complete save
-                        upsert_individual_hhq_answers(client_id, complete_answers, attempt_id)
+                        upsert_individual_hhq_answers(client_id, complete_answers, attempt_id, previous=saved_answers)
                         flash('Health History Questionnaire completed successfully!', 'success')
                         return redirect(url_for('hhq.client_complete', client_id=client_id))
                     except Exception as e:
@@ -869,7 +815,8 @@ def client_hhq_form(client_id):
     return render_template('hhq/client_form.html', 
                          form=form,
                          current_step=current_step,
-                         total_sections=len(section_names),
+                         total_sections=len(layout),
                          current_section=current_section_title,
                          current_section_fields=current_section_fields,
-                         attempt_id=attempt_id)
\ No newline at end of file
+                         attempt_id=attempt_id,
+                         autosave_url=url_for('hhq.autosave', client_id=client_id))
\ No newline at end of file
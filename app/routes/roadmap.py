@@ -1,8 +1,15 @@
-from flask import Blueprint, flash, redirect, url_for, render_template, request, make_response, current_app, send_file
+from flask import Blueprint, flash, redirect, url_for, render_template, request, make_response, current_app, send_file, Response, stream_with_context
 from flask_login import login_required, current_user
 from app.models import Client, LabResult, HHQResponse, db
-from app.utils.supabase_client import fetch_client_by_id, fetch_lab_results_for_client, fetch_hhq_responses_dict, get_supabase_client
+from app.utils.supabase_client import supabase_pool
+from app.utils.roadmap_data import roadmap_data_loader
 from roadmap_generator import RoadmapGenerator
+from roadmap_template import template_registry
+from roadmap_cache import roadmap_cache
+from pdf_render_pool import RenderPoolSaturated
+from app.utils import pdf_rendering
+from app.utils.pdf_rendering import busy_response, pdf_render_stats, render_roadmap_pdf
+from app.utils.cohort_export import CohortExport, cohort_client_ids
 from datetime import datetime, timedelta
 import json
 import os
@@ -19,20 +26,22 @@ bp = Blueprint('roadmap', __name__, url_prefix='/roadmap')
 def generate(client_id):
     """Generate and display roadmap for a client."""
     try:
-        # Fetch client data
-        client = fetch_client_by_id(client_id)
+        # Fetch client, lab and HHQ data concurrently
+        data = roadmap_data_loader.load(client_id)
+        client = data.client
         if not client:
             flash('Client not found.', 'error')
             return redirect(url_for('clients.view', id=client_id))
         
         # Check if all required data is present
-        lab_results = fetch_lab_results_for_client(client_id)
-        hhq_responses = fetch_hhq_responses_dict(client_id)
+        labs = data.labs
+        hhq_responses = data.hhq_responses
         
-        current_app.logger.info(f"Lab results count: {len(lab_results) if lab_results else 0}")
+        current_app.logger.info(f"Lab results count: {len(labs)}")
         current_app.logger.info(f"HHQ responses count: {len(hhq_responses) if hhq_responses else 0}")
+        current_app.logger.info(f"Roadmap data fetch timings: {data.timings}")
         
-        if not lab_results:
+        if not labs:
             flash('Lab results are required to generate a roadmap. Please upload lab results first.', 'warning')
             return redirect(url_for('clients.view', id=client_id))
         
@@ -41,102 +50,8 @@ def generate(client_id):
         #     flash('HHQ responses are required to generate a roadmap. Please complete the HHQ first.', 'warning')
         #     return redirect(url_for('clients.view', id=client_id))
         
-        # Set empty HHQ responses if None
-        if not hhq_responses:
-            hhq_responses = {}
-        
-        # Prepare client data for roadmap generator
-        client_data = {
-            'name': f"{client.get('first_name', '')} {client.get('last_name', '')}".strip(),
-            'gender': client.get('sex', ''),
-            'dob': client.get('date_of_birth'),
-            'labs_date': datetime.now().strftime('%B %d, %Y')  # Default to today if not specified
-        }
-        
-        # Convert lab results to expected format (armgasys variable names)
-        lab_data = {}
-        if lab_results:
-            for result in lab_results:
-                # Prefer the already-mapped Armgasys variable from Supabase
-                armgasys_var = result.get('armgasys_variable', '')
-                value = result.get('value', '')
-
-                # Convert string values to float where possible, but keep genetics strings
-                try:
-                    numeric_value = float(value) if value and str(value).replace('.', '').replace('-', '').isdigit() else value
-                except (ValueError, TypeError):
-                    numeric_value = value
-
-                if armgasys_var:
-                    lab_data[armgasys_var.upper()] = numeric_value
-                    continue  # Skip manual mapping if we used the pre-mapped variable
-
-                # Fallback: Map common lab names to Armgasys variables if armgasys_variable missing
-                lab_name = result.get('test_name', '')
-                lab_mapping = {
-                    'WBC': 'CBC_WBC',
-                    'RBC': 'CBC_RBC',
-                    'Hemoglobin': 'CBC_HGB',
-                    'Hematocrit': 'CBC_HCT',
-                    'MCV': 'CBC_MCV',
-                    'Platelets': 'CBC_PLT',
-                    'Neutrophils (Absolute)': 'CBC_NEUT_ABS',
-                    'Lymphs (Absolute)': 'CBC_LYMPH_ABS',
-                    'Glucose': 'CHEM_GLU',
-                    'BUN': 'CHEM_BUN',
-                    'Creatinine': 'CHEM_CREAT',
-                    'eGFR': 'CHEM_EGFR',
-                    'Sodium': 'CHEM_NA',
-                    'Potassium': 'CHEM_K',
-                    'Chloride': 'CHEM_CL',
-                    'Calcium': 'CHEM_CA',
-                    'Albumin': 'LFT_ALB',
-                    'ALT (SGPT)': 'LFT_ALT',
-                    'AST (SGOT)': 'LFT_AST',
-                    'Alkaline Phosphatase': 'LFT_ALKP',
-                    'Bilirubin, Total': 'LFT_TBILI',
-                    'Cholesterol, Total': 'LIPID_CHOL',
-                    'Triglycerides': 'LIPID_TRIG',
-                    'HDL Cholesterol': 'LIPID_HDL',
-                    'LDL Chol Calc (NIH)': 'LIPID_LDL',
-                    'Free Testosterone': 'MHt_TEST_FREE',
-                    'Testosterone, Total, LC/MS': 'MHt_TEST_TOT',
-                    'Prostate Specific Ag': 'MHt_PSA',
-                    'TSH': 'THY_TSH',
-                    'Triiodothyronine (T3), Free': 'THY_T3F',
-                    'T4, Free (Direct)': 'THY_T4F',
-                    'Thyroglobulin Antibody': 'THY_TGAB',
-                    'Pregnenolone, MS': 'NEURO_PREG',
-                    'DHEA-Sulfate': 'NEURO_DHEAS',
-                    'Vitamin D, 25-Hydroxy': 'VIT_D25',
-                    'Vitamin B12': 'VIT_B12',
-                    'Vitamin E (Alpha Tocopherol)': 'VIT_E',
-                    'Zinc, Plasma or Serum': 'MIN_ZN',
-                    'Copper, Serum or Plasma': 'MIN_CU',
-                    'Selenium, Serum/Plasma': 'MIN_SE',
-                    'Magnesium, RBC': 'MIN_MG_RBC',
-                    'C-Reactive Protein, Cardiac': 'INFLAM_CRP',
-                    'Uric Acid': 'INFLAM_URIC',
-                    'Homocyst(e)ine': 'INFLAM_HOMOCYS',
-                    'Insulin': 'METAB_INS',
-                    'Hemoglobin A1c': 'METAB_HBA1C',
-                    'Total Glutathione': 'METAB_GLUT',
-                    'OmegaCheck(TM)': 'OMEGA_CHECK',
-                    'Omega-6/Omega-3 Ratio': 'OMEGA_6_3_RATIO',
-                    'Omega-3 total': 'OMEGA_3_TOT',
-                    'Omega-6 total': 'OMEGA_6_TOT',
-                    'Arachidonic Acid': 'OMEGA_AA',
-                    'Arachidonic Acid/EPA Ratio': 'OMEGA_AA_EPA',
-                    'APO E Genot E2/E4': 'APO1',  # Fall back mapping for specific test name variant
-                    'APO E Genotyping Result': 'APO1',
-                    'MTHFR C677T': 'MTHFR_1',
-                    'MTHFR A1298C': 'MTHFR_2'
-                }
-                mapped_name = lab_mapping.get(lab_name, lab_name)
-                lab_data[mapped_name.upper()] = numeric_value
-        
-        # Normalize keys to uppercase for consistency
-        lab_data = {k.upper(): v for k, v in lab_data.items()}
+        # Prepare client data and lab values (armgasys variable names) for roadmap generator
+        client_data = data.client_data()
         
         # Initialize roadmap generator and process content controls
         current_app.logger.info("About to create RoadmapGenerator")
@@ -145,11 +60,7 @@ def generate(client_id):
         
         # Generate roadmap content (this already processes all content controls internally)
         current_app.logger.info("About to generate roadmap content")
-        roadmap_content = generator.generate_roadmap(
-            client_data=client_data,
-            lab_results=lab_data,
-            hhq_responses=hhq_responses
-        )
+        roadmap_content = roadmap_cache.get_roadmap(generator, client_id, client_data, labs, hhq_responses)
         current_app.logger.info("Roadmap content generated successfully")
         
         # Generate timestamp and supplementary data
@@ -175,21 +86,22 @@ def generate(client_id):
 def roadmap_summary(client_id):
     """Display roadmap summary for a client."""
     try:
-        client = fetch_client_by_id(client_id)
+        data = roadmap_data_loader.load(client_id)
+        client = data.client
         if not client:
             flash('Client not found.', 'error')
             return redirect(url_for('clients.view', id=client_id))
         
         # Get lab results and create key findings
-        lab_results = fetch_lab_results_for_client(client_id)
-        key_findings = _generate_key_findings(lab_results)
+        labs = data.labs
+        key_findings = _generate_key_findings(labs)
         
         # Get HHQ responses and create priority interventions
-        hhq_responses = fetch_hhq_responses_dict(client_id)
+        hhq_responses = data.hhq_responses
         priority_interventions = _generate_priority_interventions(hhq_responses)
         
         # Get supplement recommendations
-        supplements = _get_supplement_recommendations(lab_results, hhq_responses)
+        supplements = _get_supplement_recommendations(labs, hhq_responses)
         
         return render_template('roadmap/roadmap_summary.html',
                              client=client,
@@ -206,187 +118,107 @@ def roadmap_summary(client_id):
 def download_visual_roadmap_pdf(client_id):
     """Download a visually enhanced roadmap PDF with images"""
     try:
-        supabase = get_supabase_client()
-        
-        # Get client data
-        client_result = supabase.table('clients').select('*').eq('id', client_id).execute()
-        if not client_result.data:
+        data = roadmap_data_loader.load(client_id)
+        if not data.client:
             flash('Client not found', 'error')
-            return redirect(url_for('clients.list'))
-        
-        client = client_result.data[0]
-        
-        # Get lab results
-        lab_results_result = supabase.table('lab_results').select('*').eq('client_id', client_id).execute()
-        lab_results_dict = {}
-        if lab_results_result.data:
-            for result in lab_results_result.data:
-                if result.get('armgasys_variable'):
-                    lab_results_dict[result['armgasys_variable']] = result.get('value')
-        
-        # Get HHQ responses
-        hhq_result = supabase.table('hhq_responses').select('*').eq('client_id', client_id).execute()
-        hhq_responses = {}
-        if hhq_result.data:
-            for response in hhq_result.data:
-                if response.get('tag'):
-                    hhq_responses[response['tag']] = response.get('response')
+            return redirect(url_for('clients.index'))
         
         # Prepare client data
-        client_data = {
-            'name': f"{client.get('first_name', '')} {client.get('last_name', '')}".strip(),
-            'gender': client.get('sex'),
-            'dob': client.get('date_of_birth'),
-            'labs_date': 'Recent'
-        }
+        client_data = data.client_data(labs_date='Recent')
+        hhq_responses = data.hhq_responses
         
-        # Generate visual PDF
+        # A browser revalidating an unchanged roadmap gets its 304 before anything is rendered
         generator = RoadmapGenerator()
-        pdf_path = generator.generate_visual_pdf(client_data, lab_results_dict, hhq_responses)
-        
-        # Send the PDF file
-        return send_file(pdf_path, 
-                        as_attachment=True, 
+        etag = roadmap_cache.visual_pdf_etag(generator, client_data, data.labs, hhq_responses)
+        if etag in request.if_none_match:
+            response = make_response('', 304)
+            response.set_etag(etag)
+            return response
+        
+        # Render the visual PDF in the rendering pool (or read it from the PDF cache directory)
+        pdf_bytes, etag = roadmap_cache.get_visual_pdf_bytes(generator, client_id, client_data, data.labs, hhq_responses,
+                                                             render=render_roadmap_pdf)
+        
+        # Send the PDF with Content-Length and an ETag; If-None-Match gets a 304
+        return send_file(io.BytesIO(pdf_bytes),
+                        as_attachment=True,
                         download_name=f"visual_roadmap_{client_data['name'].replace(' ', '_')}.pdf",
-                        mimetype='application/pdf')
+                        mimetype='application/pdf',
+                        etag=etag,
+                        conditional=True)
         
+    except RenderPoolSaturated as e:
+        return busy_response(e)
     except Exception as e:
         current_app.logger.error(f"Error generating visual PDF for client {client_id}: {str(e)}")
         flash('Error generating visual roadmap PDF', 'error')
         return redirect(url_for('clients.view', id=client_id))
 
+@bp.route('/export', methods=['POST'])
+@login_required
+def export_roadmaps():
+    """Stream a ZIP of visual roadmap PDFs for a list of clients or a name/email search (admin only)."""
+    # The admin account is the one made by `flask create-admin`
+    if current_user.username != 'admin':
+        return {'error': 'Unauthorized'}, 403
+
+    payload = request.get_json(silent=True) or request.form
+    client_ids = payload.get('client_ids') or []
+    if isinstance(client_ids, str):
+        client_ids = [client_id.strip() for client_id in client_ids.split(',') if client_id.strip()]
+    ids = cohort_client_ids(client_ids, payload.get('search'))
+    if not ids:
+        return {'error': 'No clients to export'}, 400
+
+    # Shares the download pool, so leave half of its queue for single downloads
+    pool = pdf_rendering.pdf_render_pool
+    export = CohortExport(ids, pool, window=max(1, pool.max_pending // 2),
+                          progress=lambda stats: current_app.logger.info(f"Roadmap export progress: {stats}"))
+    current_app.logger.info(f"Exporting roadmaps for {len(ids)} clients for {current_user.username}")
+    filename = f"roadmaps_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+    return Response(stream_with_context(export.stream_zip()), mimetype='application/zip',
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
 @bp.route('/debug/<client_id>')
 @login_required
 def debug_roadmap(client_id):
     """Debug endpoint to show roadmap processing details."""
     try:
-        # Fetch client data
-        client = fetch_client_by_id(client_id)
-        if not client:
+        # Fetch client, lab and HHQ data concurrently
+        data = roadmap_data_loader.load(client_id)
+        if not data.client:
             return {'error': 'Client not found'}, 404
         
-        # Get lab results and HHQ
-        lab_results = fetch_lab_results_for_client(client_id)
-        hhq_responses = fetch_hhq_responses_dict(client_id)
-        
-        # Prepare client data
-        client_data = {
-            'name': f"{client.get('first_name', '')} {client.get('last_name', '')}".strip(),
-            'gender': client.get('sex', ''),
-            'dob': client.get('date_of_birth'),
-            'labs_date': datetime.now().strftime('%B %d, %Y')
-        }
-        
-        # Convert lab results to expected format
-        lab_data = {}
-        if lab_results:
-            for result in lab_results:
-                # Prefer the already-mapped Armgasys variable from Supabase
-                armgasys_var = result.get('armgasys_variable', '')
-                value = result.get('value', '')
-
-                # Convert string values to float where possible, but keep genetics strings
-                try:
-                    numeric_value = float(value) if value and str(value).replace('.', '').replace('-', '').isdigit() else value
-                except (ValueError, TypeError):
-                    numeric_value = value
-
-                if armgasys_var:
-                    lab_data[armgasys_var.upper()] = numeric_value
-                    continue  # Skip manual mapping if we used the pre-mapped variable
-
-                # Fallback: Map common lab names to Armgasys variables if armgasys_variable missing
-                lab_name = result.get('test_name', '')
-                lab_mapping = {
-                    'WBC': 'CBC_WBC',
-                    'RBC': 'CBC_RBC',
-                    'Hemoglobin': 'CBC_HGB',
-                    'Hematocrit': 'CBC_HCT',
-                    'MCV': 'CBC_MCV',
-                    'Platelets': 'CBC_PLT',
-                    'Neutrophils (Absolute)': 'CBC_NEUT_ABS',
-                    'Lymphs (Absolute)': 'CBC_LYMPH_ABS',
-                    'Glucose': 'CHEM_GLU',
-                    'BUN': 'CHEM_BUN',
-                    'Creatinine': 'CHEM_CREAT',
-                    'eGFR': 'CHEM_EGFR',
-                    'Sodium': 'CHEM_NA',
-                    'Potassium': 'CHEM_K',
-                    'Chloride': 'CHEM_CL',
-                    'Calcium': 'CHEM_CA',
-                    'Albumin': 'LFT_ALB',
-                    'ALT (SGPT)': 'LFT_ALT',
-                    'AST (SGOT)': 'LFT_AST',
-                    'Alkaline Phosphatase': 'LFT_ALKP',
-                    'Bilirubin, Total': 'LFT_TBILI',
-                    'Cholesterol, Total': 'LIPID_CHOL',
-                    'Triglycerides': 'LIPID_TRIG',
-                    'HDL Cholesterol': 'LIPID_HDL',
-                    'LDL Chol Calc (NIH)': 'LIPID_LDL',
-                    'Free Testosterone': 'MHt_TEST_FREE',
-                    'Testosterone, Total, LC/MS': 'MHt_TEST_TOT',
-                    'Prostate Specific Ag': 'MHt_PSA',
-                    'TSH': 'THY_TSH',
-                    'Triiodothyronine (T3), Free': 'THY_T3F',
-                    'T4, Free (Direct)': 'THY_T4F',
-                    'Thyroglobulin Antibody': 'THY_TGAB',
-                    'Pregnenolone, MS': 'NEURO_PREG',
-                    'DHEA-Sulfate': 'NEURO_DHEAS',
-                    'Vitamin D, 25-Hydroxy': 'VIT_D25',
-                    'Vitamin B12': 'VIT_B12',
-                    'Vitamin E (Alpha Tocopherol)': 'VIT_E',
-                    'Zinc, Plasma or Serum': 'MIN_ZN',
-                    'Copper, Serum or Plasma': 'MIN_CU',
-                    'Selenium, Serum/Plasma': 'MIN_SE',
-                    'Magnesium, RBC': 'MIN_MG_RBC',
-                    'C-Reactive Protein, Cardiac': 'INFLAM_CRP',
-                    'Uric Acid': 'INFLAM_URIC',
-                    'Homocyst(e)ine': 'INFLAM_HOMOCYS',
-                    'Insulin': 'METAB_INS',
-                    'Hemoglobin A1c': 'METAB_HBA1C',
-                    'Total Glutathione': 'METAB_GLUT',
-                    'OmegaCheck(TM)': 'OMEGA_CHECK',
-                    'Omega-6/Omega-3 Ratio': 'OMEGA_6_3_RATIO',
-                    'Omega-3 total': 'OMEGA_3_TOT',
-                    'Omega-6 total': 'OMEGA_6_TOT',
-                    'Arachidonic Acid': 'OMEGA_AA',
-                    'Arachidonic Acid/EPA Ratio': 'OMEGA_AA_EPA',
-                    'APO E Genot E2/E4': 'APO1',  # Fall back mapping for specific test name variant
-                    'APO E Genotyping Result': 'APO1',
-                    'MTHFR C677T': 'MTHFR_1',
-                    'MTHFR A1298C': 'MTHFR_2'
-                }
-                mapped_name = lab_mapping.get(lab_name, lab_name)
-                lab_data[mapped_name.upper()] = numeric_value
-        
-        # Normalize keys to uppercase for consistency
-        lab_data = {k.upper(): v for k, v in lab_data.items()}
+        hhq_responses = data.hhq_responses
+        client_data = data.client_data()
+        labs = data.labs
         
         # Initialize roadmap generator
         generator = RoadmapGenerator()
         
         # Get processed content controls
-        processed_content = generator._process_all_content_controls(client_data, lab_data, hhq_responses)
+        processed_content = generator._process_all_content_controls(client_data, labs, hhq_responses)
         
         # Generate roadmap content
-        roadmap_content = generator.generate_roadmap(
-            client_data=client_data,
-            lab_results=lab_data,
-            hhq_responses=hhq_responses
-        )
+        roadmap_content = roadmap_cache.get_roadmap(generator, client_id, client_data, labs, hhq_responses)
         
         # Create debug response
         debug_data = {
             'client_data': client_data,
-            'lab_count': len(lab_data),
+            'lab_count': len(labs),
             'hhq_count': len(hhq_responses),
             'processed_controls_count': len(processed_content),
             'processed_controls': processed_content,
-            'lab_data_sample': dict(list(lab_data.items())[:10]) if lab_data else {},
+            'lab_data_sample': dict(list(labs.items())[:10]) if labs else {},
             'hhq_sample': dict(list(hhq_responses.items())[:10]) if hhq_responses else {},
             'roadmap_length': len(roadmap_content),
             'roadmap_sample': roadmap_content[:1000] + '...' if len(roadmap_content) > 1000 else roadmap_content,
-            'remaining_placeholders': roadmap_content.count('{{') if roadmap_content else 0
+            'remaining_placeholders': roadmap_content.count('{{') if roadmap_content else 0,
+            'template_cache': template_registry.stats(),
+            'roadmap_cache': roadmap_cache.stats(),
+            'supabase_pool': supabase_pool.stats(),
+            'pdf_render_pool': pdf_render_stats(),
+            'fetch_timings': data.timings
         }
         
         return render_template('roadmap/debug.html', debug_data=debug_data)
@@ -410,44 +242,37 @@ def _extract_supplements_from_roadmap(content):
     
     return supplements[:10]  # Limit to 10 supplements
 
-def _generate_key_findings(lab_results):
-    """Generate key lab findings from results."""
+def _generate_key_findings(labs):
+    """Generate key lab findings from the lab panel."""
     findings = []
     
-    if not lab_results:
+    if not labs:
         return findings
     
-    for result in lab_results:
-        test_name = result.get('test_name', '')
-        value = result.get('value', '')
-        reference_range = result.get('reference_range', '')
-        
-        # Simple logic to identify potentially concerning values
-        if 'vitamin d' in test_name.lower():
-            try:
-                val = float(value)
-                if val < 30:
-                    findings.append({
-                        'finding': f'{test_name}: {value}',
-                        'significance': 'Below optimal range for brain health',
-                        'category': 'Vitamins',
-                        'priority': 'high'
-                    })
-            except:
-                pass
-        
-        if 'homocyst' in test_name.lower():
-            try:
-                val = float(value)
-                if val > 7:
-                    findings.append({
-                        'finding': f'{test_name}: {value}',
-                        'significance': 'Elevated inflammatory marker',
-                        'category': 'Inflammation',
-                        'priority': 'medium'
-                    })
-            except:
-                pass
+    # Simple logic to identify potentially concerning values. Labs are matched by the
+    # name on the report: the panel key depends on how the row was mapped
+    # (VIT_D25 or 25OHVITD, INFLAM_HOMOCYS or HOMOCYST(E)INE)
+    for variable in labs:
+        test_name = labs.test_name(variable)
+        value = labs.number(variable)
+        if value is None:
+            continue
+        
+        if 'vitamin d' in test_name.lower() and value < 30:
+            findings.append({
+                'finding': f'{test_name}: {value:g}',
+                'significance': 'Below optimal range for brain health',
+                'category': 'Vitamins',
+                'priority': 'high'
+            })
+        
+        if 'homocyst' in test_name.lower() and value > 7:
+            findings.append({
+                'finding': f'{test_name}: {value:g}',
+                'significance': 'Elevated inflammatory marker',
+                'category': 'Inflammation',
+                'priority': 'medium'
+            })
     
     return findings[:5]  # Limit to 5 key findings
 
@@ -477,7 +302,7 @@ def _generate_priority_interventions(hhq_responses):
     
     return interventions
 
-def _get_supplement_recommendations(lab_results, hhq_responses):
+def _get_supplement_recommendations(labs, hhq_responses):
     """Get basic supplement recommendations."""
     supplements = [
         'Omega-3 Fish Oil',
@@ -0,0 +1,213 @@
+import io
+import os
+import re
+import time
+import uuid
+import logging
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pdf_render_pool import ROADMAP_PDF, PDFRenderPool, RenderPoolSaturated
+from .roadmap_data import RoadmapData
+from .supabase_client import (CLIENT_PAGE_MAX, BULK_CLIENT_CHUNK, fetch_clients_by_ids, fetch_clients_page,
+                              fetch_hhq_responses_for_clients, fetch_lab_panels_for_clients)
+
+logger = logging.getLogger(__name__)
+
+
+def cohort_client_ids(client_ids: Optional[Iterable[str]] = None, search: Optional[str] = None) -> List[str]:
+    """The given client ids, or every client matching a name/email search (all clients when search is empty)."""
+    if client_ids:
+        return [str(client_id) for client_id in dict.fromkeys(client_ids)]
+    ids, cursor = [], None
+    while True:
+        page = fetch_clients_page(search=search, after=cursor, limit=CLIENT_PAGE_MAX, columns=('id',))
+        ids.extend(str(client['id']) for client in page['clients'])
+        cursor = page['next_cursor']
+        if not cursor:
+            return ids
+
+
+def is_client_id(client_id: str) -> bool:
+    """Whether an id can be a client (clients.id is a UUID); anything else would fail the whole in.() query."""
+    try:
+        uuid.UUID(str(client_id))
+        return True
+    except ValueError:
+        return False
+
+
+def load_cohort(client_ids: List[str],
+                on_error: Optional[Callable[[List[str], Exception], None]] = None) -> Iterator[RoadmapData]:
+    """
+    Roadmap data for many clients, read in bulk: for each BULK_CLIENT_CHUNK clients one
+    query per table instead of three per client. Unknown client ids are skipped. When
+    on_error is given, a chunk whose reads fail is handed to it and loading continues
+    with the next chunk; otherwise the error propagates.
+    """
+    for start in range(0, len(client_ids), BULK_CLIENT_CHUNK):
+        chunk = client_ids[start:start + BULK_CLIENT_CHUNK]
+        fetch_start = time.perf_counter()
+        try:
+            clients = fetch_clients_by_ids(chunk)
+            panels = fetch_lab_panels_for_clients(list(clients))
+            responses = fetch_hhq_responses_for_clients(list(clients))
+        except Exception as e:
+            if on_error is None:
+                raise
+            on_error(chunk, e)
+            continue
+        timings = {'bulk_fetch': round(time.perf_counter() - fetch_start, 4)}
+        for client_id in chunk:
+            if client_id in clients:
+                yield RoadmapData(client_id=client_id, client=clients[client_id], labs=panels[client_id],
+                                  hhq_responses=responses[client_id], timings=timings)
+
+
+def roadmap_filename(data: RoadmapData) -> str:
+    """PDF name inside an export, unique per client."""
+    name = re.sub(r'[^A-Za-z0-9]+', '_', data.client_data()['name']).strip('_') or 'client'
+    return f"visual_roadmap_{name}_{data.client_id[:8]}.pdf"
+
+
+class CohortExport:
+    """
+    Visual roadmap PDFs for a list of clients, rendered across a PDFRenderPool.
+
+    Client data is loaded in bulk, and up to `window` renders are kept in flight so the
+    pool stays busy without queueing the whole cohort at once. When a shared pool is
+    saturated by other downloads the export waits for its own jobs, or for Retry-After,
+    instead of failing. Ids that are not UUIDs, unknown clients and clients whose data
+    could not be read are recorded in `failed` rather than stopping the export.
+    Progress and throughput are available at any time via stats().
+    """
+
+    def __init__(self, client_ids: List[str], render_pool: PDFRenderPool, window: Optional[int] = None,
+                 progress: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.client_ids = client_ids
+        self.render_pool = render_pool
+        self.window = window or max(render_pool.max_pending, 1)
+        self.progress = progress
+        self.done = 0
+        self.failed: Dict[str, str] = {}
+        self._exported = set()
+        self._started: Optional[float] = None
+
+    def iter_pdfs(self) -> Iterator[Tuple[str, bytes]]:
+        """(filename, PDF bytes) for each client, in the order the renders finish."""
+        self._started = time.perf_counter()
+        client_ids = []
+        for client_id in self.client_ids:
+            if is_client_id(client_id):
+                client_ids.append(client_id)
+            else:
+                self._record_failure(client_id, 'Invalid client id')
+
+        in_flight = {}
+        for data in load_cohort(client_ids, on_error=self._chunk_failed):
+            spec = {
+                'client_data': data.client_data(labs_date='Recent'),
+                'lab_results': dict(data.labs),
+                'hhq_responses': data.hhq_responses,
+            }
+            while True:
+                if len(in_flight) >= self.window:
+                    yield from self._collect(in_flight)
+                    continue
+                try:
+                    in_flight[self.render_pool.submit(ROADMAP_PDF, spec)] = data
+                    break
+                except RenderPoolSaturated as e:
+                    if in_flight:
+                        yield from self._collect(in_flight)
+                    else:
+                        time.sleep(e.retry_after)
+        while in_flight:
+            yield from self._collect(in_flight)
+
+        # Ids load_cohort() skipped because there is no such client
+        for client_id in sorted(set(self.client_ids) - set(self.failed) - self._exported):
+            self._record_failure(client_id, 'Client not found')
+        logger.info(f"Cohort export finished: {self.stats()}")
+
+    def write_directory(self, output_dir: str) -> Dict[str, Any]:
+        """Write every PDF into output_dir; returns the final stats."""
+        os.makedirs(output_dir, exist_ok=True)
+        for filename, pdf in self.iter_pdfs():
+            with open(os.path.join(output_dir, filename), 'wb') as pdf_file:
+                pdf_file.write(pdf)
+        return self.stats()
+
+    def stream_zip(self) -> Iterator[bytes]:
+        """
+        A ZIP archive of the PDFs, produced chunk by chunk as renders finish so it can
+        be sent as a streamed response without holding the whole archive.
+        """
+        sink = _ZipStream()
+        # PDFs are already compressed, so they are stored as-is
+        with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED) as archive:
+            for filename, pdf in self.iter_pdfs():
+                archive.writestr(filename, pdf)
+                yield sink.drain()
+            if self.failed:
+                archive.writestr('failed.txt', ''.join(f"{client_id}: {error}\n"
+                                                      for client_id, error in self.failed.items()))
+        yield sink.drain()
+
+    def stats(self) -> Dict[str, Any]:
+        """Progress and throughput so far."""
+        elapsed = time.perf_counter() - self._started if self._started else 0.0
+        return {
+            'total': len(self.client_ids),
+            'done': self.done,
+            'failed': len(self.failed),
+            'seconds': round(elapsed, 2),
+            'roadmaps_per_second': round(self.done / elapsed, 2) if elapsed else 0.0,
+        }
+
+    def _collect(self, in_flight) -> Iterator[Tuple[str, bytes]]:
+        finished, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+        for future in finished:
+            data = in_flight.pop(future)
+            try:
+                pdf = future.result()
+            except Exception as e:
+                self._record_failure(data.client_id, str(e))
+                continue
+            self.done += 1
+            self._exported.add(data.client_id)
+            self._report()
+            yield roadmap_filename(data), pdf
+
+    def _chunk_failed(self, client_ids: List[str], error: Exception) -> None:
+        for client_id in client_ids:
+            self._record_failure(client_id, f"Could not load client data: {error}")
+
+    def _record_failure(self, client_id: str, error: str) -> None:
+        logger.error(f"Cohort export failed for client {client_id}: {error}")
+        self.failed[client_id] = error
+        self._report()
+
+    def _report(self) -> None:
+        if self.progress:
+            self.progress(self.stats())
+
+
+class _ZipStream(io.RawIOBase):
+    """Write-only, unseekable sink for zipfile; drain() hands back what was written since the last call."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data, self._chunks = b''.join(self._chunks), []
+        return data
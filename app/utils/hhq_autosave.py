@@ -0,0 +1,50 @@
+import os
+import logging
+from typing import Any, Dict, Optional
+
+from autosave_buffer import AutosaveBuffer
+from .supabase_client import upsert_hhq_answers_partial
+
+logger = logging.getLogger(__name__)
+
+# Set up by init_hhq_autosave() when the app is created
+autosave_buffer: Optional[AutosaveBuffer] = None
+
+
+def write_autosave_batch(client_id: str, answers: Dict[str, Any], attempt_id: str) -> int:
+    """Persist one merged batch of autosaved answers with a single bulk upsert."""
+    return upsert_hhq_answers_partial(client_id, answers, attempt_id)
+
+
+def init_hhq_autosave(app) -> AutosaveBuffer:
+    """Create the autosave buffer in the app's instance database and write anything left over."""
+    global autosave_buffer
+    db_uri = app.config['SQLALCHEMY_DATABASE_URI']
+    db_path = db_uri[len('sqlite:///'):] if db_uri.startswith('sqlite:///') else os.path.join(app.instance_path, 'autosave.db')
+    autosave_buffer = AutosaveBuffer(
+        db_path,
+        write_autosave_batch,
+        flush_interval=app.config.get('HHQ_AUTOSAVE_FLUSH_INTERVAL', 15.0),
+    )
+    # Answers journaled by a process that stopped before flushing are written by the flusher
+    if autosave_buffer.stats()['pending']:
+        autosave_buffer.start()
+    app.extensions['hhq_autosave'] = autosave_buffer
+    return autosave_buffer
+
+
+def buffer_autosave(client_id: str, attempt_id: str, answers: Dict[str, Any]) -> int:
+    """Journal an autosave; it reaches Supabase on the next flush."""
+    return autosave_buffer.add(client_id, attempt_id, answers)
+
+
+def flush_autosave(client_id: str, attempt_id: str) -> int:
+    """Write an attempt's buffered answers now, before the form is re-read or submitted."""
+    if autosave_buffer is None:
+        return 0
+    try:
+        return autosave_buffer.flush(client_id, attempt_id)
+    except Exception as e:
+        # Still journaled; the background flusher retries
+        logger.warning(f"Autosave flush failed for client {client_id} attempt {attempt_id}: {str(e)}")
+        return 0
@@ -0,0 +1,113 @@
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from .supabase_client import fetch_versioned_health_history_questions
+
+# Hormone sections only shown to clients of the matching sex
+SEX_EXCLUDED_SECTIONS = {
+    'male': {'Female Hormone Health'},
+    'female': {'Male Hormone Health History'},
+    'unknown': set(),
+}
+
+
+def form_field_name(variable_name: str) -> str:
+    """HHQForm field name of a question, as created by create_hhq_form_class()."""
+    return variable_name.replace('-', '_')
+
+
+def normalize_sex(sex: Optional[str]) -> str:
+    """'male', 'female' or 'unknown' for a client's sex column."""
+    sex = (sex or '').lower()
+    return sex if sex in SEX_EXCLUDED_SECTIONS else 'unknown'
+
+
+@dataclass(frozen=True)
+class HHQSection:
+    """One step of the questionnaire, its questions in question_order."""
+    name: str
+    title: str
+    questions: Tuple[Dict[str, Any], ...]
+    field_names: Tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class HHQLayout:
+    """The ordered sections shown to clients of one sex."""
+    sex: str
+    sections: Tuple[HHQSection, ...]
+    questions: Tuple[Dict[str, Any], ...]
+    # variable_name -> HHQForm field name, for the questions in this layout
+    form_fields: Dict[str, str] = field(default_factory=dict)
+
+    def __len__(self):
+        return len(self.sections)
+
+    def step(self, index: int) -> Tuple[int, HHQSection]:
+        """The section for a step number, clamped to the valid range."""
+        index = min(max(index, 0), len(self.sections) - 1)
+        return index, self.sections[index]
+
+
+def build_layout(questions: List[Dict[str, Any]], sex: str) -> HHQLayout:
+    """Group the catalog into sections in order of appearance, dropping the other sex's hormone section."""
+    excluded = SEX_EXCLUDED_SECTIONS[sex]
+    grouped: Dict[str, List[Dict[str, Any]]] = {}
+    for question in questions:
+        section_name = question.get('section', 'Unknown')
+        if section_name not in excluded:
+            grouped.setdefault(section_name, []).append(question)
+
+    sections = []
+    for step, (section_name, section_questions) in enumerate(grouped.items()):
+        section_questions = sorted(section_questions, key=lambda q: int(q.get('question_order', 0)))
+        sections.append(HHQSection(
+            name=section_name,
+            # Use the section name directly or fall back to a generic title
+            title=section_name if section_name != 'Unknown' else f"Section {step + 1}",
+            questions=tuple(section_questions),
+            field_names=tuple(form_field_name(q['variable_name']) for q in section_questions),
+        ))
+
+    ordered = tuple(q for section in sections for q in section.questions)
+    return HHQLayout(
+        sex=sex,
+        sections=tuple(sections),
+        questions=ordered,
+        form_fields={q['variable_name']: form_field_name(q['variable_name']) for q in ordered},
+    )
+
+
+class HHQLayoutIndex:
+    """
+    Section layouts for male, female and unknown clients, built once per
+    question catalog version instead of on every form request.
+    """
+
+    def __init__(self, loader=fetch_versioned_health_history_questions):
+        self.loader = loader
+        self.builds = 0
+        self._version = None
+        self._layouts: Dict[str, HHQLayout] = {}
+        self._lock = threading.Lock()
+
+    def get(self, sex: Optional[str]) -> Optional[HHQLayout]:
+        """Layout for a client's sex, or None when the questions could not be loaded."""
+        sex = normalize_sex(sex)
+        version, questions = self.loader()
+        if not questions:
+            return None
+        if version is None:
+            # The catalog wasn't cached, so neither is its layout
+            return build_layout(questions, sex)
+        with self._lock:
+            if version != self._version:
+                self._layouts = {key: build_layout(questions, key) for key in SEX_EXCLUDED_SECTIONS}
+                self._version = version
+                self.builds += 1
+            return self._layouts[sex]
+
+
+# Shared by both HHQ form routes
+hhq_layout_index = HHQLayoutIndex()
@@ -2,13 +2,23 @@ import pdfplumber
 import re
 import pandas as pd
 import os
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
 
 # Configuration
 INPUT_DIR = "client_labs/"  # Directory containing client PDFs
 OUTPUT_DIR = "extracted_results/"  # Directory for output CSVs
 
+# Page-parallel extraction: worker processes, and the page count below which a PDF is read in-process
+EXTRACTION_WORKERS = int(os.getenv('LAB_EXTRACTION_WORKERS', min(4, os.cpu_count() or 1)))
+PARALLEL_MIN_PAGES = 4
+
 # Define the lab tests, including all required tests
 lab_tests = [
     "Albumin",
@@ -212,6 +222,73 @@ page_patterns = {
     }
 }
 
+# Other spellings of test names seen in LabCorp reports
+TEST_NAME_VARIATIONS = {
+    "Vitamin E (Alpha Tocopherol)": ["Vitamin E (Alpha Tocopherol)", "Vitamin E(Alpha Tocopherol)"],
+    "T4, Free (Direct)": ["T4, Free (Direct)", "Thyroxine (T4) Free, Direct"],
+}
+
+
+class LiteralLocator:
+    """
+    Finds every occurrence of a fixed set of literal names in a single pass.
+
+    The names are compiled into a trie-shaped regex; each search reports the longest
+    name starting at the next candidate position and resumes one character later, so
+    overlapping names are found too. Names that are prefixes of a match start there as well.
+    """
+
+    def __init__(self, names: Dict[str, str]):
+        """names maps each literal to the label it reports, e.g. a variation to its test."""
+        self.names = names
+        self._labels = list(dict.fromkeys(names.values()))
+        self._order = {label: index for index, label in enumerate(self._labels)}
+        self._prefixes = {name: [other for other in names if name.startswith(other)] for name in names}
+        self.regex = re.compile(self._trie_pattern(names))
+
+    def positions(self, text: str) -> Dict[str, int]:
+        """Position of the first occurrence of every name found in the text."""
+        positions: Dict[str, int] = {}
+        search = self.regex.search
+        match = search(text)
+        while match:
+            start = match.start()
+            for name in self._prefixes[match.group()]:
+                positions.setdefault(name, start)
+            match = search(text, start + 1)
+        return positions
+
+    def find(self, text: str) -> List[str]:
+        """Labels of the names found in the text, in the order the labels were declared."""
+        labels = {self.names[name] for name in self.positions(text)}
+        return sorted(labels, key=self._order.__getitem__)
+
+    @staticmethod
+    def _trie_pattern(names) -> str:
+        trie: Dict = {}
+        for name in names:
+            node = trie
+            for char in name:
+                node = node.setdefault(char, {})
+            node[None] = True
+
+        def emit(node) -> str:
+            branches = [re.escape(char) + emit(child) for char, child in sorted(
+                (char, child) for char, child in node.items() if char is not None)]
+            if not branches:
+                return ''
+            body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+            # A name ends here: the longer continuations are optional (and tried first)
+            return f'(?:{body})?' if None in node else body
+
+        return emit(trie)
+
+
+# Every test name and variation, reported under the canonical test name in lab_tests order
+LAB_NAME_LOCATOR = LiteralLocator({
+    name: test for test in lab_tests for name in TEST_NAME_VARIATIONS.get(test, [test])
+})
+
 def clean_value(raw_value, test=None):
     """Clean the extracted value by removing unwanted characters, preserving multi-digit numbers for specific tests."""
     if not raw_value:
@@ -249,9 +326,38 @@ def clean_value(raw_value, test=None):
         print(f"Debug - Cleaning value for {test or 'unknown'} (final output): {cleaned}")
         return cleaned if cleaned else None
 
-# This dictionary will hold our extracted lab values and patient sex
-extracted_values = {}
-patient_sex = None  # Track patient sex for sex-specific labs
+@dataclass
+class ExtractionContext:
+    """
+    Everything extracted from one document. A fresh context per document keeps
+    concurrent uploads from seeing each other's values; it only holds plain data,
+    so it can also be sent to or returned from worker processes.
+    """
+    extracted_values: Dict[str, str] = field(default_factory=dict)
+    patient_sex: Optional[str] = None  # Track patient sex for sex-specific labs
+    results: Dict[str, Dict[str, str]] = field(default_factory=dict)
+
+    def merge_page(self, page_hits: Dict[str, Dict[str, str]], general_hits: Dict[str, Dict[str, str]]) -> None:
+        """Merge one page's hits; pages must be merged in page order."""
+        # Page-specific patterns always win, general patterns only fill gaps
+        for test, hit in page_hits.items():
+            print(f"Found {test}: {hit['value']}")  # Debug print
+            self.results[test] = hit
+        for test, hit in general_hits.items():
+            if test not in self.results:
+                print(f"Found {test}: {hit['value']}")  # Debug print
+                self.results[test] = hit
+
+# Line patterns, compiled once: the specific pattern (if any) and the generic fallbacks per test
+LINE_PATTERNS = {test: re.compile(lab_patterns[test], re.IGNORECASE) for test in lab_tests if test in lab_patterns}
+GENERIC_LINE_PATTERNS = {
+    test: [re.compile(pattern, re.IGNORECASE) for pattern in (
+        rf"{re.escape(test)}\s+01\s+([\d\.-]+)",
+        rf"{re.escape(test)}\s+([\d\.-]+)",
+        rf"{re.escape(test)}.*?(\d+\.?\d*)"
+    )]
+    for test in lab_tests
+}
 
 def extract_with_patterns(line, test):
     """
@@ -260,39 +366,34 @@ def extract_with_patterns(line, test):
     2) Otherwise, use fallback generic patterns.
     """
     # 1) Use specific pattern if available
-    if test in lab_patterns:
-        pattern = lab_patterns[test]
-        match = re.search(pattern, line, re.IGNORECASE)
+    if test in LINE_PATTERNS:
+        match = LINE_PATTERNS[test].search(line)
         if match:
             print(f"Debug - Line for {test}: {line}")  # Debug print for specific patterns
             value = match.group(1) if test not in ["APO E Genotyping Result", "Estradiol", "Thyroglobulin Antibody", "Thyroid Peroxidase (TPO) Ab", "MTHFR C677T", "MTHFR A1298C"] else match.group(0)
             return clean_value(value, test)
             
     # 2) Fallback generic patterns
-    generic_patterns = [
-        rf"{re.escape(test)}\s+01\s+([\d\.-]+)",
-        rf"{re.escape(test)}\s+([\d\.-]+)",
-        rf"{re.escape(test)}.*?(\d+\.?\d*)"
-    ]
-    for pattern in generic_patterns:
-        match = re.search(pattern, line, re.IGNORECASE)
+    for pattern in GENERIC_LINE_PATTERNS.get(test, []):
+        match = pattern.search(line)
         if match:
             print(f"Debug - Line for {test} (generic): {line}")  # Debug print for generic patterns
             value = match.group(1)
             return clean_value(value, test)
     return None
 
-def extract_from_line_with_code(line):
+def extract_from_line_with_code(line, tests=None, patient_sex=None):
     """
     If a line contains '01', use simple splitting logic to grab a value
     from the next element. Returns (test, value) if successful.
+    tests are the test names found in the line, when the caller has already located them.
     """
     if '01' in line:
         parts = line.split()
         try:
             code_index = parts.index('01')
-            for test in lab_tests:
-                if test in line and code_index + 1 < len(parts):
+            for test in (LAB_NAME_LOCATOR.find(line) if tests is None else tests):
+                if code_index + 1 < len(parts):
                     # Skip female-specific tests for males
                     if test in ["Estradiol", "FSH", "Progesterone", "Testosterone"] and patient_sex == "Male":
                         print(f"Debug - Skipping {test} for male patient")
@@ -319,12 +420,13 @@ def extract_with_old_approach(page_text, test):
         return f"{clean_val} {unit}".strip()
     return None
 
-def fallback_old_approach(page_text):
+def fallback_old_approach(context, page_text):
     """
     For labs known to be off with the new code,
     if the extracted value is empty or suspicious (like '04'),
     try the old approach on the entire page text.
     """
+    extracted_values = context.extracted_values
     for test in labs_to_fix_with_old_code:
         current_val = extracted_values.get(test, "")
         # If it's empty or a known "bad" placeholder, run old approach:
@@ -333,25 +435,22 @@ def fallback_old_approach(page_text):
             if old_val:
                 extracted_values[test] = old_val
 
-def process_page_patterns(page_text, page_number):
+def process_page_patterns(context, page_text, page_number):
     """Process patterns specific to a page, with debug for failures."""
-    global patient_sex  # Use global to track patient sex
-    if page_number == 1 and not patient_sex:  # Extract sex from Page 1
+    extracted_values = context.extracted_values
+    if page_number == 1 and not context.patient_sex:  # Extract sex from Page 1
         if "Sex: Male" in page_text:
-            patient_sex = "Male"
+            context.patient_sex = "Male"
         elif "Sex: Female" in page_text:
-            patient_sex = "Female"
-        print(f"Debug - Determined patient sex: {patient_sex}")
+            context.patient_sex = "Female"
+        print(f"Debug - Determined patient sex: {context.patient_sex}")
 
     if page_number in page_patterns:
+        tests_on_page = set(LAB_NAME_LOCATOR.find(page_text))
         for test, pattern in page_patterns[page_number].items():
-            # More robust check for test presence, handling variations and line breaks
-            test_variations = [test]
-            if test == "Vitamin E (Alpha Tocopherol)":
-                test_variations = ["Vitamin E (Alpha Tocopherol)", "Vitamin E(Alpha Tocopherol)"]
-            elif test == "T4, Free (Direct)":
-                test_variations = ["T4, Free (Direct)", "Thyroxine (T4) Free, Direct"]
-            found_in_text = any(variation in page_text or any(variation in line for line in page_text.split('\n')) for variation in test_variations)
+            # Test presence, handling variations, from a single scan of the page
+            test_variations = TEST_NAME_VARIATIONS.get(test, [test])
+            found_in_text = test in tests_on_page
             if found_in_text or test in ["MTHFR C677T", "MTHFR A1298C"]:  # Force check for MTHFR even if not explicitly found
                 print(f"Debug - Raw Text for Page {page_number} ({test}): {page_text}")
                 try:
@@ -373,16 +472,23 @@ def process_page_patterns(page_text, page_number):
             else:
                 print(f"Debug - Test {test} not found in page {page_number} text (variations checked: {test_variations})")
 
-def process_remaining_labs(page_text, tables, page, page_number):
+def process_remaining_labs(context, page_text, tables, page, page_number):
     """Process remaining labs using various methods, no excluded_tests for Page 7."""
+    extracted_values = context.extracted_values
+    patient_sex = context.patient_sex
     excluded_tests = ["Potassium", "Hemoglobin", "Copper, Serum or Plasma"]  # Removed "Progesterone" from excluded tests
     if page_number == 7:  # Force extraction for Page 7 labs, bypassing excluded_tests
         excluded_tests = []  # Remove all exclusions for Page 7 to ensure all labs are processed
     
-    # 1) Line code extraction
+    # Locate every test name once per line; each strategy below only visits those hits
     lines = page_text.split('\n')
-    for line in lines:
-        test_from_code, value_from_code = extract_from_line_with_code(line)
+    line_hits = [(line, LAB_NAME_LOCATOR.find(line)) for line in lines]
+
+    # 1) Line code extraction
+    for line, tests in line_hits:
+        if not tests:
+            continue
+        test_from_code, value_from_code = extract_from_line_with_code(line, tests, patient_sex)
         if test_from_code and value_from_code and test_from_code not in extracted_values:
             if test_from_code not in excluded_tests:
                 # For female-specific tests, only extract if patient is female
@@ -393,9 +499,9 @@ def process_remaining_labs(page_text, tables, page, page_number):
                 print(f"Debug - Added {test_from_code} from line code: {value_from_code}")
 
     # 2) Pattern-based extraction
-    for line in lines:
-        for test in lab_tests:
-            if test not in extracted_values and test in line and test not in excluded_tests:
+    for line, tests in line_hits:
+        for test in tests:
+            if test not in extracted_values and test not in excluded_tests:
                 # For female-specific tests, only extract if patient is female
                 if test in ["Estradiol", "FSH", "Progesterone"] and patient_sex != "Female":
                     print(f"Debug - Skipping {test} for non-female patient")
@@ -413,23 +519,24 @@ def process_remaining_labs(page_text, tables, page, page_number):
             
             for row_idx, row in enumerate(table):
                 for cell_idx, cell in enumerate(row):
-                    if cell:
-                        for test in lab_tests:
-                            if test not in extracted_values and test in cell and test not in excluded_tests:
-                                # For female-specific tests, only extract if patient is female
-                                if test in ["Estradiol", "FSH", "Progesterone"] and patient_sex != "Female":
-                                    print(f"Debug - Skipping {test} for non-female patient")
-                                    continue
-                                value = None
-                                if cell_idx + 1 < len(row) and row[cell_idx + 1]:
-                                    value = extract_with_patterns(row[cell_idx + 1], test)
-                                elif cell_idx - 1 >= 0 and row[cell_idx - 1]:
-                                    value = extract_with_patterns(row[cell_idx - 1], test)
-                                else:
-                                    value = extract_with_patterns(cell, test)
-                                if value:
-                                    extracted_values[test] = value
-                                    print(f"Debug - Added {test} from table: {value}")
+                    if not cell:
+                        continue
+                    for test in LAB_NAME_LOCATOR.find(cell):
+                        if test not in extracted_values and test not in excluded_tests:
+                            # For female-specific tests, only extract if patient is female
+                            if test in ["Estradiol", "FSH", "Progesterone"] and patient_sex != "Female":
+                                print(f"Debug - Skipping {test} for non-female patient")
+                                continue
+                            value = None
+                            if cell_idx + 1 < len(row) and row[cell_idx + 1]:
+                                value = extract_with_patterns(row[cell_idx + 1], test)
+                            elif cell_idx - 1 >= 0 and row[cell_idx - 1]:
+                                value = extract_with_patterns(row[cell_idx - 1], test)
+                            else:
+                                value = extract_with_patterns(cell, test)
+                            if value:
+                                extracted_values[test] = value
+                                print(f"Debug - Added {test} from table: {value}")
 
     # 4) Fallback processing for MTHFR across all pages
     if "MTHFR" in page_text:
@@ -471,81 +578,208 @@ def process_remaining_labs(page_text, tables, page, page_number):
                     extracted_values[test] = old_val
                     print(f"Debug - Added {test} from old approach: {old_val}")
 
-def process_pdf(filepath):
+# -------------------- Compiled page matchers --------------------
+_REGEX_METACHARS = set('.^$*+?{}[]()|\\')
+
+
+def _split_top_level(pattern: str) -> List[str]:
+    """Split a regex on its top-level '|' alternatives."""
+    branches, depth, start, index = [], 0, 0, 0
+    in_class = False
+    while index < len(pattern):
+        char = pattern[index]
+        if char == '\\':
+            index += 2
+            continue
+        if in_class:
+            in_class = char != ']'
+        elif char == '[':
+            in_class = True
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == '|' and depth == 0:
+            branches.append(pattern[start:index])
+            start = index + 1
+        index += 1
+    branches.append(pattern[start:])
+    return branches
+
+
+def _literal_prefix(branch: str) -> str:
+    """The literal text every match of a regex branch must start with."""
+    literal = []
+    index = 0
+    while index < len(branch):
+        char = branch[index]
+        if char == '\\' and index + 1 < len(branch) and not branch[index + 1].isalnum():
+            literal.append(branch[index + 1])
+            index += 2
+        elif char in _REGEX_METACHARS:
+            if char in '*?{' and literal:
+                literal.pop()  # The previous character is optional or repeated
+            break
+        else:
+            literal.append(char)
+            index += 1
+    return ''.join(literal)
+
+
+def _anchors(pattern: str) -> Optional[Tuple[str, ...]]:
+    """Literal anchors for a pattern, or None when some branch has no literal prefix."""
+    prefixes = tuple(_literal_prefix(branch) for branch in _split_top_level(pattern))
+    return prefixes if all(prefixes) else None
+
+
+def _compile_matchers(patterns: Dict[str, str]) -> List[Tuple[str, 're.Pattern', Optional[Tuple[str, ...]]]]:
+    return [(test, re.compile(pattern), _anchors(pattern)) for test, pattern in patterns.items()]
+
+
+# Matchers in the same order process_pdf has always tried them
+GENERAL_MATCHERS = _compile_matchers({test: lab_patterns[test] for test in lab_tests if test in lab_patterns})
+PAGE_MATCHERS = {page: _compile_matchers(patterns) for page, patterns in page_patterns.items()}
+
+# One scan per page finds where every pattern's anchor first occurs
+ANCHOR_LOCATOR = LiteralLocator({anchor: anchor for matchers in [GENERAL_MATCHERS, *PAGE_MATCHERS.values()]
+                                 for _, _, anchors in matchers for anchor in anchors or ()})
+
+
+def _search(matcher, text: str, positions: Dict[str, int]):
+    """Same result as re.search, starting at the first anchor and skipping pages without one."""
+    _, regex, anchors = matcher
+    if anchors is None:
+        return regex.search(text)
+    starts = [positions[anchor] for anchor in anchors if anchor in positions]
+    return regex.search(text, min(starts)) if starts else None
+
+
+def match_page(page_number: int, text: str) -> Tuple[Dict[str, Dict[str, str]], Dict[str, Dict[str, str]]]:
+    """
+    Match one page's text. Returns the page-specific hits and the general-pattern hits;
+    which of them are kept depends on earlier pages, so merging is left to process_pdf.
+    """
+    positions = ANCHOR_LOCATOR.positions(text)
+    lookups: Dict[str, str] = {}
+
+    def result(test, match):
+        cleaned_value = clean_value(match.group(1), test)
+        if not cleaned_value:
+            return None
+        return {
+            'value': cleaned_value,
+            'unit': _page_lookup(lookups, UNIT_PATTERNS, text, test, 0),
+            'reference_range': _page_lookup(lookups, RANGE_PATTERNS, text, test, 1)
+        }
+
+    page_hits, general_hits = {}, {}
+    for hits, matchers in ((page_hits, PAGE_MATCHERS.get(page_number, [])), (general_hits, GENERAL_MATCHERS)):
+        for matcher in matchers:
+            match = _search(matcher, text, positions)
+            if match:
+                hit = result(matcher[0], match)
+                if hit:
+                    hits[matcher[0]] = hit
+    return page_hits, general_hits
+
+
+def _extract_pages(filepath: str, page_numbers: List[int]) -> List[Tuple[int, Dict, Dict]]:
+    """Open the PDF once, extract each requested page's text once and match it."""
+    results = []
+    with pdfplumber.open(filepath) as pdf:
+        for page_num in page_numbers:
+            logger.debug("Processing page %d of %s", page_num, filepath)
+            text = pdf.pages[page_num - 1].extract_text() or ''
+            results.append((page_num, *match_page(page_num, text)))
+    return results
+
+
+_extraction_pool = None
+_extraction_pool_lock = threading.Lock()
+
+
+def _get_extraction_pool() -> ProcessPoolExecutor:
+    """The worker pool is shared by every upload in the process and created on first use."""
+    global _extraction_pool
+    with _extraction_pool_lock:
+        if _extraction_pool is None:
+            _extraction_pool = ProcessPoolExecutor(max_workers=EXTRACTION_WORKERS)
+        return _extraction_pool
+
+
+def _extract_pages_parallel(filepath: str, page_count: int, workers: int = EXTRACTION_WORKERS) -> List[Tuple[int, Dict, Dict]]:
+    """Fan contiguous page chunks out to the worker pool; each worker opens the PDF once."""
+    chunk_size = -(-page_count // max(1, min(workers, EXTRACTION_WORKERS)))
+    chunks = [list(range(start, min(start + chunk_size, page_count) + 1))
+              for start in range(1, page_count + 1, chunk_size)]
+    pool = _get_extraction_pool()
+    futures = [pool.submit(_extract_pages, filepath, chunk) for chunk in chunks]
+    return [page for future in futures for page in future.result()]
+
+
+class LabExtractor:
+    """
+    Re-entrant lab PDF extractor. The extractor itself only holds settings; all
+    per-document state lives in the ExtractionContext created for each call, so one
+    instance can serve concurrent uploads from any number of threads.
+    """
+
+    def __init__(self, parallel: Optional[bool] = None, workers: int = EXTRACTION_WORKERS):
+        self.parallel = parallel
+        self.workers = workers
+
+    def extract(self, filepath: str) -> Dict[str, Dict[str, str]]:
+        """Extract the lab results from one PDF."""
+        return self.extract_context(filepath).results
+
+    def extract_context(self, filepath: str) -> ExtractionContext:
+        """
+        Extract one PDF into a new context.
+
+        Page text is extracted once per page and matched with precompiled patterns. Larger
+        reports are split across worker processes; results are merged in page order so
+        page-specific patterns override earlier pages and general patterns keep the first hit.
+        """
+        print(f"Starting PDF processing for file: {filepath}")  # Debug print
+        context = ExtractionContext()
+
+        try:
+            with pdfplumber.open(filepath) as pdf:
+                page_count = len(pdf.pages)
+                parallel = self.parallel
+                if parallel is None:
+                    parallel = self.workers > 1 and page_count >= PARALLEL_MIN_PAGES
+                if not parallel:
+                    pages = []
+                    for page_num, page in enumerate(pdf.pages, 1):
+                        print(f"Processing page {page_num}")  # Debug print
+                        pages.append((page_num, *match_page(page_num, page.extract_text() or '')))
+
+            if parallel:
+                try:
+                    pages = _extract_pages_parallel(filepath, page_count, self.workers)
+                except Exception as e:
+                    logger.warning("Parallel extraction of %s failed, falling back to sequential: %s", filepath, e)
+                    pages = _extract_pages(filepath, list(range(1, page_count + 1)))
+
+            for page_num, page_hits, general_hits in pages:
+                context.merge_page(page_hits, general_hits)
+
+            print(f"Extraction complete. Found {len(context.results)} results")  # Debug print
+            return context
+
+        except Exception as e:
+            print(f"Error processing PDF: {str(e)}")  # Debug print
+            raise
+
+
+def process_pdf(filepath, parallel=None):
     """Process a PDF file and extract lab results."""
-    print(f"Starting PDF processing for file: {filepath}")  # Debug print
-    
-    # Update patterns for missing labs
-    lab_patterns.update({
-        'BUN': r"BUN\s+01\s+(\d+(?:\.\d+)?)",
-        'Calcium': r"Calcium\s+01\s+(\d+(?:\.\d+)?)",
-        'Chloride': r"Chloride\s+01\s+(\d+(?:\.\d+)?)",
-        'Creatinine': r"Creatinine\s+01\s+(\d+(?:\.\d+)?)",
-        'eGFR': r"eGFR.*?(?:>)?(\d+(?:\.\d+)?)",
-        'Glucose': r"Glucose\s+01\s+(\d+(?:\.\d+)?)",
-        'Hematocrit': r"Hematocrit\s+01\s+(\d+(?:\.\d+)?)",
-        'Lymphs \(Absolute\)': r"Lymphs \(Absolute\)\s+01\s+(\d+(?:\.\d+)?)",
-        'MCV': r"MCV\s+01\s+(\d+(?:\.\d+)?)",
-        'Neutrophils \(Absolute\)': r"Neutrophils \(Absolute\)\s+01\s+(\d+(?:\.\d+)?)",
-        'Platelets': r"Platelets\s+01\s+(\d+)",
-        'RBC': r"RBC\s+01\s+(\d+(?:\.\d+)?)",
-        'Sodium': r"Sodium\s+01\s+(\d+(?:\.\d+)?)",
-        'WBC': r"WBC\s+01\s+(\d+(?:\.\d+)?)"
-    })
-
-    try:
-        with pdfplumber.open(filepath) as pdf:
-            extracted_data = {}
-            
-            # Process each page
-            for page_num, page in enumerate(pdf.pages, 1):
-                print(f"Processing page {page_num}")  # Debug print
-                text = page.extract_text()
-                
-                # Try page-specific patterns first
-                if page_num in page_patterns:
-                    for test, pattern in page_patterns[page_num].items():
-                        match = re.search(pattern, text)
-                        if match:
-                            raw_value = match.group(1)
-                            cleaned_value = clean_value(raw_value, test)
-                            if cleaned_value:
-                                print(f"Found {test}: {cleaned_value}")  # Debug print
-                                extracted_data[test] = {
-                                    'value': cleaned_value,
-                                    'unit': extract_unit(text, test),
-                                    'reference_range': extract_reference_range(text, test)
-                                }
-                
-                # Try general patterns for any remaining tests
-                for test in lab_tests:
-                    if test not in extracted_data:
-                        # Try specific pattern if available
-                        if test in lab_patterns:
-                            pattern = lab_patterns[test]
-                            match = re.search(pattern, text)
-                            if match:
-                                raw_value = match.group(1)
-                                cleaned_value = clean_value(raw_value, test)
-                                if cleaned_value:
-                                    print(f"Found {test}: {cleaned_value}")  # Debug print
-                                    extracted_data[test] = {
-                                        'value': cleaned_value,
-                                        'unit': extract_unit(text, test),
-                                        'reference_range': extract_reference_range(text, test)
-                                    }
-            
-            print(f"Extraction complete. Found {len(extracted_data)} results")  # Debug print
-            return extracted_data
-            
-    except Exception as e:
-        print(f"Error processing PDF: {str(e)}")  # Debug print
-        raise
+    return LabExtractor(parallel=parallel).extract(filepath)
 
-def extract_unit(text, test):
-    """Extract the unit for a given test result."""
-    # Add units for the new labs
-    unit_patterns = {
+# Units for the new labs
+UNIT_PATTERNS = {
+    test: re.compile(pattern) for test, pattern in {
         'BUN': r'mg/dL',
         'Calcium': r'mg/dL',
         'Chloride': r'mmol/L',
@@ -559,33 +793,42 @@ def extract_unit(text, test):
         'Sodium': r'mmol/L',
         'WBC': r'K/uL',
         'Prostate Specific Ag': r'ng/mL'
-    }
-    
-    if test in unit_patterns:
-        pattern = unit_patterns[test]
-        match = re.search(pattern, text)
-        if match:
-            return match.group(0)
-    return ''
+    }.items()
+}
 
-def extract_reference_range(text, test):
-    """Extract the reference range for a given test result."""
-    # Common reference range patterns
-    range_patterns = {
+# Common reference range patterns
+RANGE_PATTERNS = {
+    test: re.compile(pattern) for test, pattern in {
         'Albumin': r'Reference Range:\s*([\d\.-]+\s*-\s*[\d\.]+)\s*g/dL',
         'ALT \(SGPT\)': r'Reference Range:\s*([\d\.-]+\s*-\s*[\d\.]+)\s*U/L',
         'AST \(SGOT\)': r'Reference Range:\s*([\d\.-]+\s*-\s*[\d\.]+)\s*U/L',
         'TSH': r'Reference Range:\s*([\d\.-]+\s*-\s*[\d\.]+)\s*uIU/mL',
         'T4, Free \(Direct\)': r'Reference Range:\s*([\d\.-]+\s*-\s*[\d\.]+)\s*ng/dL',
         'Vitamin D, 25-Hydroxy': r'Reference Range:\s*([\d\.-]+\s*-\s*[\d\.]+)\s*ng/mL'
-    }
-    
-    if test in range_patterns:
-        pattern = range_patterns[test]
-        match = re.search(pattern, text)
-        if match:
-            return match.group(1)
-    return ''
+    }.items()
+}
+
+
+def _page_lookup(lookups: Dict[str, str], patterns: Dict[str, 're.Pattern'], text: str, test: str, group: int) -> str:
+    """Search the page for a test's unit or range pattern, once per distinct pattern per page."""
+    regex = patterns.get(test)
+    if regex is None:
+        return ''
+    key = f"{group}:{regex.pattern}"
+    if key not in lookups:
+        match = regex.search(text)
+        lookups[key] = match.group(group) if match else ''
+    return lookups[key]
+
+
+def extract_unit(text, test):
+    """Extract the unit for a given test result."""
+    return _page_lookup({}, UNIT_PATTERNS, text, test, 0)
+
+
+def extract_reference_range(text, test):
+    """Extract the reference range for a given test result."""
+    return _page_lookup({}, RANGE_PATTERNS, text, test, 1)
 
 def save_results(client_id: str, results: Dict[str, Dict[str, str]], output_path: str):
     """Save extracted lab values to a CSV file for a client."""
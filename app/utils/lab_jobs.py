@@ -0,0 +1,85 @@
+import os
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from job_queue import JobQueue, PermanentJobError, StageTimer
+from .lab_extractor import process_pdf
+from .lab_mapping import get_all_mapped_results
+from .lab_panel import LabPanel
+from .supabase_client import fetch_client_by_id, save_lab_results, save_lab_panel
+
+logger = logging.getLogger(__name__)
+
+LAB_UPLOAD_JOB = 'lab_upload'
+
+# Set up by init_lab_jobs() when the app is created
+lab_job_queue: Optional[JobQueue] = None
+
+
+def run_lab_upload(payload: Dict[str, Any], stages: StageTimer) -> Dict[str, Any]:
+    """Extract a saved lab PDF, map it and store the results for the client."""
+    client_id = payload['client_id']
+    with stages.stage('extract'):
+        extracted_results = process_pdf(payload['file_path'])
+    if not extracted_results:
+        raise PermanentJobError("No lab results could be extracted from this PDF. Please verify it's a LabCorp report.")
+
+    with stages.stage('map'):
+        client = fetch_client_by_id(client_id) or {}
+        mapped_results = get_all_mapped_results(extracted_results, (client.get('sex') or 'unknown').lower())
+
+    with stages.stage('save'):
+        save_lab_results(client_id, extracted_results)
+
+    # Normalized panel with derived ratios, so roadmaps don't re-parse the rows. The rows
+    # are already saved and reads fall back to them, so a failure here must not fail the
+    # job: a retry would insert every lab_results row again.
+    panel = None
+    with stages.stage('panel'):
+        collected_on = payload.get('collected_on') or datetime.utcnow().date().isoformat()
+        try:
+            panel = save_lab_panel(client_id, LabPanel.from_rows(mapped_results), collected_on)
+        except Exception as e:
+            logger.error(f"Lab panel snapshot not saved for client {client_id}, roadmaps will use the lab rows: {e}")
+
+    return {
+        'extracted': len(extracted_results),
+        'mapped': len(mapped_results),
+        'panel_labs': len(panel) if panel is not None else None,
+        'collected_on': collected_on,
+        'tests': sorted(extracted_results),
+    }
+
+
+def remove_uploaded_file(payload: Dict[str, Any]) -> None:
+    """The uploaded PDF is kept for retries and removed once the job is done either way."""
+    file_path = payload.get('file_path')
+    if file_path and os.path.exists(file_path):
+        os.remove(file_path)
+
+
+def init_lab_jobs(app) -> JobQueue:
+    """Create the lab job queue in the app's instance database."""
+    global lab_job_queue
+    db_uri = app.config['SQLALCHEMY_DATABASE_URI']
+    db_path = db_uri[len('sqlite:///'):] if db_uri.startswith('sqlite:///') else os.path.join(app.instance_path, 'jobs.db')
+    lab_job_queue = JobQueue(
+        db_path,
+        workers=app.config.get('LAB_JOB_WORKERS', 2),
+        max_attempts=app.config.get('LAB_JOB_MAX_ATTEMPTS', 3),
+    )
+    lab_job_queue.register(LAB_UPLOAD_JOB, run_lab_upload, finalizer=remove_uploaded_file)
+    app.extensions['lab_jobs'] = lab_job_queue
+    return lab_job_queue
+
+
+def submit_lab_upload(client_id: str, file_path: str, collected_on: Optional[str] = None) -> str:
+    """Queue extraction of an uploaded lab PDF; returns the job id. collected_on defaults to the upload date."""
+    return lab_job_queue.submit(LAB_UPLOAD_JOB, {'client_id': str(client_id), 'file_path': os.path.abspath(file_path),
+                                                 'collected_on': collected_on})
+
+
+def get_lab_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Job state for status polling."""
+    return lab_job_queue.get(job_id)
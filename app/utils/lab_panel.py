@@ -0,0 +1,249 @@
+import math
+import re
+from array import array
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from lab_rule_engine import lab_rule_engine
+
+# Fallback mapping of lab names to Armgasys variables, for rows stored without one
+LAB_NAME_TO_ARMGASYS = {
+    'WBC': 'CBC_WBC',
+    'RBC': 'CBC_RBC',
+    'Hemoglobin': 'CBC_HGB',
+    'Hematocrit': 'CBC_HCT',
+    'MCV': 'CBC_MCV',
+    'Platelets': 'CBC_PLT',
+    'Neutrophils (Absolute)': 'CBC_NEUT_ABS',
+    'Lymphs (Absolute)': 'CBC_LYMPH_ABS',
+    'Glucose': 'CHEM_GLU',
+    'BUN': 'CHEM_BUN',
+    'Creatinine': 'CHEM_CREAT',
+    'eGFR': 'CHEM_EGFR',
+    'Sodium': 'CHEM_NA',
+    'Potassium': 'CHEM_K',
+    'Chloride': 'CHEM_CL',
+    'Calcium': 'CHEM_CA',
+    'Albumin': 'LFT_ALB',
+    'ALT (SGPT)': 'LFT_ALT',
+    'AST (SGOT)': 'LFT_AST',
+    'Alkaline Phosphatase': 'LFT_ALKP',
+    'Bilirubin, Total': 'LFT_TBILI',
+    'Cholesterol, Total': 'LIPID_CHOL',
+    'Triglycerides': 'LIPID_TRIG',
+    'HDL Cholesterol': 'LIPID_HDL',
+    'LDL Chol Calc (NIH)': 'LIPID_LDL',
+    'Free Testosterone': 'MHt_TEST_FREE',
+    'Testosterone, Total, LC/MS': 'MHt_TEST_TOT',
+    'Prostate Specific Ag': 'MHt_PSA',
+    'TSH': 'THY_TSH',
+    'Triiodothyronine (T3), Free': 'THY_T3F',
+    'T4, Free (Direct)': 'THY_T4F',
+    'Thyroglobulin Antibody': 'THY_TGAB',
+    'Pregnenolone, MS': 'NEURO_PREG',
+    'DHEA-Sulfate': 'NEURO_DHEAS',
+    'Vitamin D, 25-Hydroxy': 'VIT_D25',
+    'Vitamin B12': 'VIT_B12',
+    'Vitamin E (Alpha Tocopherol)': 'VIT_E',
+    'Zinc, Plasma or Serum': 'MIN_ZN',
+    'Copper, Serum or Plasma': 'MIN_CU',
+    'Selenium, Serum/Plasma': 'MIN_SE',
+    'Magnesium, RBC': 'MIN_MG_RBC',
+    'C-Reactive Protein, Cardiac': 'INFLAM_CRP',
+    'Uric Acid': 'INFLAM_URIC',
+    'Homocyst(e)ine': 'INFLAM_HOMOCYS',
+    'Insulin': 'METAB_INS',
+    'Hemoglobin A1c': 'METAB_HBA1C',
+    'Total Glutathione': 'METAB_GLUT',
+    'OmegaCheck(TM)': 'OMEGA_CHECK',
+    'Omega-6/Omega-3 Ratio': 'OMEGA_6_3_RATIO',
+    'Omega-3 total': 'OMEGA_3_TOT',
+    'Omega-6 total': 'OMEGA_6_TOT',
+    'Arachidonic Acid': 'OMEGA_AA',
+    'Arachidonic Acid/EPA Ratio': 'OMEGA_AA_EPA',
+    'APO E Genot E2/E4': 'APO1',  # Fall back mapping for specific test name variant
+    'APO E Genotyping Result': 'APO1',
+    'MTHFR C677T': 'MTHFR_1',
+    'MTHFR A1298C': 'MTHFR_2'
+}
+
+# lab_results columns a panel is built from
+LAB_PANEL_COLUMNS = 'original_test_name,original_value,armgasys_variable_name'
+
+# Format of stored panel snapshots (lab_panels table); bump when it changes so old
+# snapshots are ignored and the panel is rebuilt from lab_results rows instead
+LAB_PANEL_VERSION = 1
+
+# Plain decimal numbers; anything else ('<0.5', 'E3/E4', 'Not Detected') stays text
+NUMBER_PATTERN = re.compile(r'-?(?:\d+\.?\d*|\.\d+)')
+
+NAN = float('nan')
+
+
+def parse_lab_value(raw: Any):
+    """(number, None) for a numeric lab value, (NaN, text) for genotypes and other text."""
+    if isinstance(raw, (int, float)) and not isinstance(raw, bool) and math.isfinite(raw):
+        return float(raw), None
+    text = '' if raw is None else str(raw)
+    if NUMBER_PATTERN.fullmatch(text.strip()):
+        return float(text), None
+    return NAN, text
+
+
+def lab_variable(armgasys_variable: Optional[str], test_name: Optional[str]) -> str:
+    """Upper-case Armgasys variable of a result, falling back to the lab name mapping."""
+    if armgasys_variable:
+        return armgasys_variable.upper()
+    test_name = test_name or ''
+    return LAB_NAME_TO_ARMGASYS.get(test_name, test_name).upper()
+
+
+class LabPanel(Mapping):
+    """
+    A client's lab values keyed by upper-case Armgasys variable, each parsed once.
+
+    Numbers live in one array('d') with NaN marking the slots that hold text instead
+    (genotypes such as APO1 'E3/E4'); the text values are kept separately. Reads are
+    a dict lookup plus an array index, and the panel behaves like the {variable: value}
+    dict the roadmap generator expects, numbers as floats and genetics as strings.
+    """
+
+    __slots__ = ('_slots', '_values', '_text', '_names', 'derived')
+
+    def __init__(self):
+        self._slots: Dict[str, int] = {}
+        self._values = array('d')
+        self._text: Dict[int, str] = {}
+        self._names: Dict[int, str] = {}
+        # Ratios and HOMA-IR keyed by rule name, when precomputed (see compute_derived)
+        self.derived: Optional[Dict[str, float]] = None
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]]) -> 'LabPanel':
+        """Build from lab_results rows as stored in Supabase (LAB_PANEL_COLUMNS)."""
+        panel = cls()
+        for row in rows or []:
+            test_name = row.get('original_test_name', '')
+            panel.set(lab_variable(row.get('armgasys_variable_name'), test_name),
+                      row.get('original_value', ''), test_name)
+        return panel
+
+    @classmethod
+    def from_results(cls, results: Iterable[Dict[str, Any]]) -> 'LabPanel':
+        """Build from results in the fetch_lab_results_for_client() format."""
+        panel = cls()
+        for result in results or []:
+            test_name = result.get('test_name', '')
+            panel.set(lab_variable(result.get('armgasys_variable'), test_name), result.get('value', ''), test_name)
+        return panel
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Dict[str, Any]) -> Optional['LabPanel']:
+        """Rebuild a stored panel, or None if it was written in an older format."""
+        if not snapshot or snapshot.get('panel_version') != LAB_PANEL_VERSION:
+            return None
+        panel = cls()
+        names = snapshot.get('test_names') or {}
+        for variable, value in (snapshot.get('lab_values') or {}).items():
+            panel.set(variable, value, names.get(variable))
+        panel.derived = dict(snapshot.get('derived') or {})
+        return panel
+
+    @classmethod
+    def combine(cls, snapshots: Iterable[Dict[str, Any]], rows: Iterable[Dict[str, Any]] = ()) -> 'LabPanel':
+        """
+        A client's whole panel from every stored snapshot, oldest collection date first
+        so newer draws win, on top of lab_results rows for labs no snapshot covers
+        (uploads from before snapshots were kept). Each snapshot only holds one report,
+        so picking a single one would drop older uploads such as a separate genotype report.
+        """
+        panels = [panel for panel in map(cls.from_snapshot, snapshots) if panel is not None]
+        covered = {variable for panel in panels for variable in panel}
+        legacy = cls.from_rows(rows)
+        uncovered = [variable for variable in legacy if variable not in covered]
+        if len(panels) == 1 and not uncovered:
+            # Exactly the stored panel, precomputed derived values included
+            return panels[0]
+
+        combined = cls()
+        for variable in uncovered:
+            combined.set(variable, legacy[variable], legacy.test_name(variable))
+        for panel in panels:
+            combined.merge(panel)
+        return combined
+
+    def to_snapshot(self) -> Dict[str, Any]:
+        """Normalized, JSON-ready form for the lab_panels table, derived values included."""
+        return {
+            'panel_version': LAB_PANEL_VERSION,
+            'lab_values': dict(self),
+            'test_names': {variable: self._names[slot] for variable, slot in self._slots.items() if slot in self._names},
+            'derived': self.compute_derived() if self.derived is None else self.derived,
+        }
+
+    def compute_derived(self) -> Dict[str, float]:
+        """Calculate the derived values from the rule table once and keep them on the panel."""
+        self.derived = lab_rule_engine.derive(lab_rule_engine.resolve(self))
+        return self.derived
+
+    def merge(self, other: 'LabPanel') -> 'LabPanel':
+        """Overlay another panel's values (e.g. a second report for the same date); derived values are recomputed."""
+        for variable, slot in other._slots.items():
+            self.set(variable, other[variable], other._names.get(slot))
+        return self
+
+    def set(self, variable: str, raw: Any, test_name: Optional[str] = None) -> None:
+        """Store a value; a later result for the same variable replaces the earlier one."""
+        number, text = parse_lab_value(raw)
+        self.derived = None
+        slot = self._slots.get(variable)
+        if slot is None:
+            slot = self._slots[variable] = len(self._values)
+            self._values.append(number)
+        else:
+            self._values[slot] = number
+            self._text.pop(slot, None)
+        if text is not None:
+            self._text[slot] = text
+        if test_name:
+            self._names[slot] = test_name
+
+    def number(self, variable: str, default: Optional[float] = None) -> Optional[float]:
+        """Numeric value, or default when the lab is missing or not a number."""
+        slot = self._slots.get(variable)
+        if slot is None:
+            return default
+        value = self._values[slot]
+        return default if math.isnan(value) else value
+
+    def text(self, variable: str, default: Optional[str] = None) -> Optional[str]:
+        """Text value (genotypes etc.), or default when the lab is missing or numeric."""
+        slot = self._slots.get(variable)
+        return default if slot is None else self._text.get(slot, default)
+
+    def test_name(self, variable: str) -> str:
+        """The lab's name as printed on the report, for display."""
+        slot = self._slots.get(variable)
+        return self._names.get(slot, variable) if slot is not None else variable
+
+    @property
+    def numeric_mask(self):
+        """One bool per slot, in insertion order: True where the value is a number."""
+        return [not math.isnan(value) for value in self._values]
+
+    def __getitem__(self, variable: str):
+        slot = self._slots[variable]
+        value = self._values[slot]
+        return self._text[slot] if math.isnan(value) else value
+
+    def __contains__(self, variable) -> bool:
+        return variable in self._slots
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._slots)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __repr__(self) -> str:
+        return f"LabPanel({dict(self)!r})"
@@ -1,12 +1,41 @@
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
 from datetime import datetime
 
+from pdf_theme import pdf_theme
+
 def generate_hhq_pdf(hhq_response, output_path):
     """Generate a PDF report for an HHQ response."""
+    return build_hhq_pdf(hhq_pdf_spec(hhq_response), output_path)
+
+def hhq_pdf_spec(hhq_response):
+    """
+    Everything build_hhq_pdf needs, as plain data: the response plus the section titles
+    and question labels, which come from the app and are looked up here in the request.
+    """
+    # Section titles from routes
+    from app.routes.hhq import SECTION_TITLES
+    
+    # Question mapping
+    from app.forms import HHQForm
+    form = HHQForm()
+    question_map = {}
+    for field in form:
+        if hasattr(field, 'label'):
+            question_map[field.name] = field.label.text
+    
+    return {
+        'hhq_response': hhq_response,
+        'section_titles': list(SECTION_TITLES),
+        'question_map': question_map,
+    }
+
+def build_hhq_pdf(spec, output_path):
+    """Lay out the HHQ report from hhq_pdf_spec(); output_path may be a path or a binary file object."""
+    hhq_response = spec['hhq_response']
+    question_map = spec['question_map']
     doc = SimpleDocTemplate(
         output_path,
         pagesize=letter,
@@ -16,30 +45,8 @@ def generate_hhq_pdf(hhq_response, output_path):
         bottomMargin=72
     )
     
-    # Styles
-    styles = getSampleStyleSheet()
-    styles.add(ParagraphStyle(
-        name='SectionHeader',
-        parent=styles['Heading2'],
-        spaceAfter=12,
-        spaceBefore=24,
-        textColor=colors.HexColor('#2C3E50')
-    ))
-    styles.add(ParagraphStyle(
-        name='Question',
-        parent=styles['Normal'],
-        fontName='Helvetica-Bold',
-        fontSize=10,
-        spaceAfter=6
-    ))
-    styles.add(ParagraphStyle(
-        name='Answer',
-        parent=styles['Normal'],
-        fontName='Helvetica',
-        fontSize=10,
-        leftIndent=20,
-        spaceAfter=12
-    ))
+    # Shared with the roadmap PDFs and built once per process
+    styles = pdf_theme.styles
     
     # Build content
     content = []
@@ -80,30 +87,19 @@ def generate_hhq_pdf(hhq_response, output_path):
     content.append(t)
     content.append(Spacer(1, 0.5*inch))
     
-    # Section titles from routes
-    from app.routes.hhq import SECTION_TITLES
-    
-    # Question mapping
-    from app.forms import HHQForm
-    form = HHQForm()
-    question_map = {}
-    for field in form:
-        if hasattr(field, 'label'):
-            question_map[field.name] = field.label.text
-    
     # Process responses
     responses = hhq_response.get('responses', {})
     
     # Pre-screening section
-    content.append(Paragraph('Pre-screening Questions', styles['SectionHeader']))
+    content.append(Paragraph('Pre-screening Questions', styles['HHQSectionHeader']))
     pre_fields = ['pre_is_female', 'pre_has_dementia_history']
     for field_name in pre_fields:
         if field_name in responses and field_name in question_map:
             question = question_map[field_name]
             value = responses[field_name]
             answer = 'Yes' if value is True or value == 'on' or value == 'True' else 'No'
-            content.append(Paragraph(question, styles['Question']))
-            content.append(Paragraph(answer, styles['Answer']))
+            content.append(Paragraph(question, styles['HHQQuestion']))
+            content.append(Paragraph(answer, styles['HHQAnswer']))
     content.append(Spacer(1, 0.25*inch))
     
     # Skip sections based on pre-screening
@@ -116,11 +112,11 @@ def generate_hhq_pdf(hhq_response, output_path):
         skip_sections.append(1)   # Skip Dementia Diagnosis
     
     # Process each section
-    for section_index, section_title in enumerate(SECTION_TITLES):
+    for section_index, section_title in enumerate(spec['section_titles']):
         if section_index in skip_sections:
             continue
         
-        content.append(Paragraph(section_title, styles['SectionHeader']))
+        content.append(Paragraph(section_title, styles['HHQSectionHeader']))
         
         # Get all responses for fields that belong to this section
         section_responses = {}
@@ -134,10 +130,10 @@ def generate_hhq_pdf(hhq_response, output_path):
             for field_name, value in section_responses.items():
                 question = question_map[field_name]
                 answer = 'Yes' if value is True or value == 'on' or value == 'True' else 'No'
-                content.append(Paragraph(question, styles['Question']))
-                content.append(Paragraph(answer, styles['Answer']))
+                content.append(Paragraph(question, styles['HHQQuestion']))
+                content.append(Paragraph(answer, styles['HHQAnswer']))
         else:
-            content.append(Paragraph('No conditions reported in this section.', styles['Answer']))
+            content.append(Paragraph('No conditions reported in this section.', styles['HHQAnswer']))
         
         content.append(Spacer(1, 0.25*inch))
     
@@ -0,0 +1,54 @@
+import atexit
+import logging
+from typing import Any, Dict, Optional
+
+from flask import make_response
+
+from pdf_render_pool import HHQ_PDF, ROADMAP_PDF, PDFRenderPool, RenderPoolSaturated
+from .pdf_generator import hhq_pdf_spec
+
+logger = logging.getLogger(__name__)
+
+# Set up by init_pdf_rendering() when the app is created
+pdf_render_pool: Optional[PDFRenderPool] = None
+
+
+def init_pdf_rendering(app) -> PDFRenderPool:
+    """Create the PDF rendering pool; its worker processes start with the first download."""
+    global pdf_render_pool
+    pdf_render_pool = PDFRenderPool(
+        workers=app.config.get('PDF_RENDER_WORKERS', 2),
+        max_pending=app.config.get('PDF_RENDER_MAX_PENDING', 8),
+        timeout=app.config.get('PDF_RENDER_TIMEOUT', 120.0),
+    )
+    atexit.register(pdf_render_pool.shutdown, wait=False)
+    app.extensions['pdf_rendering'] = pdf_render_pool
+    return pdf_render_pool
+
+
+def render_roadmap_pdf(client_data: Dict[str, Any], lab_results, hhq_responses: Dict[str, Any] = None) -> bytes:
+    """Visual roadmap PDF, rendered in a worker process (same arguments as render_visual_pdf)."""
+    # Plain dict so the spec pickles without the app package; derived ratios are recomputed
+    return pdf_render_pool.render(ROADMAP_PDF, {
+        'client_data': client_data,
+        'lab_results': dict(lab_results or {}),
+        'hhq_responses': hhq_responses or {},
+    })
+
+
+def render_hhq_pdf(hhq_response: Dict[str, Any]) -> bytes:
+    """HHQ report PDF, rendered in a worker process; labels are looked up in the request first."""
+    return pdf_render_pool.render(HHQ_PDF, hhq_pdf_spec(hhq_response))
+
+
+def pdf_render_stats() -> Optional[Dict[str, Any]]:
+    """Queue and latency counters for the debug view."""
+    return pdf_render_pool.stats() if pdf_render_pool else None
+
+
+def busy_response(error: RenderPoolSaturated):
+    """503 with Retry-After for a download that found the rendering queue full."""
+    logger.warning(f"PDF rendering saturated, asking client to retry in {error.retry_after}s")
+    response = make_response('PDF generation is busy. Please try again in a few seconds.', 503)
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
@@ -0,0 +1,78 @@
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from .lab_panel import LabPanel
+from .supabase_client import fetch_client_by_id, fetch_lab_panel_for_client, fetch_hhq_responses_dict
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class RoadmapData:
+    """Everything the roadmap routes read for one client, with how long each fetch took."""
+    client_id: str
+    client: Optional[Dict[str, Any]]
+    # Lab values keyed by upper-case Armgasys variable, as the roadmap generator expects
+    labs: LabPanel
+    hhq_responses: Dict[str, Any]
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    def client_data(self, labs_date: Optional[str] = None) -> Dict[str, Any]:
+        """Client fields for the roadmap generator."""
+        client = self.client or {}
+        return {
+            'name': f"{client.get('first_name', '')} {client.get('last_name', '')}".strip(),
+            'gender': client.get('sex', ''),
+            'dob': client.get('date_of_birth'),
+            'labs_date': labs_date or datetime.now().strftime('%B %d, %Y')  # Default to today if not specified
+        }
+
+
+class RoadmapDataLoader:
+    """
+    Fetches a client's record, lab results and HHQ responses concurrently.
+
+    The three reads are independent, so the request waits for the slowest of them
+    rather than their sum. Each fetch is timed separately.
+    """
+
+    FETCHES = {
+        'client': fetch_client_by_id,
+        'labs': fetch_lab_panel_for_client,
+        'hhq_responses': fetch_hhq_responses_dict,
+    }
+
+    def __init__(self, max_workers: int = 6):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='roadmap-data')
+
+    def load(self, client_id: str) -> RoadmapData:
+        """Fetch everything for one client."""
+        start = time.perf_counter()
+        futures = {name: self._executor.submit(self._timed, fetch, client_id)
+                   for name, fetch in self.FETCHES.items()}
+        results, timings = {}, {}
+        for name, future in futures.items():
+            results[name], timings[name] = future.result()
+        timings['total'] = round(time.perf_counter() - start, 4)
+        logger.info(f"Loaded roadmap data for client {client_id}: {timings}")
+
+        return RoadmapData(
+            client_id=str(client_id),
+            client=results['client'],
+            labs=results['labs'] if results['labs'] is not None else LabPanel(),
+            hhq_responses=results['hhq_responses'] or {},
+            timings=timings,
+        )
+
+    @staticmethod
+    def _timed(fetch, client_id):
+        start = time.perf_counter()
+        result = fetch(client_id)
+        return result, round(time.perf_counter() - start, 4)
+
+
+# Shared by every roadmap request in the process
+roadmap_data_loader = RoadmapDataLoader()
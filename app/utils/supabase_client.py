@@ -2,14 +2,22 @@ from supabase import create_client as supabase_create_client, Client
 import os
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
+from flask import g, has_request_context
 from flask_wtf import CSRFProtect
 import time
 from functools import wraps
 import logging
 import uuid
 import json
+import base64
+import threading
+import importlib.util
 from .lab_mapping import get_all_mapped_results
+from .lab_panel import LabPanel, LAB_PANEL_COLUMNS, LAB_PANEL_VERSION
 import httpx
+from postgrest.types import ReturnMethod
+from postgrest.utils import SyncClient
+from roadmap_cache import roadmap_cache
 
 # Load environment variables
 load_dotenv()
@@ -27,61 +35,183 @@ SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 if not SUPABASE_URL or not SUPABASE_KEY:
     raise ValueError("Missing Supabase credentials. Please check your .env file.")
 
+# Question catalog cache lifetime; the catalog only changes when questions are edited
+QUESTIONS_CACHE_TTL = float(os.getenv("HHQ_QUESTIONS_CACHE_TTL", "300"))  # seconds
+
+# Client list paging (see clients_list_indexes.sql for the supporting indexes)
+CLIENT_PAGE_SIZE = 50
+CLIENT_PAGE_MAX = 200
+CLIENT_LIST_COLUMNS = ('id', 'first_name', 'last_name', 'date_of_birth', 'sex', 'phone', 'email', 'created_at')
+CLIENT_SEARCH_COLUMNS = ('first_name', 'last_name', 'email')
+
+# Bulk reads for cohort exports: client ids per in.() filter, and rows per request
+BULK_CLIENT_CHUNK = 50
+BULK_PAGE_SIZE = 1000
+
 # Connection pool settings
-MAX_POOL_SIZE = 5
-POOL_TIMEOUT = 30  # seconds
+MAX_POOL_SIZE = int(os.getenv("SUPABASE_POOL_SIZE", "5"))
+POOL_TIMEOUT = 30  # seconds to wait for a free client
 CONNECTION_TIMEOUT = 10  # seconds
+IDLE_CHECK_AFTER = 60  # only health-check clients that sat idle longer than this (seconds)
 
-# Global pool for connection reuse
-supabase_pool = []
+REST_URL = f"{SUPABASE_URL}/rest/v1"
+REST_HEADERS = {
+    "apikey": SUPABASE_KEY,
+    "Authorization": f"Bearer {SUPABASE_KEY}",
+    "Content-Type": "application/json",
+    "Accept": "application/json"
+}
 
-def get_supabase_client():
-    """Get a Supabase client from the pool or create a new one."""
-    global supabase_pool
-    
-    # Try to get an existing client from the pool
-    start_time = time.time()
-    while supabase_pool and (time.time() - start_time) < POOL_TIMEOUT:
-        client = supabase_pool.pop()
+# HTTP/2 needs the optional h2 package
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# One keep-alive connection pool for every PostgREST call in the process, so TLS
+# handshakes are paid once per connection instead of once per query
+http_transport = httpx.HTTPTransport(
+    http2=HTTP2_AVAILABLE,
+    limits=httpx.Limits(max_connections=MAX_POOL_SIZE * 2, max_keepalive_connections=MAX_POOL_SIZE),
+)
+
+# Shared client for direct REST queries
+rest_http = httpx.Client(base_url=REST_URL, headers=REST_HEADERS, timeout=30, transport=http_transport)
+
+
+class SupabaseClientPool:
+    """
+    Thread-safe, bounded pool of Supabase clients.
+
+    All clients send their PostgREST requests over the shared keep-alive transport.
+    A client is only health-checked when it is borrowed after sitting idle for longer
+    than idle_check_after; a failed check discards it and a fresh one is created.
+    Borrowers wait (up to timeout) when max_size clients are already out.
+    """
+
+    def __init__(self, max_size=MAX_POOL_SIZE, timeout=POOL_TIMEOUT, idle_check_after=IDLE_CHECK_AFTER):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle_check_after = idle_check_after
+        self._idle = []  # (client, returned_at) pairs, most recently returned last
+        self._size = 0  # clients created and not discarded, idle or borrowed
+        self._available = threading.Condition(threading.Lock())
+        self._metrics = {
+            'acquired': 0,
+            'created': 0,
+            'reused': 0,
+            'waited': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+            'health_checks': 0,
+            'discarded': 0,
+            'timeouts': 0,
+        }
+
+    def acquire(self):
+        """Borrow a client, creating one if the pool is below max_size."""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        while True:
+            with self._available:
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._metrics['timeouts'] += 1
+                        raise TimeoutError(f"No Supabase client available after {self.timeout}s")
+                    self._available.wait(remaining)
+                if self._idle:
+                    client, returned_at = self._idle.pop()
+                else:
+                    client, returned_at = None, None
+                    self._size += 1
+
+            if client is None:
+                try:
+                    client = self._create()
+                except Exception:
+                    self._discard()
+                    raise
+                self._record_acquire('created', start)
+                return client
+
+            if time.monotonic() - returned_at <= self.idle_check_after or self._healthy(client):
+                self._record_acquire('reused', start)
+                return client
+            self._discard()
+
+    def release(self, client):
+        """Return a borrowed client."""
+        if client is None:
+            return
+        with self._available:
+            self._idle.append((client, time.monotonic()))
+            self._available.notify()
+
+    def stats(self):
+        """Pool size and acquire/wait metrics for the debug views."""
+        with self._available:
+            stats = dict(self._metrics)
+            stats.update(size=self._size, idle=len(self._idle), in_use=self._size - len(self._idle),
+                         max_size=self.max_size, http2=HTTP2_AVAILABLE)
+        stats['wait_time_avg'] = stats['wait_time_total'] / stats['acquired'] if stats['acquired'] else 0.0
+        return stats
+
+    def _record_acquire(self, outcome, start):
+        waited = time.monotonic() - start
+        with self._available:
+            self._metrics[outcome] += 1
+            self._metrics['acquired'] += 1
+            self._metrics['wait_time_total'] += waited
+            self._metrics['wait_time_max'] = max(self._metrics['wait_time_max'], waited)
+            if waited > 0.001:
+                self._metrics['waited'] += 1
+
+    def _discard(self):
+        with self._available:
+            self._size -= 1
+            self._metrics['discarded'] += 1
+            self._available.notify()
+
+    def _healthy(self, client):
+        with self._available:
+            self._metrics['health_checks'] += 1
         try:
-            # Test the connection with a timeout
             client.table("clients").select("count").limit(1).execute()
-            return client
+            return True
         except Exception as e:
-            logger.warning("Failed to reuse client from pool: %s", str(e))
-            continue
-    
-    # Create a new client if pool is empty or all clients are invalid
-    try:
-        # Create client with default configuration
+            logger.warning("Discarding idle Supabase client: %s", str(e))
+            return False
+
+    @staticmethod
+    def _create():
         client = supabase_create_client(SUPABASE_URL, SUPABASE_KEY)
-        
-        # Add headers to the underlying session
-        if hasattr(client, 'postgrest'):
-            client.postgrest.session.headers.update({
-                "apikey": SUPABASE_KEY,
-                "Authorization": f"Bearer {SUPABASE_KEY}",
-                "Content-Type": "application/json",
-                "Accept": "application/json",
-                "Prefer": "return=representation"
-            })
-        
-        # Add the client to the pool
-        if not supabase_pool:
-            supabase_pool = []
-        supabase_pool.append(client)
-        
+        # Send PostgREST requests over the shared transport instead of a private connection pool
+        session = client.postgrest.session
+        session.headers.update({
+            "apikey": SUPABASE_KEY,
+            "Authorization": f"Bearer {SUPABASE_KEY}",
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+            "Prefer": "return=representation"
+        })
+        client.postgrest.session = SyncClient(base_url=session.base_url, headers=session.headers,
+                                              timeout=session.timeout, transport=http_transport)
+        session.close()
         return client
-        
+
+
+# Global pool for connection reuse
+supabase_pool = SupabaseClientPool()
+
+def get_supabase_client():
+    """Borrow a Supabase client from the pool."""
+    try:
+        return supabase_pool.acquire()
     except Exception as e:
-        logger.error("Failed to create new Supabase client: %s", str(e))
+        logger.error("Failed to get Supabase client: %s", str(e))
         raise
 
 def return_supabase_client(client):
     """Return a client to the pool for reuse."""
-    global supabase_pool
-    if len(supabase_pool) < MAX_POOL_SIZE:
-        supabase_pool.append(client)
+    supabase_pool.release(client)
 
 def retry_on_failure(max_retries=3, delay=1):
     """Decorator to retry database operations on failure."""
@@ -103,33 +233,124 @@ def retry_on_failure(max_retries=3, delay=1):
         return wrapper
     return decorator
 
+def request_memo(name):
+    """
+    Decorator memoizing a read for the rest of the current request (on flask.g).
+    Outside a request it simply calls through.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args):
+            if not has_request_context():
+                return func(*args)
+            memo = g.setdefault('_supabase_memo', {})
+            key = (name, *(str(arg) for arg in args))
+            if key not in memo:
+                memo[key] = func(*args)
+            return memo[key]
+        return wrapper
+    return decorator
+
+def forget_request_memo(name, *args):
+    """Drop a memoized read after a write in the same request."""
+    if has_request_context():
+        g.get('_supabase_memo', {}).pop((name, *(str(arg) for arg in args)), None)
+
+
+class QuestionCatalogCache:
+    """Process-wide TTL cache of the health history question catalog."""
+
+    def __init__(self, ttl=QUESTIONS_CACHE_TTL):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.version = 0
+        self._questions = None
+        self._variable_index = {}
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, loader):
+        """Cached catalog, loading it under the lock so concurrent misses fetch it once."""
+        with self._lock:
+            return list(self._current(loader))
+
+    def variable_index(self, loader):
+        """
+        Known answer names of the cached catalog, mapped to their variable_name.
+        Form field spellings (dashes replaced by underscores) are accepted too.
+        """
+        with self._lock:
+            questions = self._current(loader)
+            return self._variable_index if questions is self._questions else build_variable_index(questions)
+
+    def versioned(self, loader):
+        """
+        (version, catalog) without copying the catalog, which callers must not modify.
+        The version changes whenever a new catalog is loaded and is None if the load failed.
+        """
+        with self._lock:
+            questions = self._current(loader)
+            return (self.version if questions is self._questions else None), questions
+
+    def invalidate(self):
+        """Forget the catalog, e.g. after the questions table was edited."""
+        with self._lock:
+            self._questions = None
+            self._variable_index = {}
+            self._expires_at = 0.0
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'cached': self._questions is not None,
+                    'version': self.version, 'ttl': self.ttl}
+
+    def _current(self, loader):
+        if self._questions is not None and time.monotonic() < self._expires_at:
+            self.hits += 1
+            return self._questions
+        self.misses += 1
+        questions = loader()
+        # An empty catalog means the fetch failed; don't keep it
+        if questions:
+            self._questions = questions
+            self._variable_index = build_variable_index(questions)
+            self.version += 1
+            self._expires_at = time.monotonic() + self.ttl
+        return questions
+
+
+def build_variable_index(questions):
+    """{variable_name or form field name: variable_name} for every question."""
+    index = {}
+    for question in questions or []:
+        variable_name = question.get('variable_name')
+        if variable_name:
+            index[variable_name.replace('-', '_')] = variable_name
+            index[variable_name] = variable_name
+    return index
+
+
+question_catalog_cache = QuestionCatalogCache()
+
+def invalidate_question_cache():
+    """Explicitly drop the cached question catalog (process-wide and for this request)."""
+    question_catalog_cache.invalidate()
+    forget_request_memo('questions')
+
 @retry_on_failure()
 def fetch_clients():
-    """Fetch all clients from Supabase."""
-    client = get_supabase_client()
+    """Fetch all clients from Supabase. The clients list uses fetch_clients_page() instead."""
     try:
         logger.info("Attempting to fetch clients from Supabase...")
         
-        # Use explicit headers
-        headers = {
-            "apikey": SUPABASE_KEY,
-            "Authorization": f"Bearer {SUPABASE_KEY}",
-            "Content-Type": "application/json",
-            "Accept": "application/json"
-        }
-        
-        # Try direct REST query
-        url = f"{SUPABASE_URL}/rest/v1/clients"
-        logger.info(f"Querying URL: {url}")
-        
-        response = httpx.get(
-            url,
-            headers=headers,
+        # Direct REST query over the shared keep-alive client
+        response = rest_http.get(
+            "/clients",
             params={
                 "select": "*",
                 "order": "created_at.desc"
-            },
-            timeout=30
+            }
         )
         
         if response.status_code == 200:
@@ -148,8 +369,79 @@ def fetch_clients():
             logger.error(f"Response status: {e.response.status_code}")
             logger.error(f"Response body: {e.response.text}")
         return []
-    finally:
-        return_supabase_client(client)
+
+def _postgrest_value(value):
+    """Quote a filter value for use inside PostgREST or=/and= groups."""
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+def encode_client_cursor(client):
+    """Opaque keyset cursor pointing just after this client in the list order."""
+    raw = json.dumps([client['created_at'], str(client['id'])])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_client_cursor(cursor):
+    """(created_at, id) from a cursor, or None if it is not one of ours."""
+    try:
+        created_at, client_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(created_at), str(client_id)
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+def client_page_params(search=None, after=None, limit=CLIENT_PAGE_SIZE, columns=CLIENT_LIST_COLUMNS):
+    """
+    PostgREST query for one page of the clients list, newest first.
+
+    Pages are keyset-paginated on (created_at, id) so every page costs the same index
+    range scan however deep it is. Each search word must match a name or the email.
+    One extra row is requested to tell whether another page follows.
+    """
+    columns = [column for column in columns if column in CLIENT_LIST_COLUMNS] or list(CLIENT_LIST_COLUMNS)
+    # The cursor is built from these, so they are always selected
+    for column in ('created_at', 'id'):
+        if column not in columns:
+            columns.append(column)
+
+    conditions = []
+    for word in (search or '').split():
+        pattern = _postgrest_value(f"*{word}*")
+        conditions.append('or(' + ','.join(f"{column}.ilike.{pattern}" for column in CLIENT_SEARCH_COLUMNS) + ')')
+
+    position = decode_client_cursor(after) if after else None
+    if position:
+        created_at, client_id = (_postgrest_value(value) for value in position)
+        conditions.append(f"or(created_at.lt.{created_at},and(created_at.eq.{created_at},id.lt.{client_id}))")
+
+    params = {
+        'select': ','.join(columns),
+        'order': 'created_at.desc,id.desc',
+        'limit': str(min(max(int(limit), 1), CLIENT_PAGE_MAX) + 1),
+    }
+    if conditions:
+        params['and'] = '(' + ','.join(conditions) + ')'
+    return params
+
+def fetch_clients_page(search=None, after=None, limit=CLIENT_PAGE_SIZE, columns=CLIENT_LIST_COLUMNS):
+    """
+    One page of clients, filtered by name/email search on the server.
+    Returns {'clients': [...], 'next_cursor': cursor or None}.
+    """
+    params = client_page_params(search, after, limit, columns)
+    page_size = int(params['limit']) - 1
+    try:
+        response = rest_http.get("/clients", params=params)
+        if response.status_code != 200:
+            logger.error(f"Error response from Supabase: {response.status_code}")
+            logger.error(f"Response body: {response.text}")
+            return {'clients': [], 'next_cursor': None}
+
+        rows = response.json()
+        clients = rows[:page_size]
+        next_cursor = encode_client_cursor(clients[-1]) if len(rows) > page_size else None
+        logger.info(f"Fetched {len(clients)} clients (search={search!r}, more={next_cursor is not None})")
+        return {'clients': clients, 'next_cursor': next_cursor}
+    except Exception as e:
+        logger.error(f"Error fetching clients page from Supabase: {str(e)}")
+        return {'clients': [], 'next_cursor': None}
 
 @retry_on_failure()
 def create_client(client_data):
@@ -170,6 +462,7 @@ def update_client(client_id, client_data):
     client = get_supabase_client()
     try:
         result = client.table("clients").update(client_data).eq("id", client_id).execute()
+        forget_request_memo('client', client_id)
         return result.data[0] if result.data else None
     except Exception as e:
         print(f"Error updating client in Supabase: {e}")
@@ -183,6 +476,7 @@ def delete_client(client_id):
     client = get_supabase_client()
     try:
         client.table("clients").delete().eq("id", client_id).execute()
+        forget_request_memo('client', client_id)
         return True
     except Exception as e:
         print(f"Error deleting client from Supabase: {e}")
@@ -239,33 +533,20 @@ def fetch_hhq_by_token(token):
     finally:
         return_supabase_client(client)
 
+@request_memo('client')
 @retry_on_failure()
 def fetch_client_by_id(client_id):
     """Fetch client by ID with retry logic."""
-    client = get_supabase_client()
     try:
         logger.info(f"Attempting to fetch client with ID: {client_id}")
         
-        # Use explicit headers
-        headers = {
-            "apikey": SUPABASE_KEY,
-            "Authorization": f"Bearer {SUPABASE_KEY}",
-            "Content-Type": "application/json",
-            "Accept": "application/json"
-        }
-        
-        # Try direct REST query first
-        url = f"{SUPABASE_URL}/rest/v1/clients"
-        logger.info(f"Querying URL: {url}")
-        
-        response = httpx.get(
-            url,
-            headers=headers,
+        # Direct REST query over the shared keep-alive client
+        response = rest_http.get(
+            "/clients",
             params={
                 "id": f"eq.{client_id}",
                 "select": "*"
-            },
-            timeout=30
+            }
         )
         
         if response.status_code == 200:
@@ -288,11 +569,22 @@ def fetch_client_by_id(client_id):
             logger.error(f"Response status: {e.response.status_code}")
             logger.error(f"Response body: {e.response.text}")
         return None
-    finally:
-        return_supabase_client(client)
 
-@retry_on_failure()
+@request_memo('questions')
 def fetch_health_history_questions():
+    """Fetch health history questions, cached per request and process-wide for QUESTIONS_CACHE_TTL."""
+    return question_catalog_cache.get(_fetch_health_history_questions)
+
+def fetch_hhq_variable_index():
+    """Known HHQ variable names, from the same cached catalog as fetch_health_history_questions."""
+    return question_catalog_cache.variable_index(_fetch_health_history_questions)
+
+def fetch_versioned_health_history_questions():
+    """(catalog version, questions) from the cached catalog, for structures derived from it."""
+    return question_catalog_cache.versioned(_fetch_health_history_questions)
+
+@retry_on_failure()
+def _fetch_health_history_questions():
     """Fetch health history questions with retry logic."""
     client = get_supabase_client()
     try:
@@ -311,9 +603,48 @@ def fetch_health_history_questions():
     finally:
         return_supabase_client(client)
 
+# Unique key of hhq_responses rows (see hhq_responses_upsert_key.sql)
+HHQ_UPSERT_KEY = 'client_id,attempt_id,question_variable_name'
+
+def parse_hhq_response_value(response_value):
+    """Stored text of an HHQ answer back to True/False, or the text itself (height, weight)."""
+    # Convert response values back to boolean
+    if response_value.lower() in ['true', '1', 'yes']:
+        return True
+    if response_value.lower() in ['false', '0', 'no']:
+        return False
+    return response_value
+
+def hhq_response_value(variable_name, value):
+    """Stored text form of an HHQ answer."""
+    if variable_name in ['hh-height', 'hh-weight']:
+        # Store text values as-is for height and weight
+        return str(value) if value else ''
+    # Store boolean values as 'True'/'False' for other fields
+    return 'True' if value else 'False'
+
+def changed_hhq_answers(answers_dict, previous):
+    """The answers whose stored value differs from the previously saved answers."""
+    return {
+        variable_name: value for variable_name, value in answers_dict.items()
+        if variable_name not in previous
+        or hhq_response_value(variable_name, previous[variable_name]) != hhq_response_value(variable_name, value)
+    }
+
+def _upsert_hhq_rows(client, rows):
+    """Insert or update all rows in one request, keyed on HHQ_UPSERT_KEY."""
+    client.table('hhq_responses') \
+        .upsert(rows, on_conflict=HHQ_UPSERT_KEY, returning=ReturnMethod.minimal) \
+        .execute()
+
 @retry_on_failure()
-def upsert_individual_hhq_answers(client_id, answers_dict, attempt_id):
-    """Upsert HHQ answers for a specific attempt_id (do not create a new attempt_id unless a new link is generated)."""
+def upsert_individual_hhq_answers(client_id, answers_dict, attempt_id, previous=None):
+    """
+    Save the complete set of HHQ answers for a specific attempt_id (do not create a new attempt_id
+    unless a new link is generated). Every row is written in one upsert so they all carry the new
+    snapshot. Rows for questions no longer answered are removed; when the previously saved answers
+    are passed in, that extra delete is only sent if there actually are such rows.
+    """
     if not attempt_id:
         raise ValueError("attempt_id is required for upsert_individual_hhq_answers")
     client = get_supabase_client()
@@ -321,39 +652,31 @@ def upsert_individual_hhq_answers(client_id, answers_dict, attempt_id):
         taken_at = datetime.utcnow().isoformat()
         snapshot = json.dumps(answers_dict)  # Store full snapshot
 
-        payloads = []
-        for variable_name, value in answers_dict.items():
-            # Handle different value types based on the field
-            if variable_name in ['hh-height', 'hh-weight']:
-                # Store text values as-is for height and weight
-                response_value = str(value) if value else ''
-            else:
-                # Store boolean values as 'True'/'False' for other fields
-                response_value = 'True' if value else 'False'
-                
-            payloads.append({
-                'client_id': client_id,
-                'question_variable_name': variable_name,
-                'response_value': response_value,
-                'attempt_id': attempt_id,
-                'taken_at': taken_at,
-                'responses': snapshot
-            })
-        print(f"[DEBUG] Upserting for client_id={client_id} attempt_id={attempt_id} payloads={payloads}")
+        payloads = [{
+            'client_id': client_id,
+            'question_variable_name': variable_name,
+            'response_value': hhq_response_value(variable_name, value),
+            'attempt_id': attempt_id,
+            'taken_at': taken_at,
+            'responses': snapshot
+        } for variable_name, value in answers_dict.items()]
+        print(f"[DEBUG] Upserting for client_id={client_id} attempt_id={attempt_id} payloads={len(payloads)} items")
         if payloads:
-            # First, delete any existing responses for this client and attempt
-            client.table('hhq_responses').delete().eq('client_id', client_id).eq('attempt_id', attempt_id).execute()
-            # Then insert all responses in batches to improve performance
-            batch_size = 50  # Process in smaller batches to avoid timeouts
-            for i in range(0, len(payloads), batch_size):
-                batch = payloads[i:i + batch_size]
-                client.table('hhq_responses').insert(batch).execute()
-                print(f"[DEBUG] Inserted batch {i//batch_size + 1}/{(len(payloads) + batch_size - 1)//batch_size}")
-        return_supabase_client(client)
+            _upsert_hhq_rows(client, payloads)
+            stale = None if previous is None else [name for name in previous if name not in answers_dict]
+            if stale is None or stale:
+                query = client.table('hhq_responses').delete().eq('client_id', client_id).eq('attempt_id', attempt_id)
+                if stale:
+                    query = query.in_('question_variable_name', stale)
+                else:
+                    query = query.not_.in_('question_variable_name', list(answers_dict))
+                query.execute()
+            roadmap_cache.invalidate(client_id)
     except Exception as e:
         print(f"Error upserting answers for client {client_id}: {e}")
-        return_supabase_client(client)
         raise
+    finally:
+        return_supabase_client(client)
 
 @retry_on_failure()
 def fetch_hhq_responses_dict(client_id):
@@ -367,15 +690,7 @@ def fetch_hhq_responses_dict(client_id):
         
         responses = {}
         for row in result.data:
-            variable_name = row['question_variable_name']
-            response_value = row['response_value']
-            # Convert response values back to boolean
-            if response_value.lower() in ['true', '1', 'yes']:
-                responses[variable_name] = True
-            elif response_value.lower() in ['false', '0', 'no']:
-                responses[variable_name] = False
-            else:
-                responses[variable_name] = response_value
+            responses[row['question_variable_name']] = parse_hhq_response_value(row['response_value'])
                 
         return responses
     except Exception as e:
@@ -454,56 +769,41 @@ def fetch_hhq_responses_dict_for_attempt(client_id, attempt_id):
         return_supabase_client(client)
 
 @retry_on_failure()
-def upsert_hhq_answers_partial(client_id, answers_dict, attempt_id):
-    """Upsert only the provided HHQ answers without overwriting existing ones."""
+def upsert_hhq_answers_partial(client_id, answers_dict, attempt_id, previous=None):
+    """
+    Upsert only the provided HHQ answers without overwriting other ones, in one request.
+    Diff mode: when the previously saved answers are passed in, only changed answers are sent.
+    Returns the number of answers written.
+    """
     if not attempt_id:
         raise ValueError("attempt_id is required for upsert_hhq_answers_partial")
+    if previous is not None:
+        answers_dict = changed_hhq_answers(answers_dict, previous)
     if not answers_dict:
-        return  # Nothing to save
+        return 0  # Nothing to save
         
     client = get_supabase_client()
     try:
         taken_at = datetime.utcnow().isoformat()
         
-        payloads = []
-        for variable_name, value in answers_dict.items():
-            # Handle different value types based on the field
-            if variable_name in ['hh-height', 'hh-weight']:
-                # Store text values as-is for height and weight
-                response_value = str(value) if value else ''
-            else:
-                # Store boolean values as 'True'/'False' for other fields
-                response_value = 'True' if value else 'False'
-                
-            payloads.append({
-                'client_id': client_id,
-                'question_variable_name': variable_name,
-                'response_value': response_value,
-                'attempt_id': attempt_id,
-                'taken_at': taken_at,
-                'responses': json.dumps({variable_name: value})
-            })
+        payloads = [{
+            'client_id': client_id,
+            'question_variable_name': variable_name,
+            'response_value': hhq_response_value(variable_name, value),
+            'attempt_id': attempt_id,
+            'taken_at': taken_at,
+            'responses': json.dumps({variable_name: value})
+        } for variable_name, value in answers_dict.items()]
         
         print(f"[DEBUG] Partial upsert for client_id={client_id} attempt_id={attempt_id} payloads={len(payloads)} items")
-        
-        if payloads:
-            # Delete existing responses for these specific questions only
-            question_names = list(answers_dict.keys())
-            for question_name in question_names:
-                client.table('hhq_responses').delete().eq('client_id', client_id).eq('attempt_id', attempt_id).eq('question_variable_name', question_name).execute()
-            
-            # Insert new responses in batches
-            batch_size = 50
-            for i in range(0, len(payloads), batch_size):
-                batch = payloads[i:i + batch_size]
-                client.table('hhq_responses').insert(batch).execute()
-                print(f"[DEBUG] Inserted batch {i//batch_size + 1}/{(len(payloads) + batch_size - 1)//batch_size}")
-        
-        return_supabase_client(client)
+        _upsert_hhq_rows(client, payloads)
+        roadmap_cache.invalidate(client_id)
+        return len(payloads)
     except Exception as e:
         print(f"Error partial upserting answers for client {client_id}: {e}")
-        return_supabase_client(client)
         raise
+    finally:
+        return_supabase_client(client)
 
 @retry_on_failure()
 def save_lab_results(client_id, lab_results):
@@ -543,6 +843,7 @@ def save_lab_results(client_id, lab_results):
             
         # Insert into the lab_results table
         result = client.table('lab_results').insert(lab_entries).execute()
+        roadmap_cache.invalidate(client_id)
         
         if result.data:
             logger.info(f"Successfully saved {len(lab_entries)} lab results for client {client_id}")
@@ -593,6 +894,157 @@ def fetch_lab_results_for_client(client_id):
     finally:
         return_supabase_client(client)
 
+# Unique key of lab_panels rows (see lab_panels_table.sql): one snapshot per client per collection date
+LAB_PANEL_KEY = 'client_id,collected_on'
+# lab_panels columns a LabPanel is rebuilt from
+LAB_SNAPSHOT_COLUMNS = 'collected_on,panel_version,lab_values,test_names,derived'
+
+@retry_on_failure()
+def fetch_lab_panel_snapshot(client_id, collected_on=None):
+    """The newest stored panel for a client (or the one for collected_on), or None if there is none in the current format."""
+    client = get_supabase_client()
+    try:
+        query = client.table('lab_panels') \
+            .select(LAB_SNAPSHOT_COLUMNS) \
+            .eq('client_id', client_id) \
+            .eq('panel_version', LAB_PANEL_VERSION)
+        if collected_on:
+            query = query.eq('collected_on', collected_on)
+        result = query.order('collected_on', desc=True).limit(1).execute()
+        return LabPanel.from_snapshot(result.data[0]) if result.data else None
+    except Exception as e:
+        print(f"Error fetching lab panel snapshot for client {client_id}: {e}")
+        return None
+    finally:
+        return_supabase_client(client)
+
+def save_lab_panel(client_id, panel, collected_on):
+    """
+    Store a normalized panel with its derived values for one collection date. A panel
+    already stored for that date (another report from the same draw) is merged in.
+    """
+    existing = fetch_lab_panel_snapshot(client_id, collected_on)
+    if existing is not None:
+        panel = existing.merge(panel)
+    record = {
+        'client_id': str(client_id),
+        'collected_on': collected_on,
+        **panel.to_snapshot(),
+        'updated_at': datetime.utcnow().isoformat(),
+    }
+    client = get_supabase_client()
+    try:
+        client.table('lab_panels') \
+            .upsert(record, on_conflict=LAB_PANEL_KEY, returning=ReturnMethod.minimal) \
+            .execute()
+        roadmap_cache.invalidate(client_id)
+        logger.info(f"Saved lab panel for client {client_id} collected {collected_on}: {len(panel)} labs, {len(panel.derived)} derived")
+        return panel
+    except Exception as e:
+        logger.error(f"Error saving lab panel to Supabase: {str(e)}")
+        raise
+    finally:
+        return_supabase_client(client)
+
+@retry_on_failure()
+def fetch_lab_panel_for_client(client_id):
+    """
+    A client's lab values as a LabPanel: every stored snapshot merged oldest to newest,
+    plus lab_results rows for labs no snapshot covers (uploads from before snapshots
+    were kept). See LabPanel.combine().
+    """
+    client = get_supabase_client()
+    try:
+        snapshots = client.table('lab_panels') \
+            .select(LAB_SNAPSHOT_COLUMNS) \
+            .eq('client_id', client_id) \
+            .eq('panel_version', LAB_PANEL_VERSION) \
+            .order('collected_on') \
+            .execute()
+        rows = client.table('lab_results') \
+            .select(LAB_PANEL_COLUMNS) \
+            .eq('client_id', client_id) \
+            .order('uploaded_at,id') \
+            .execute()
+        return LabPanel.combine(snapshots.data, rows.data)
+    except Exception as e:
+        print(f"Error fetching lab panel for client {client_id}: {e}")
+        return LabPanel()
+    finally:
+        return_supabase_client(client)
+
+def _select_all(table, params, page_size=BULK_PAGE_SIZE):
+    """Every row of a REST query, requested page by page so server row limits don't truncate it."""
+    rows = []
+    while True:
+        response = rest_http.get(f"/{table}", params={**params, 'limit': str(page_size), 'offset': str(len(rows))})
+        if response.status_code != 200:
+            logger.error(f"Error response from Supabase for {table}: {response.status_code}")
+            logger.error(f"Response body: {response.text}")
+            response.raise_for_status()
+        page = response.json()
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+
+def _client_chunks(client_ids):
+    client_ids = [str(client_id) for client_id in dict.fromkeys(client_ids)]
+    for start in range(0, len(client_ids), BULK_CLIENT_CHUNK):
+        chunk = client_ids[start:start + BULK_CLIENT_CHUNK]
+        yield chunk, 'in.(' + ','.join(chunk) + ')'
+
+def fetch_clients_by_ids(client_ids):
+    """{client_id: client} for many clients, one request per BULK_CLIENT_CHUNK ids."""
+    clients = {}
+    for _, id_filter in _client_chunks(client_ids):
+        for row in _select_all('clients', {'select': '*', 'id': id_filter, 'order': 'id'}):
+            clients[str(row['id'])] = row
+    return clients
+
+def fetch_lab_panels_for_clients(client_ids):
+    """
+    {client_id: LabPanel} for many clients, as fetch_lab_panel_for_client() would return
+    them: all stored snapshots plus uncovered lab_results rows. Two requests per chunk.
+    """
+    panels = {}
+    for chunk, id_filter in _client_chunks(client_ids):
+        snapshots = {client_id: [] for client_id in chunk}
+        for row in _select_all('lab_panels', {
+            'select': f"client_id,{LAB_SNAPSHOT_COLUMNS}",
+            'client_id': id_filter,
+            'panel_version': f"eq.{LAB_PANEL_VERSION}",
+            # Oldest draw first per client, so newer values win when merged
+            'order': 'client_id,collected_on',
+        }):
+            snapshots[str(row['client_id'])].append(row)
+
+        rows = {client_id: [] for client_id in chunk}
+        for row in _select_all('lab_results', {
+            'select': f"client_id,{LAB_PANEL_COLUMNS}",
+            'client_id': id_filter,
+            # Oldest upload first, so the newest value of a repeated test wins (ids are random UUIDs)
+            'order': 'client_id,uploaded_at,id',
+        }):
+            rows[str(row['client_id'])].append(row)
+
+        for client_id in chunk:
+            panels[client_id] = LabPanel.combine(snapshots[client_id], rows[client_id])
+    return panels
+
+def fetch_hhq_responses_for_clients(client_ids):
+    """{client_id: responses dict} for many clients, as fetch_hhq_responses_dict() returns them."""
+    responses = {str(client_id): {} for client_id in client_ids}
+    for _, id_filter in _client_chunks(client_ids):
+        rows = _select_all('hhq_responses', {
+            'select': 'client_id,question_variable_name,response_value',
+            'client_id': id_filter,
+            # Oldest first, so the latest answer to a question wins
+            'order': 'client_id,created_at,id',
+        })
+        for row in rows:
+            responses[str(row['client_id'])][row['question_variable_name']] = parse_hhq_response_value(row['response_value'])
+    return responses
+
 # Optional: one-time manual test block
 if __name__ == "__main__":
     from pprint import pprint
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+
+"""
+Write-behind buffer for HHQ autosaves.
+Successive autosaves for one (client, attempt) are merged in a local SQLite journal and
+written to Supabase in bulk: on an interval, when the client navigates between sections,
+and on shutdown. Answers are journaled before the autosave is acknowledged, so a crash or
+restart loses nothing; leftover entries are flushed by the next process to start.
+"""
+
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_INTERVAL = 15.0  # seconds an answer may wait before the background flush writes it
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hhq_autosave_journal (
+    client_id TEXT NOT NULL,
+    attempt_id TEXT NOT NULL,
+    variable_name TEXT NOT NULL,
+    value TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (client_id, attempt_id, variable_name)
+);
+CREATE INDEX IF NOT EXISTS ix_hhq_autosave_journal_updated ON hhq_autosave_journal (updated_at);
+"""
+
+
+class AutosaveBuffer:
+    """
+    Journal of unsaved HHQ answers, one entry per (client, attempt, variable).
+
+    writer(client_id, answers, attempt_id) persists a batch; it is the bulk upsert in
+    production. A batch is only removed from the journal once the writer succeeded, and
+    only for answers that did not change again while it was being written.
+    """
+
+    def __init__(self, db_path: str, writer: Callable[[str, Dict[str, Any], str], Any],
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL):
+        self.db_path = db_path
+        self.writer = writer
+        self.flush_interval = flush_interval
+        self.flushes = 0
+        self.flushed_answers = 0
+        self.buffered_answers = 0
+        self.failures = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._start_lock = threading.Lock()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def add(self, client_id: str, attempt_id: str, answers: Dict[str, Any]) -> int:
+        """Merge an autosave into the journal; later values for a variable replace earlier ones."""
+        if not answers:
+            return 0
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO hhq_autosave_journal (client_id, attempt_id, variable_name, value, updated_at) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (client_id, attempt_id, variable_name) DO UPDATE "
+                "SET value = excluded.value, version = version + 1, updated_at = excluded.updated_at",
+                [(str(client_id), str(attempt_id), name, json.dumps(value), now) for name, value in answers.items()])
+        self.buffered_answers += len(answers)
+        self.start()
+        return len(answers)
+
+    def pending(self, client_id: str, attempt_id: str) -> Dict[str, Any]:
+        """Answers journaled for an attempt but not yet written."""
+        return dict(self._read(str(client_id), str(attempt_id))[0])
+
+    def flush(self, client_id: str, attempt_id: str) -> int:
+        """Write an attempt's pending answers now, e.g. before section navigation or the final submit."""
+        answers, versions = self._read(str(client_id), str(attempt_id))
+        if not answers:
+            return 0
+        self.writer(str(client_id), answers, str(attempt_id))
+        self._forget(str(client_id), str(attempt_id), versions)
+        self.flushes += 1
+        self.flushed_answers += len(answers)
+        return len(answers)
+
+    def flush_due(self, older_than: Optional[float] = None) -> int:
+        """Flush every attempt with an answer waiting longer than older_than seconds (all attempts when 0)."""
+        cutoff = time.time() - (self.flush_interval if older_than is None else older_than)
+        with self._connect() as conn:
+            keys = conn.execute(
+                "SELECT DISTINCT client_id, attempt_id FROM hhq_autosave_journal WHERE updated_at <= ?",
+                (cutoff,)).fetchall()
+        written = 0
+        for client_id, attempt_id in keys:
+            try:
+                written += self.flush(client_id, attempt_id)
+            except Exception as e:
+                # Entries stay journaled and are retried on the next flush
+                self.failures += 1
+                logger.warning("Autosave flush failed for client %s attempt %s: %s", client_id, attempt_id, str(e))
+        return written
+
+    def flush_all(self) -> int:
+        """Flush everything, e.g. on shutdown."""
+        return self.flush_due(older_than=0)
+
+    def start(self) -> None:
+        """Start the interval flusher (idempotent) and flush on interpreter shutdown."""
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='hhq-autosave-flusher', daemon=True)
+            self._thread.start()
+            atexit.register(self.shutdown)
+
+    def shutdown(self, timeout: Optional[float] = 5.0) -> int:
+        """Stop the flusher and write everything still pending."""
+        atexit.unregister(self.shutdown)
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        return self.flush_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            pending = conn.execute("SELECT COUNT(*) FROM hhq_autosave_journal").fetchone()[0]
+        return {
+            'pending': pending,
+            'buffered': self.buffered_answers,
+            'flushed': self.flushed_answers,
+            'flushes': self.flushes,
+            'failures': self.failures,
+        }
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.flush_interval / 2):
+            self.flush_due()
+
+    def _read(self, client_id: str, attempt_id: str) -> Tuple[Dict[str, Any], List[Tuple[str, int]]]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT variable_name, value, version FROM hhq_autosave_journal "
+                "WHERE client_id = ? AND attempt_id = ? ORDER BY variable_name",
+                (client_id, attempt_id)).fetchall()
+        return {name: json.loads(value) for name, value, _ in rows}, [(name, version) for name, _, version in rows]
+
+    def _forget(self, client_id: str, attempt_id: str, versions: List[Tuple[str, int]]) -> None:
+        # Answers re-saved while the batch was being written have a newer version and stay
+        with self._connect() as conn:
+            conn.executemany(
+                "DELETE FROM hhq_autosave_journal "
+                "WHERE client_id = ? AND attempt_id = ? AND variable_name = ? AND version = ?",
+                [(client_id, attempt_id, name, version) for name, version in versions])
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
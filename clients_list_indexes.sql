@@ -0,0 +1,11 @@
+-- Indexes for the paginated clients list in app/utils/supabase_client.py (fetch_clients_page)
+-- Single-client lookups use the primary key on clients.id
+
+-- Keyset pagination: ORDER BY created_at DESC, id DESC with (created_at, id) < cursor
+CREATE INDEX IF NOT EXISTS idx_clients_created_at_id ON clients (created_at DESC, id DESC);
+
+-- Name/email search: ILIKE '%word%' can use trigram indexes
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS idx_clients_first_name_trgm ON clients USING gin (first_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_clients_last_name_trgm ON clients USING gin (last_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_clients_email_trgm ON clients USING gin (email gin_trgm_ops);
@@ -19,6 +19,16 @@ class Config:
     # HHQ configuration
     HHQ_EXPIRATION_DAYS = 30
     HHQ_AUTOSAVE_INTERVAL = 60
+    HHQ_AUTOSAVE_FLUSH_INTERVAL = float(os.getenv('HHQ_AUTOSAVE_FLUSH_INTERVAL', '15'))
+
+    # Background lab upload jobs
+    LAB_JOB_WORKERS = int(os.getenv('LAB_JOB_WORKERS', '2'))
+    LAB_JOB_MAX_ATTEMPTS = int(os.getenv('LAB_JOB_MAX_ATTEMPTS', '3'))
+
+    # Roadmap and HHQ PDF rendering processes (0 renders in the request thread)
+    PDF_RENDER_WORKERS = int(os.getenv('PDF_RENDER_WORKERS', '2'))
+    PDF_RENDER_MAX_PENDING = int(os.getenv('PDF_RENDER_MAX_PENDING', '8'))
+    PDF_RENDER_TIMEOUT = float(os.getenv('PDF_RENDER_TIMEOUT', '120'))
     
     # Base URL
     BASE_URL = os.getenv('BASE_URL', 'http://localhost:5000')
@@ -0,0 +1,270 @@
+"""
+Declarative lab rules for Mind Stoke roadmap generator.
+Maps each lab to the keys it may be stored under and the value bands that
+trigger roadmap content controls.
+
+A rule stores the lab value under its control name, applies the standard
+LabRanges ladder (control-high, control-optimal, ...) when it names a range,
+and then applies each of its ladders. A ladder is an ordered list of
+(operator, threshold, controls) bands where the first matching band wins;
+an operator of None always matches. Ladders only run when the value is
+present, or non-zero when marked 'when': 'nonzero'.
+"""
+
+from typing import Dict
+
+
+# Keys each lab may be stored under, in lookup priority order
+LAB_ALIASES = {
+    # Inflammatory markers
+    'INFLAM_CRP': ['INFLAM_CRP', 'C-Reactive Protein, Cardiac'],
+    'INFLAM_HOMOCYS': ['INFLAM_HOMOCYS', 'Homocyst(e)ine'],
+    'INFLAM_URIC': ['INFLAM_URIC', 'Uric Acid'],
+
+    # Complete blood count
+    'CBC_WBC': ['CBC_WBC', 'WBC'],
+    'CBC_RBC': ['CBC_RBC', 'RBC'],
+    'CBC_HGB': ['CBC_HGB', 'Hemoglobin'],
+    'CBC_PLT': ['CBC_PLT', 'Platelets'],
+
+    # Comprehensive metabolic panel
+    'CHEM_GLU': ['CHEM_GLU', 'Glucose'],
+    'CHEM_BUN': ['CHEM_BUN', 'BUN'],
+    'CHEM_CREAT': ['CHEM_CREAT', 'Creatinine'],
+    'CHEM_EGFR': ['CHEM_EGFR', 'eGFR'],
+    'CHEM_NA': ['CHEM_NA', 'Sodium'],
+    'CHEM_K': ['CHEM_K', 'Potassium'],
+    'CHEM_CL': ['CHEM_CL', 'Chloride'],
+    'CHEM_CA': ['CHEM_CA', 'Calcium'],
+
+    # Lipid panel
+    'LIPID_CHOL': ['LIPID_CHOL', 'Cholesterol, Total'],
+    'LIPID_TRIG': ['LIPID_TRIG', 'Triglycerides'],
+    'LIPID_HDL': ['LIPID_HDL', 'HDL Cholesterol'],
+    'LIPID_LDL': ['LIPID_LDL', 'LDL Chol Calc (NIH)'],
+
+    # Liver function
+    'LFT_ALT': ['LFT_ALT', 'ALT (SGPT)'],
+    'LFT_AST': ['LFT_AST', 'AST (SGOT)'],
+    'LFT_ALKP': ['LFT_ALKP', 'Alkaline Phosphatase'],
+    'LFT_ALB': ['LFT_ALB', 'Albumin'],
+    'LFT_TP': ['LFT_TP', 'Total Protein'],
+
+    # Thyroid
+    'THY_TSH': ['THY_TSH', 'TSH'],
+    'THY_T3F': ['THY_T3F', 'Triiodothyronine (T3), Free'],
+    'THY_T4F': ['THY_T4F', 'T4, Free (Direct)'],
+
+    # Vitamins & minerals
+    'VIT_D25': ['VIT_D25', 'Vitamin D, 25-Hydroxy'],
+    'VIT_B12': ['VIT_B12', 'Vitamin B12'],
+    'VIT_FOLATE': ['VIT_FOLATE', 'Folate', 'Folic Acid'],
+    'VIT_E': ['VIT_E', 'Vitamin E (Alpha Tocopherol)'],
+    'MIN_ZN': ['MIN_ZN', 'Zinc, Plasma or Serum'],
+    'MIN_CU': ['MIN_CU', 'Copper, Serum or Plasma'],
+    'MIN_SE': ['MIN_SE', 'Selenium, Serum/Plasma'],
+    'MIN_MG_RBC': ['MIN_MG_RBC', 'Magnesium, RBC'],
+
+    # Hormones
+    'FHt_E2': ['FHt_E2', 'Estradiol'],
+    'FHt_PROG': ['FHt_PROG', 'Progesterone'],
+    'FHt_TEST': ['FHt_TEST', 'Testosterone'],
+    'MHt_TEST_TOT': ['MHt_TEST_TOT', 'Testosterone'],
+    'MHt_TEST_FREE': ['MHt_TEST_FREE', 'Free Testosterone'],
+    'MHt_PSA': ['MHt_PSA', 'PSA'],
+
+    # Omega fatty acids
+    'OMEGA_CHECK': ['OMEGA_CHECK', 'OmegaCheck(TM)'],
+    'OMEGA_6_3_RATIO': ['OMEGA_6_3_RATIO', 'Omega-6/Omega-3 Ratio'],
+    'OMEGA_AA_EPA': ['OMEGA_AA_EPA', 'Arachidonic Acid/EPA Ratio'],
+    'OMEGA_AA': ['OMEGA_AA', 'Arachidonic Acid'],
+
+    # Metabolic markers
+    'METAB_INS': ['METAB_INS', 'Insulin'],
+    'METAB_HBA1C': ['METAB_HBA1C', 'Hemoglobin A1c'],
+}
+
+
+# Vitamin D bands are mutually exclusive: exactly one is True for any value
+VITAMIN_D_BANDS = ['D-60+', 'D-55-59', 'D-50-55', 'D-50-59', 'D-40-49', 'D-30-39', 'D-less-30']
+
+
+def _vitamin_d_band(band: str, optimal: bool, supplement_row: bool) -> Dict[str, bool]:
+    """Controls for one Vitamin D band plus its parent section conditions."""
+    controls = {name: name == band for name in VITAMIN_D_BANDS}
+    controls.update({
+        'D-optimal': optimal,
+        'quick-VitD-row': supplement_row,
+        'quick-vitD-simple': not supplement_row,
+        'quick-VitD-row-takingD': False,
+    })
+    return controls
+
+
+LAB_RULES = [
+    # INFLAMMATORY MARKERS
+    {'lab': 'INFLAM_CRP', 'control': 'quick-CRP', 'range': 'CRP', 'ladders': [
+        {'bands': [
+            ('<=', 1.0, {'quick-CRP-above-optimal': True, 'quick-CRP-elevated': False}),
+            (None, None, {'quick-CRP-above-optimal': False, 'quick-CRP-elevated': True}),
+        ]},
+    ]},
+    {'lab': 'INFLAM_HOMOCYS', 'control': 'quick-homocysteine', 'range': 'Homocysteine', 'ladders': [
+        {'when': 'nonzero', 'store': ['homocysteine-value'], 'bands': [
+            ('>', 15.0, {'quick-homocysteine': True, 'quick-Homo12': True, 'quick-Homo15': True}),
+            ('>', 12.0, {'quick-homocysteine': True, 'quick-Homo12': True}),
+            ('>', 7.0, {'quick-homocysteine': True}),
+            (None, None, {'quick-homocysteine': False}),
+        ]},
+    ]},
+    {'lab': 'INFLAM_URIC', 'control': 'quick-uric-acid', 'range': 'UricAcid', 'ladders': [
+        {'bands': [
+            ('<=', 6.5, {'UricAcid65': True, 'uric-acid-elevated': False}),
+            ('>', 8.0, {'UricAcid65': False, 'uric-acid-elevated': True, 'uric-acid-very-high': True}),
+            (None, None, {'UricAcid65': False, 'uric-acid-elevated': True, 'uric-acid-very-high': False}),
+        ]},
+    ]},
+
+    # COMPLETE BLOOD COUNT
+    {'lab': 'CBC_WBC', 'control': 'quick-WBC', 'range': 'WBC'},
+    {'lab': 'CBC_RBC', 'control': 'quick-RBC', 'range': 'RBC'},
+    {'lab': 'CBC_HGB', 'control': 'quick-hemoglobin', 'range': 'Hemoglobin'},
+    {'lab': 'CBC_PLT', 'control': 'quick-platelets', 'range': 'Platelets'},
+
+    # COMPREHENSIVE METABOLIC PANEL
+    {'lab': 'CHEM_GLU', 'control': 'quick-glucose', 'range': 'Glucose', 'ladders': [
+        {'when': 'nonzero', 'bands': [
+            ('>=', 100, {'quick-glucose-elevated': True, 'glucose-elevated': True}),
+        ]},
+    ]},
+    {'lab': 'CHEM_BUN', 'control': 'quick-BUN', 'range': 'BUN'},
+    {'lab': 'CHEM_CREAT', 'control': 'quick-creatinine', 'range': 'Creatinine'},
+    {'lab': 'CHEM_EGFR', 'control': 'quick-eGFR', 'range': 'eGFR'},
+
+    # LIPID PANEL
+    {'lab': 'LIPID_CHOL', 'control': 'quick-TC', 'range': 'TotalCholesterol'},
+    {'lab': 'LIPID_TRIG', 'control': 'quick-trigly', 'range': 'Triglycerides', 'ladders': [
+        # Uncharacteristically low triglycerides point to the plasmalogen pathway
+        {'when': 'nonzero', 'bands': [
+            ('<', 50, {'trig-plasmalogens-row': True, 'trig-plasmalogens': True}),
+        ]},
+    ]},
+    {'lab': 'LIPID_HDL', 'control': 'quick-HDL', 'range': 'HDLCholesterol'},
+    {'lab': 'LIPID_LDL', 'control': 'quick-LDL', 'range': 'LDLCholesterol'},
+
+    # ELECTROLYTES
+    {'lab': 'CHEM_NA', 'control': 'quick-sodium', 'range': 'Sodium'},
+    {'lab': 'CHEM_K', 'control': 'quick-potassium', 'range': 'Potassium'},
+    {'lab': 'CHEM_CL', 'control': 'quick-chloride', 'range': 'Chloride'},
+    {'lab': 'CHEM_CA', 'control': 'quick-calcium', 'range': 'Calcium'},
+
+    # LIVER FUNCTION TESTS
+    {'lab': 'LFT_ALT', 'control': 'quick-ALT', 'range': 'ALT'},
+    {'lab': 'LFT_AST', 'control': 'quick-AST', 'range': 'AST'},
+    {'lab': 'LFT_ALKP', 'control': 'quick-alkaline-phosphatase', 'range': 'AlkalinePhosphatase'},
+    {'lab': 'LFT_ALB', 'control': 'quick-albumin', 'range': 'Albumin'},
+
+    # THYROID PANEL
+    {'lab': 'THY_TSH', 'control': 'quick-TSH', 'range': 'TSH'},
+    {'lab': 'THY_T3F', 'control': 'quick-T3', 'range': 'T3'},
+    {'lab': 'THY_T4F', 'control': 'quick-T4', 'range': 'T4'},
+
+    # VITAMINS & MINERALS
+    {'lab': 'VIT_D25', 'control': 'quick-VitD', 'range': 'VitaminD', 'ladders': [
+        {'bands': [
+            ('>=', 60, _vitamin_d_band('D-60+', optimal=True, supplement_row=False)),
+            ('>=', 55, _vitamin_d_band('D-55-59', optimal=False, supplement_row=False)),
+            ('>=', 50, _vitamin_d_band('D-50-55', optimal=False, supplement_row=False)),
+            ('>=', 40, _vitamin_d_band('D-40-49', optimal=False, supplement_row=True)),
+            ('>=', 30, _vitamin_d_band('D-30-39', optimal=False, supplement_row=True)),
+            (None, None, _vitamin_d_band('D-less-30', optimal=False, supplement_row=True)),
+        ]},
+    ]},
+    {'lab': 'VIT_B12', 'control': 'quick-B12', 'range': 'VitB12'},
+    {'lab': 'VIT_E', 'control': 'quick-vitE', 'range': 'VitaminE', 'ladders': [
+        {'bands': [
+            ('>=', 12, {'VitE12': True}),
+            ('>=', 8, {'quick-vitE-row': True}),
+            (None, None, {'quick-vitE-row-elevated': True}),
+        ]},
+        # Displayed with units; levels >= 12 are optimal, > 20 are elevated
+        {'when': 'nonzero', 'store': ['quick-vitE'], 'display': '{} mg/L', 'bands': [
+            ('>', 20.0, {'VitE12': True, 'quick-vitE-row-elevated': True}),
+            ('>=', 12.0, {'VitE12': True}),
+            ('<', 12.0, {'quick-vitE-row': True}),
+        ]},
+    ]},
+    {'lab': 'MIN_ZN', 'control': 'quick-zinc', 'range': 'Zinc'},
+    {'lab': 'MIN_CU', 'control': 'quick-copper', 'range': 'Copper'},
+    {'lab': 'MIN_SE', 'control': 'quick-selenium', 'range': 'Selenium', 'ladders': [
+        {'bands': [
+            ('<', 110, {'quick-selenium-low': True, 'quick-selen-110': True}),
+            ('<', 125, {'quick-selenium-low': True}),
+            (None, None, {'quick-selenium-optimal': True, 'Selenium125': True}),
+        ]},
+    ]},
+    {'lab': 'MIN_MG_RBC', 'control': 'quick-MagRBC', 'range': 'Magnesium', 'ladders': [
+        {'bands': [
+            ('<', 5.2, {'quick-MagRBC-low': True}),
+            (None, None, {'quick-MagRBC-optimal': True}),
+        ]},
+        # Borderline low range around the 5.2 threshold
+        {'bands': [
+            ('>', 5.2, {}),
+            ('>=', 5.0, {'quick-MagRBC-52': True}),
+        ]},
+    ]},
+
+    # HORMONES (gender-specific)
+    {'lab': 'FHt_E2', 'control': 'quick-estradiol', 'range': 'Estradiol', 'gender': 'female'},
+    {'lab': 'FHt_PROG', 'control': 'quick-progesterone', 'range': 'Progesterone', 'gender': 'female'},
+    {'lab': 'FHt_TEST', 'control': 'quick-testosterone', 'range': 'Testosterone', 'gender': 'female'},
+    {'lab': 'MHt_TEST_TOT', 'control': 'quick-testosterone', 'range': 'Testosterone', 'gender': 'male'},
+    {'lab': 'MHt_TEST_FREE', 'control': 'quick-free-testosterone', 'range': 'FreeTestosterone', 'gender': 'male'},
+    {'lab': 'MHt_PSA', 'control': 'quick-PSA', 'range': 'PSA', 'gender': 'male'},
+
+    # OMEGA FATTY ACIDS
+    {'lab': 'OMEGA_CHECK', 'control': 'OmegaCheck', 'range': 'OmegaCheck'},
+    {'lab': 'OMEGA_6_3_RATIO', 'control': 'lab-omega-6-3-ratio', 'range': 'Omega63Ratio'},
+    {'lab': 'OMEGA_AA_EPA', 'control': 'AAEPA', 'range': 'AAEPARatio'},
+    {'lab': 'OMEGA_AA', 'control': 'AA', 'range': 'ArachidonicAcid'},
+
+    # METABOLIC MARKERS
+    {'lab': 'METAB_INS', 'control': 'quick-insulin', 'range': 'Insulin', 'ladders': [
+        {'when': 'nonzero', 'store': ['quick-fasting-insulin'], 'bands': [
+            ('>=', 7, {'quick-fasting-insulin-elevated': True, 'insulin-elevated': True}),
+        ]},
+    ]},
+    {'lab': 'METAB_HBA1C', 'control': 'quick-HbA1c', 'range': 'HbA1c', 'ladders': [
+        {'when': 'nonzero', 'store': ['quick-a1c'], 'bands': [
+            ('>', 6.0, {'quick-A1c>6': True, 'quick-diabetes-risk': True}),
+            ('>', 5.6, {'quick-A1c>56': True, 'quick-diabetes-risk': True}),
+            (None, None, {'quick-A1c<56': True}),
+        ]},
+    ]},
+]
+
+
+# Values calculated from two labs, evaluated once both inputs are non-zero.
+# The name is the key under which stored lab panels keep the precomputed value.
+DERIVED_LAB_RULES = [
+    # Triglyceride to HDL ratio > 2 indicates insulin resistance
+    {'name': 'TRIG_HDL_RATIO', 'formula': 'ratio', 'inputs': ['LIPID_TRIG', 'LIPID_HDL'], 'store': ['quick-trig-HDL'], 'bands': [
+        ('>', 2.0, {'quick-trig-HDL-elevated': True, 'insulin-resistance-indicator': True}),
+    ]},
+    # Albumin to globulin ratio, where globulin is total protein minus albumin
+    {'name': 'AG_RATIO', 'formula': 'albumin_globulin', 'inputs': ['LFT_ALB', 'LFT_TP'], 'store': ['quick-AG-ratio'], 'bands': [
+        ('>=', 1.5, {'quick-AG-15': True, 'ag-ratio-optimal': True, 'ag-ratio-low': False}),
+        ('<', 1.2, {'quick-AG-15': False, 'ag-ratio-low': True, 'ag-ratio-optimal': False, 'ag-ratio-very-low': True}),
+        (None, None, {'quick-AG-15': False, 'ag-ratio-low': True, 'ag-ratio-optimal': False, 'ag-ratio-very-low': False}),
+    ]},
+    # Copper to zinc ratio; > 1.8 calls for liposomal zinc
+    {'name': 'CU_ZN_RATIO', 'formula': 'ratio', 'inputs': ['MIN_CU', 'MIN_ZN'], 'store': ['quick-CZratio-14'], 'bands': [
+        ('>', 1.8, {'quick-CZratio-14-elevated': True, 'zinc-liposomalC': True}),
+        ('>', 1.4, {'quick-CZratio-14-elevated': True}),
+        (None, None, {'quick-CZratio-14-optimal': True}),
+    ]},
+    {'name': 'HOMA_IR', 'formula': 'homa_ir', 'inputs': ['CHEM_GLU', 'METAB_INS'], 'store': ['quick-homa-IR', 'HOMA_IR'], 'bands': [
+        ('>=', 1.2, {'quick-homa-IR-elevated': True, 'HOMA-IR-elevated': True}),
+    ]},
+]
@@ -0,0 +1,13 @@
+-- Unique key for HHQ answers, required by the bulk upsert in app/utils/supabase_client.py
+-- (PostgREST on_conflict=client_id,attempt_id,question_variable_name)
+
+-- Remove duplicate answers left by earlier delete-then-insert saves, keeping the newest row
+DELETE FROM hhq_responses a
+USING hhq_responses b
+WHERE a.client_id = b.client_id
+  AND a.attempt_id = b.attempt_id
+  AND a.question_variable_name = b.question_variable_name
+  AND (a.created_at, a.id) < (b.created_at, b.id);
+
+ALTER TABLE hhq_responses
+    ADD CONSTRAINT unique_hhq_response_answer UNIQUE (client_id, attempt_id, question_variable_name);
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+
+"""
+Background job queue for Mind Stoke.
+Jobs are rows in a SQLite table (the app's instance database), so they survive restarts
+and can be polled from any worker process. A small thread pool claims and runs them
+off the request path, with retries and per-stage timings.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+RETRYING = 'retrying'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_RETRY_DELAY = 5.0  # seconds, doubled on every further attempt
+DEFAULT_LEASE_TIMEOUT = 600.0  # a running job not finished by then is considered abandoned
+DEFAULT_POLL_INTERVAL = 1.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS background_jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    stage TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    result TEXT,
+    error TEXT,
+    timings TEXT,
+    available_at REAL NOT NULL,
+    lease_expires_at REAL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_background_jobs_pending ON background_jobs (status, available_at);
+"""
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying cannot help, e.g. a PDF with no lab results."""
+
+
+class StageTimer:
+    """Records how long each stage of a job takes; the current stage is visible while it runs."""
+
+    def __init__(self, on_stage: Optional[Callable[[str], None]] = None):
+        self.timings: Dict[str, float] = {}
+        self._on_stage = on_stage
+
+    @contextmanager
+    def stage(self, name: str):
+        if self._on_stage:
+            self._on_stage(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = round(time.perf_counter() - start, 4)
+
+
+class JobQueue:
+    """
+    SQLite-backed queue with a worker thread pool.
+
+    Handlers are registered per job kind and called as handler(payload, stages), where
+    stages is a StageTimer, and whatever they return is stored as the job result.
+    Exceptions are retried with exponential backoff up to max_attempts, except
+    PermanentJobError, which fails the job at once. Workers start on the first submit,
+    so CLI commands that create the app never spawn threads.
+    """
+
+    def __init__(self, db_path: str, workers: int = DEFAULT_WORKERS,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS, retry_delay: float = DEFAULT_RETRY_DELAY,
+                 lease_timeout: float = DEFAULT_LEASE_TIMEOUT, poll_interval: float = DEFAULT_POLL_INTERVAL):
+        self.db_path = db_path
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.lease_timeout = lease_timeout
+        self.poll_interval = poll_interval
+        self._handlers: Dict[str, Callable[[Dict[str, Any], StageTimer], Any]] = {}
+        self._finalizers: Dict[str, Callable[[Dict[str, Any]], None]] = {}
+        self._threads: List[threading.Thread] = []
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._start_lock = threading.Lock()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def register(self, kind: str, handler: Callable[[Dict[str, Any], StageTimer], Any],
+                 finalizer: Optional[Callable[[Dict[str, Any]], None]] = None) -> None:
+        """Register the handler for a job kind; finalizer(payload) runs once the job succeeds or fails for good."""
+        self._handlers[kind] = handler
+        if finalizer:
+            self._finalizers[kind] = finalizer
+
+    def submit(self, kind: str, payload: Dict[str, Any], max_attempts: Optional[int] = None,
+               start_workers: bool = True) -> str:
+        """Queue a job and return its id."""
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind '{kind}'")
+        job_id = uuid.uuid4().hex
+        now = datetime.utcnow().isoformat()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO background_jobs (id, kind, payload, status, max_attempts, available_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), QUEUED, max_attempts or self.max_attempts, time.time(), now, now))
+        if start_workers:
+            self.start()
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Current state of a job, for status polling."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM background_jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        for column in ('payload', 'result', 'timings'):
+            job[column] = json.loads(job[column]) if job[column] else None
+        return job
+
+    def start(self) -> None:
+        """Start the worker threads (idempotent)."""
+        with self._start_lock:
+            if self._threads:
+                return
+            self._stopping.clear()
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"job-worker-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the workers after their current job."""
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def run_next(self) -> Optional[str]:
+        """Claim and run one due job in the calling thread; returns its id, or None if nothing was due."""
+        job = self._claim()
+        if job is None:
+            return None
+        self._run(job)
+        return job['id']
+
+    def _work(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                ran = self.run_next()
+            except Exception as e:
+                logger.error("Job worker error: %s", str(e))
+                ran = None
+            if ran is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # Due jobs, plus running jobs whose lease ran out because their worker died
+            row = conn.execute(
+                "SELECT * FROM background_jobs "
+                "WHERE (status IN (?, ?) AND available_at <= ?) OR (status = ? AND lease_expires_at < ?) "
+                "ORDER BY available_at LIMIT 1",
+                (QUEUED, RETRYING, now, RUNNING, now)).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE background_jobs SET status = ?, attempts = attempts + 1, lease_expires_at = ?, updated_at = ? "
+                "WHERE id = ?",
+                (RUNNING, now + self.lease_timeout, datetime.utcnow().isoformat(), row['id']))
+        job = dict(row)
+        job['attempts'] += 1
+        job['payload'] = json.loads(job['payload'])
+        return job
+
+    def _run(self, job: Dict[str, Any]) -> None:
+        stages = StageTimer(on_stage=lambda name: self._update(job['id'], stage=name))
+        handler = self._handlers.get(job['kind'])
+        try:
+            if handler is None:
+                raise PermanentJobError(f"No handler registered for job kind '{job['kind']}'")
+            result = handler(job['payload'], stages)
+        except Exception as e:
+            retry = not isinstance(e, PermanentJobError) and job['attempts'] < job['max_attempts']
+            logger.warning("Job %s (%s) attempt %d failed: %s", job['id'], job['kind'], job['attempts'], str(e))
+            if retry:
+                delay = self.retry_delay * (2 ** (job['attempts'] - 1))
+                self._update(job['id'], status=RETRYING, error=str(e), timings=json.dumps(stages.timings),
+                             available_at=time.time() + delay, lease_expires_at=None)
+                self._wakeup.set()
+                return
+            self._update(job['id'], status=FAILED, error=str(e), timings=json.dumps(stages.timings),
+                         lease_expires_at=None)
+        else:
+            self._update(job['id'], status=SUCCEEDED, stage=None, error=None, result=json.dumps(result),
+                         timings=json.dumps(stages.timings), lease_expires_at=None)
+        finalizer = self._finalizers.get(job['kind'])
+        if finalizer:
+            try:
+                finalizer(job['payload'])
+            except Exception as e:
+                logger.warning("Job %s finalizer failed: %s", job['id'], str(e))
+
+    def _update(self, job_id: str, **columns: Any) -> None:
+        columns['updated_at'] = datetime.utcnow().isoformat()
+        assignments = ', '.join(f"{column} = ?" for column in columns)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE background_jobs SET {assignments} WHERE id = ?", (*columns.values(), job_id))
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per operation keeps the queue usable from any thread
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("PRAGMA busy_timeout = 30000")
+            yield conn
+            if conn.in_transaction:
+                conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
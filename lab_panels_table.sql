@@ -0,0 +1,27 @@
+-- Normalized lab panels for Supabase
+-- One snapshot per client per collection date, written by the lab upload job
+-- (app/utils/lab_jobs.py) and read by the roadmap routes instead of re-parsing lab_results
+
+CREATE TABLE lab_panels (
+    id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+    client_id UUID NOT NULL REFERENCES clients(id) ON DELETE CASCADE,
+    collected_on DATE NOT NULL,
+
+    -- Format of the snapshot (LAB_PANEL_VERSION in app/utils/lab_panel.py)
+    panel_version INTEGER NOT NULL,
+
+    -- {ARMGASYS_VARIABLE: number or text}, {ARMGASYS_VARIABLE: test name on the report}
+    lab_values JSONB NOT NULL,
+    test_names JSONB NOT NULL DEFAULT '{}'::jsonb,
+
+    -- Derived values keyed by rule name: HOMA_IR, CU_ZN_RATIO, TRIG_HDL_RATIO, AG_RATIO
+    derived JSONB NOT NULL DEFAULT '{}'::jsonb,
+
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+
+    CONSTRAINT unique_lab_panel_per_draw UNIQUE (client_id, collected_on)
+);
+
+-- Newest panel per client
+CREATE INDEX idx_lab_panels_client_collected ON lab_panels(client_id, collected_on DESC);
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+
+"""
+Table-driven lab rule engine for the Mind Stoke roadmap generator.
+Compiles the declarative rules in config/lab_rules.py into bisect-based band
+lookups and evaluates every lab in a single loop.
+"""
+
+import math
+import operator
+from bisect import bisect_left
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config.lab_ranges import LabRanges, RangeBand
+from config.lab_rules import LAB_ALIASES, LAB_RULES, DERIVED_LAB_RULES
+
+OPERATORS = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+# Functions that combine a derived rule's inputs; None means the value is undefined
+DERIVED_FORMULAS = {
+    'ratio': lambda a, b: round(a / b, 2),
+    'albumin_globulin': lambda albumin, total_protein: (
+        round(albumin / (total_protein - albumin), 2) if total_protein - albumin > 0 else None
+    ),
+    'homa_ir': lambda glucose, insulin: round((insulin * glucose) / 405, 2),
+}
+
+Band = Tuple[Optional[str], Optional[float], Dict[str, Any]]
+
+
+# Controls set by each RangeBand label, as suffixes of the rule's control name
+RANGE_CONTROLS = {
+    'critical_high': ['-critical-high', '-elevated'],
+    'high': ['-high', '-elevated'],
+    'above_optimal': ['-above-optimal'],
+    'optimal': ['-optimal'],
+    'low': ['-low'],
+    'critical_low': ['-critical-low', '-low'],
+}
+
+
+def range_ladder(control: str, band: RangeBand) -> List[Band]:
+    """Standard threshold ladder for a LabRanges band, first match wins."""
+    return [(op, threshold, dict.fromkeys((control + suffix for suffix in RANGE_CONTROLS[label]), True))
+            for _, op, label, threshold in band.steps()]
+
+
+class BandLookup:
+    """
+    An ordered band ladder compiled into a bisect lookup.
+
+    The thresholds split the number line into points and the open intervals between
+    them; every value in one of those regions takes the same ladder branch, so each
+    region's controls are computed once at compile time.
+    """
+
+    __slots__ = ('edges', 'outcomes', 'nan_outcome')
+
+    def __init__(self, bands: List[Band]):
+        self.edges = sorted({threshold for op, threshold, _ in bands if op is not None})
+        representatives = []
+        for index, edge in enumerate(self.edges):
+            previous = self.edges[index - 1] if index else edge - 1
+            representatives.append((previous + edge) / 2)
+            representatives.append(edge)
+        representatives.append(self.edges[-1] + 1 if self.edges else 0)
+        self.outcomes = [self._match(bands, value) for value in representatives]
+        self.nan_outcome = self._match(bands, math.nan)
+
+    def regions(self, values: np.ndarray) -> np.ndarray:
+        """Vectorized lookup: the outcome index for each value, with NaN mapped past the end."""
+        edges = np.asarray(self.edges, dtype=float)
+        index = np.searchsorted(edges, values, side='left')
+        exact = np.zeros(len(values), dtype=bool)
+        inside = index < len(edges)
+        exact[inside] = edges[index[inside]] == values[inside]
+        regions = 2 * index + exact
+        regions[np.isnan(values)] = len(self.outcomes)
+        return regions
+
+    def lookup(self, value: float) -> Dict[str, Any]:
+        if value != value:
+            return self.nan_outcome
+        index = bisect_left(self.edges, value)
+        if index < len(self.edges) and self.edges[index] == value:
+            return self.outcomes[2 * index + 1]
+        return self.outcomes[2 * index]
+
+    @staticmethod
+    def _match(bands: List[Band], value: float) -> Dict[str, Any]:
+        for op, threshold, controls in bands:
+            if op is None or OPERATORS[op](value, threshold):
+                return controls
+        return {}
+
+
+class Ladder:
+    """A compiled rule ladder with its guard and the controls it stores the value under."""
+
+    __slots__ = ('bands', 'nonzero', 'store', 'display')
+
+    def __init__(self, spec: Dict[str, Any]):
+        self.bands = BandLookup(spec['bands'])
+        self.nonzero = spec.get('when') == 'nonzero'
+        self.store = spec.get('store', [])
+        self.display = spec.get('display')
+
+    def apply(self, processed: Dict[str, Any], value: float) -> None:
+        if self.nonzero and not value:
+            return
+        for control in self.store:
+            processed[control] = self.display.format(value) if self.display else value
+        processed.update(self.bands.lookup(value))
+
+    def apply_batch(self, columns: 'BatchColumns', rows: np.ndarray, values: np.ndarray) -> None:
+        """Vectorized apply() over the given rows; NaN values are treated as missing."""
+        guard = ~np.isnan(values)
+        if self.nonzero:
+            guard &= values != 0
+        if not guard.any():
+            return
+        for control in self.store:
+            stored = values[guard].tolist()
+            if self.display:
+                stored = [self.display.format(value) for value in stored]
+            columns.write(control, rows[guard], stored)
+        regions = self.bands.regions(values)
+        for region, outcome in enumerate(self.bands.outcomes + [self.bands.nan_outcome]):
+            if not outcome:
+                continue
+            mask = guard & (regions == region)
+            if mask.any():
+                for control, value in outcome.items():
+                    columns.write(control, rows[mask], value)
+
+
+class BatchColumns:
+    """Per-control columns for a batch evaluation, preserving last-write-wins semantics."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.assigned: Dict[str, np.ndarray] = {}
+        self.values: Dict[str, np.ndarray] = {}
+        self.flags: Dict[str, np.ndarray] = {}
+
+    def write(self, control: str, rows: np.ndarray, value: Any) -> None:
+        """Assign one value, or a list with one value per row, to the given rows."""
+        if control not in self.assigned:
+            self.assigned[control] = np.zeros(self.size, dtype=bool)
+            self.values[control] = np.empty(self.size, dtype=object)
+            self.flags[control] = np.zeros(self.size, dtype=bool)
+        self.assigned[control][rows] = True
+        self.values[control][rows] = value
+        self.flags[control][rows] = value is True
+
+    def write_flags(self, control: str, rows: np.ndarray, mask: np.ndarray) -> None:
+        """Assign True to the masked rows and False to the rest."""
+        self.write(control, rows[mask], True)
+        self.write(control, rows[~mask], False)
+
+    def flag(self, control: str) -> np.ndarray:
+        """Rows where the control is set to True."""
+        return self.flags.get(control, np.zeros(self.size, dtype=bool))
+
+    def numbers(self, control: str) -> np.ndarray:
+        """The control's numeric values, NaN where it is unset."""
+        numbers = np.full(self.size, np.nan)
+        assigned = self.assigned.get(control)
+        if assigned is not None:
+            numbers[assigned] = self.values[control][assigned].tolist()
+        return numbers
+
+    def matrix(self) -> Tuple[List[str], np.ndarray]:
+        """Control names and a rows x controls boolean matrix of the controls set to True."""
+        names = list(self.flags)
+        matrix = np.zeros((self.size, len(names)), dtype=bool)
+        for column, name in enumerate(names):
+            matrix[:, column] = self.flags[name]
+        return names, matrix
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """Content controls for every row, each dict in first-write order."""
+        rows: List[Dict[str, Any]] = [{} for _ in range(self.size)]
+        for control, assigned in self.assigned.items():
+            indices = np.flatnonzero(assigned)
+            for index, value in zip(indices.tolist(), self.values[control][indices].tolist()):
+                rows[index][control] = value
+        return rows
+
+
+class LabRuleEngine:
+    """Evaluates lab results against the rule table, compiled once per gender."""
+
+    def __init__(self, aliases: Dict[str, List[str]] = None, rules: List[Dict[str, Any]] = None,
+                 derived_rules: List[Dict[str, Any]] = None):
+        self.aliases = LAB_ALIASES if aliases is None else aliases
+        self.rules = LAB_RULES if rules is None else rules
+        self.derived_rules = DERIVED_LAB_RULES if derived_rules is None else derived_rules
+        self._compiled: Dict[str, List[Tuple[str, str, List[Ladder]]]] = {}
+        # Range ladders keyed by (control, band), shared by genders with the same band
+        self._range_ladders: Dict[Tuple[str, RangeBand], Ladder] = {}
+        self._derived = [(rule.get('name') or f"derived_{index}", rule['inputs'], DERIVED_FORMULAS[rule['formula']], Ladder(rule))
+                         for index, rule in enumerate(self.derived_rules)]
+
+        # Inverted alias index: result key -> [(lab, priority)]
+        self._alias_index: Dict[str, List[Tuple[str, int]]] = {}
+        for lab, keys in self.aliases.items():
+            for priority, key in enumerate(keys):
+                self._alias_index.setdefault(key, []).append((lab, priority))
+
+    def resolve(self, lab_results: Dict[str, Any]) -> Dict[str, float]:
+        """
+        Parse each lab once, in a single pass over the results. Where a lab is stored
+        under several keys, the highest-priority key with a numeric value wins.
+        """
+        values: Dict[str, float] = {}
+        priorities: Dict[str, int] = {}
+        for key, raw in lab_results.items():
+            targets = self._alias_index.get(key)
+            if not targets or raw is None:
+                continue
+            try:
+                value = float(raw)
+            except (ValueError, TypeError):
+                continue
+            for lab, priority in targets:
+                if priority < priorities.get(lab, len(self.aliases[lab])):
+                    values[lab] = value
+                    priorities[lab] = priority
+        return values
+
+    def derive(self, values: Dict[str, float]) -> Dict[str, float]:
+        """Derived values (ratios, HOMA-IR) of resolved lab values, keyed by rule name."""
+        derived: Dict[str, float] = {}
+        for name, inputs, formula, _ in self._derived:
+            operands = [values.get(lab) for lab in inputs]
+            if not all(operands):
+                continue
+            value = formula(*operands)
+            if value is not None:
+                derived[name] = value
+        return derived
+
+    def evaluate(self, lab_results: Dict[str, Any], gender: str,
+                 derived: Optional[Dict[str, float]] = None) -> Tuple[Dict[str, Any], Dict[str, float]]:
+        """
+        Evaluate all lab rules and derived values.
+
+        derived takes values precomputed by derive(), e.g. from a stored lab panel;
+        they are calculated from the results otherwise. Returns the content controls
+        together with the resolved lab values, so callers can build compound
+        conditions without re-parsing the results.
+        """
+        values = self.resolve(lab_results)
+        processed: Dict[str, Any] = {}
+
+        for lab, control, ladders in self._rules_for(gender):
+            value = values.get(lab)
+            if value is None:
+                continue
+            processed[control] = value
+            for ladder in ladders:
+                ladder.apply(processed, value)
+
+        if derived is None:
+            derived = self.derive(values)
+        for name, _, _, ladder in self._derived:
+            value = derived.get(name)
+            if value is not None:
+                ladder.apply(processed, value)
+
+        return processed, values
+
+    @property
+    def lab_columns(self) -> List[str]:
+        """Column order of the lab matrices used by evaluate_batch()."""
+        return list(self.aliases)
+
+    def build_lab_matrix(self, lab_results_list: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """Resolve each client's lab results into one row of a clients x labs matrix, NaN where missing."""
+        columns = {lab: index for index, lab in enumerate(self.aliases)}
+        matrix = np.full((len(lab_results_list), len(columns)), np.nan)
+        for row, lab_results in enumerate(lab_results_list):
+            for lab, value in self.resolve(lab_results).items():
+                matrix[row, columns[lab]] = value
+        return matrix
+
+    def evaluate_batch(self, labs_matrix: np.ndarray, genders: Sequence[str]) -> BatchColumns:
+        """
+        Evaluate the rule table for a whole cohort with vectorized band lookups.
+
+        labs_matrix is clients x lab_columns with NaN for missing labs. Each client's
+        row of the returned columns matches evaluate() for the same values.
+        """
+        labs_matrix = np.asarray(labs_matrix, dtype=float)
+        columns = BatchColumns(len(labs_matrix))
+        lab_index = {lab: index for index, lab in enumerate(self.aliases)}
+        genders = np.asarray(genders, dtype=object)
+
+        for gender in dict.fromkeys(genders.tolist()):
+            rows = np.flatnonzero(genders == gender)
+            cohort = labs_matrix[rows]
+            for lab, control, ladders in self._rules_for(gender):
+                values = cohort[:, lab_index[lab]]
+                present = ~np.isnan(values)
+                if not present.any():
+                    continue
+                columns.write(control, rows[present], values[present].tolist())
+                for ladder in ladders:
+                    ladder.apply_batch(columns, rows, values)
+
+        all_rows = np.arange(len(labs_matrix))
+        for _, inputs, formula, ladder in self._derived:
+            operands = [labs_matrix[:, lab_index[lab]] for lab in inputs]
+            usable = np.logical_and.reduce([~np.isnan(operand) & (operand != 0) for operand in operands])
+            derived = np.full(len(labs_matrix), np.nan)
+            for row in np.flatnonzero(usable):
+                value = formula(*(float(operand[row]) for operand in operands))
+                if value is not None:
+                    derived[row] = value
+            ladder.apply_batch(columns, all_rows, derived)
+
+        return columns
+
+    def _rules_for(self, gender: str) -> List[Tuple[str, str, List[Ladder]]]:
+        compiled = self._compiled.get(gender)
+        if compiled is None:
+            ranges = LabRanges.get_comprehensive_ranges(gender)
+            compiled = []
+            for rule in self.rules:
+                if rule.get('gender', gender) != gender:
+                    continue
+                ladders = []
+                if 'range' in rule:
+                    ladders.append(self._range_ladder(rule['control'], ranges[rule['range']]))
+                ladders.extend(Ladder(spec) for spec in rule.get('ladders', []))
+                compiled.append((rule['lab'], rule['control'], ladders))
+            self._compiled[gender] = compiled
+        return compiled
+
+    def _range_ladder(self, control: str, band: RangeBand) -> Ladder:
+        key = (control, band)
+        ladder = self._range_ladders.get(key)
+        if ladder is None:
+            ladder = self._range_ladders[key] = Ladder({'bands': range_ladder(control, band)})
+        return ladder
+
+
+# Shared by every RoadmapGenerator in the process
+lab_rule_engine = LabRuleEngine()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+
+"""
+PDF rendering service for Mind Stoke.
+ReportLab layout is CPU-bound and holds the GIL, so downloads hand their PDF to a
+pool of worker processes instead of building it in the request thread. Workers are
+started once, with the roadmap template and the shared PDF theme already loaded.
+"""
+
+import io
+import logging
+import math
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Job kinds
+ROADMAP_PDF = 'roadmap'
+HHQ_PDF = 'hhq'
+
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_PENDING = 8
+DEFAULT_TIMEOUT = 120.0
+LATENCY_WINDOW = 200  # recent jobs kept for the latency percentiles
+
+
+class RenderPoolSaturated(Exception):
+    """Raised when max_pending jobs are already queued or running; retry after retry_after seconds."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"PDF rendering is busy, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+# Per-process state of a worker, set up by warm_worker()
+_worker_generator = None
+
+
+def warm_worker() -> None:
+    """Load the template, styles and asset images once, when the worker process starts."""
+    global _worker_generator
+    from roadmap_generator import RoadmapGenerator
+    from pdf_theme import pdf_theme
+    _worker_generator = RoadmapGenerator()
+    for category, assets in pdf_theme.asset_config.get_all_assets().items():
+        for asset_name in assets:
+            pdf_theme.image_reader(category, asset_name)
+
+
+def render_roadmap_pdf(spec: Dict[str, Any]) -> bytes:
+    """Visual roadmap PDF for {'client_data', 'lab_results', 'hhq_responses'}."""
+    if _worker_generator is None:
+        warm_worker()
+    return _worker_generator.render_visual_pdf(spec['client_data'], spec['lab_results'], spec.get('hhq_responses'))
+
+
+def render_hhq_pdf(spec: Dict[str, Any]) -> bytes:
+    """HHQ report PDF for a spec from app.utils.pdf_generator.hhq_pdf_spec()."""
+    from app.utils.pdf_generator import build_hhq_pdf
+    buffer = io.BytesIO()
+    build_hhq_pdf(spec, buffer)
+    return buffer.getvalue()
+
+
+RENDERERS: Dict[str, Callable[[Dict[str, Any]], bytes]] = {
+    ROADMAP_PDF: render_roadmap_pdf,
+    HHQ_PDF: render_hhq_pdf,
+}
+
+
+def _run_job(kind: str, spec: Dict[str, Any]) -> Tuple[bytes, float]:
+    """Runs in the worker: the PDF bytes and how long the render itself took."""
+    start = time.perf_counter()
+    pdf = RENDERERS[kind](spec)
+    return pdf, time.perf_counter() - start
+
+
+class PDFRenderPool:
+    """
+    Bounded ProcessPoolExecutor for PDF jobs.
+
+    Jobs are a kind (ROADMAP_PDF, HHQ_PDF) plus a picklable spec and come back as PDF
+    bytes. At most max_pending jobs may be queued or running; further submits raise
+    RenderPoolSaturated with a Retry-After estimate rather than queueing without limit.
+    With workers=0 jobs render in the calling thread, for development and tests.
+    The pool starts on the first job, so CLI commands that create the app never fork.
+    Workers are spawned and re-import the launching script, so it must only create
+    the app under `if __name__ == '__main__'` (see run.py).
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, max_pending: int = DEFAULT_MAX_PENDING,
+                 timeout: float = DEFAULT_TIMEOUT, start_method: str = 'spawn'):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.start_method = start_method
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._pending = 0
+        # (total seconds, render seconds) of recent jobs; the difference is time spent queued
+        self._latencies: deque = deque(maxlen=LATENCY_WINDOW)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def render(self, kind: str, spec: Dict[str, Any]) -> bytes:
+        """Render a PDF and wait for it; raises RenderPoolSaturated when the queue is full."""
+        return self.submit(kind, spec).result(self.timeout)
+
+    def submit(self, kind: str, spec: Dict[str, Any]) -> Future:
+        """Queue a PDF job; the future resolves to the PDF bytes."""
+        if kind not in RENDERERS:
+            raise ValueError(f"Unknown PDF kind '{kind}'")
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise RenderPoolSaturated(self._retry_after())
+            self._pending += 1
+            self.submitted += 1
+        started = time.perf_counter()
+
+        if not self.workers:
+            result: Future = Future()
+            try:
+                result.set_result(self._finish(started, _run_job(kind, spec)))
+            except Exception as e:
+                self._fail(kind, e)
+                result.set_exception(e)
+            return result
+
+        try:
+            job = self._pool().submit(_run_job, kind, spec)
+        except Exception as e:
+            self._fail(kind, e)
+            raise
+        result = Future()
+
+        def done(job: Future) -> None:
+            try:
+                result.set_result(self._finish(started, job.result()))
+            except Exception as e:
+                self._fail(kind, e)
+                result.set_exception(e)
+
+        job.add_done_callback(done)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters and latency percentiles (seconds) for the debug views."""
+        with self._lock:
+            totals = sorted(total for total, _ in self._latencies)
+            renders = [render for _, render in self._latencies]
+            return {
+                'workers': self.workers,
+                'max_pending': self.max_pending,
+                'pending': self._pending,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'latency_p50': _percentile(totals, 0.5),
+                'latency_p95': _percentile(totals, 0.95),
+                'render_mean': round(sum(renders) / len(renders), 4) if renders else None,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                    initializer=warm_worker,
+                )
+            return self._executor
+
+    def _finish(self, started: float, outcome: Tuple[bytes, float]) -> bytes:
+        pdf, render_seconds = outcome
+        total = time.perf_counter() - started
+        with self._lock:
+            self._pending -= 1
+            self.completed += 1
+            self._latencies.append((total, render_seconds))
+        logger.debug("Rendered PDF in %.3fs (%.3fs queued)", total, total - render_seconds)
+        return pdf
+
+    def _fail(self, kind: str, error: Exception) -> None:
+        with self._lock:
+            self._pending -= 1
+            self.failed += 1
+        logger.error("PDF render (%s) failed: %s", kind, str(error))
+
+    def _retry_after(self) -> int:
+        """Seconds until a slot is likely free: the queue ahead of us at the recent mean latency."""
+        renders = [render for _, render in self._latencies]
+        mean = sum(renders) / len(renders) if renders else 1.0
+        return max(1, math.ceil(mean * self._pending / max(self.workers, 1)))
+
+
+def _percentile(values, fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    return round(values[min(len(values) - 1, int(fraction * len(values)))], 4)
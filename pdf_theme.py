@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+
+"""
+Shared ReportLab theme for Mind Stoke PDFs.
+The paragraph styles of the visual roadmap and the HHQ report are built once per
+process, and asset images are decoded once and reused by every document.
+"""
+
+import threading
+from typing import Dict, Optional
+
+from reportlab.lib import colors
+from reportlab.lib.colors import HexColor
+from reportlab.lib.styles import ParagraphStyle, StyleSheet1, getSampleStyleSheet
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import Flowable
+
+from config.assets import AssetConfig
+
+
+def build_style_sheet() -> StyleSheet1:
+    """ReportLab's sample styles plus the A MIND roadmap and HHQ report styles."""
+    styles = getSampleStyleSheet()
+
+    # Visual roadmap (RoadmapGenerator.generate_visual_pdf)
+    styles.add(ParagraphStyle(
+        'AMindTitle',
+        parent=styles['Heading1'],
+        fontSize=18,
+        spaceAfter=20,
+        textColor=colors.white,
+        backColor=HexColor('#4A90A4'),  # Blue header color
+        alignment=1,  # Center
+        borderPadding=10
+    ))
+    styles.add(ParagraphStyle(
+        'SectionHeader',
+        parent=styles['Heading2'],
+        fontSize=14,
+        spaceAfter=15,
+        spaceBefore=20,
+        textColor=colors.white,
+        backColor=colors.black,
+        alignment=1,
+        borderPadding=8
+    ))
+    styles.add(ParagraphStyle(
+        'AMindBody',
+        parent=styles['Normal'],
+        fontSize=10,
+        spaceAfter=8,
+        leading=12,
+        leftIndent=10,
+        rightIndent=10
+    ))
+    styles.add(ParagraphStyle(
+        'SupplementHighlight',
+        parent=styles['Normal'],
+        fontSize=10,
+        textColor=colors.black,
+        backColor=HexColor('#90EE90'),  # Light green
+        borderPadding=5,
+        spaceAfter=8
+    ))
+    styles.add(ParagraphStyle(
+        'SupplementTitle',
+        parent=styles['Heading1'],
+        fontSize=16,
+        spaceAfter=15,
+        spaceBefore=20
+    ))
+
+    # HHQ report (app/utils/pdf_generator.generate_hhq_pdf)
+    styles.add(ParagraphStyle(
+        'HHQSectionHeader',
+        parent=styles['Heading2'],
+        spaceAfter=12,
+        spaceBefore=24,
+        textColor=HexColor('#2C3E50')
+    ))
+    styles.add(ParagraphStyle(
+        'HHQQuestion',
+        parent=styles['Normal'],
+        fontName='Helvetica-Bold',
+        fontSize=10,
+        spaceAfter=6
+    ))
+    styles.add(ParagraphStyle(
+        'HHQAnswer',
+        parent=styles['Normal'],
+        fontName='Helvetica',
+        fontSize=10,
+        leftIndent=20,
+        spaceAfter=12
+    ))
+    return styles
+
+
+class CachedImage(Flowable):
+    """Image flowable drawn from an already decoded ImageReader."""
+
+    def __init__(self, reader: ImageReader, width: float, height: float):
+        super().__init__()
+        self.reader = reader
+        self.drawWidth = width
+        self.drawHeight = height
+
+    def wrap(self, availWidth, availHeight):
+        return self.drawWidth, self.drawHeight
+
+    def draw(self):
+        self.canv.drawImage(self.reader, 0, 0, self.drawWidth, self.drawHeight, mask='auto')
+
+
+class PDFTheme:
+    """
+    Styles and images shared by every PDF the app renders.
+
+    ParagraphStyles are read-only during doc.build(), so one style sheet serves all
+    documents. Asset images are opened through ImageReader on first use and the
+    reader (with its decoded pixels) is kept for later documents.
+    """
+
+    def __init__(self, asset_config: Optional[AssetConfig] = None):
+        self.asset_config = asset_config or AssetConfig()
+        self.styles = build_style_sheet()
+        self._images: Dict[str, ImageReader] = {}
+        self._lock = threading.Lock()
+
+    def image_reader(self, category: str, asset_name: str) -> Optional[ImageReader]:
+        """Decoded asset image, or None when the asset is not configured or missing."""
+        return self._reader(self.asset_config.get_asset_path(category, asset_name))
+
+    def image(self, category: str, asset_name: str, width: float, height: float,
+              h_align: str = 'CENTER') -> Optional[CachedImage]:
+        """Flowable for an asset image, or None when it is not available."""
+        return self._flowable(self.image_reader(category, asset_name), width, height, h_align)
+
+    def supplement_image(self, supplement_name: str, width: float, height: float,
+                         h_align: str = 'CENTER') -> Optional[CachedImage]:
+        """Flowable for a supplement's image, looked up by supplement name."""
+        reader = self._reader(self.asset_config.get_supplement_image(supplement_name))
+        return self._flowable(reader, width, height, h_align)
+
+    def _reader(self, path: Optional[str]) -> Optional[ImageReader]:
+        if not path:
+            return None
+        with self._lock:
+            reader = self._images.get(path)
+            if reader is None:
+                try:
+                    reader = ImageReader(path)
+                    # Decode now so documents share the pixel data instead of re-reading the file
+                    reader.getRGBData()
+                except Exception:
+                    # Missing files are not cached, so an asset added later is picked up
+                    return None
+                self._images[path] = reader
+            return reader
+
+    @staticmethod
+    def _flowable(reader: Optional[ImageReader], width: float, height: float,
+                  h_align: str) -> Optional[CachedImage]:
+        if reader is None:
+            return None
+        image = CachedImage(reader, width, height)
+        image.hAlign = h_align
+        return image
+
+
+# Shared by the roadmap and HHQ PDF builders
+pdf_theme = PDFTheme()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+
+"""
+Roadmap result cache for Mind Stoke roadmap generator.
+Generated roadmaps, and optionally rendered PDFs, are cached by a content hash of
+the client, lab and HHQ inputs plus the template version.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, Any, Optional, Set, Tuple
+
+from roadmap_incremental import IncrementalRoadmap
+
+# Defaults for the shared cache; the PDF tier is only enabled when a directory is configured
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_TTL = 3600.0
+DEFAULT_MAX_PDF_FILES = 64
+DEFAULT_MAX_PDF_BYTES = 256 * 1024 * 1024
+
+
+def roadmap_cache_key(kind: str, client_data: Dict[str, Any], lab_results: Dict[str, Any],
+                      hhq_responses: Optional[Dict[str, Any]], template_version: str) -> str:
+    """
+    Stable hash of the roadmap inputs. Key order does not matter, and today's date is
+    included because it is rendered into the roadmap.
+    """
+    payload = json.dumps({
+        'kind': kind,
+        'client': client_data,
+        'labs': dict(lab_results or {}),
+        'hhq': hhq_responses or {},
+        'template': template_version,
+        'date': datetime.now().strftime('%Y-%m-%d'),
+    }, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class RoadmapCache:
+    """
+    LRU/TTL cache in front of RoadmapGenerator.generate_roadmap and generate_visual_pdf.
+
+    Roadmap text is kept in memory. Rendered PDFs are kept as files in pdf_dir (when set)
+    and the memory tier only tracks their paths and sizes; the oldest files are removed
+    once there are more than max_pdf_files or they take more than max_pdf_bytes. Entries
+    are also indexed by client id, so writes of new lab or HHQ data can drop everything
+    cached for that client. A client's roadmap after such a write is updated from their
+    previous one (see roadmap_incremental), whose state survives the invalidation.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl: float = DEFAULT_TTL,
+                 pdf_dir: Optional[str] = None, max_pdf_files: int = DEFAULT_MAX_PDF_FILES,
+                 max_pdf_bytes: int = DEFAULT_MAX_PDF_BYTES):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.pdf_dir = pdf_dir
+        self.max_pdf_files = max_pdf_files
+        self.max_pdf_bytes = max_pdf_bytes
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._client_keys: Dict[str, Set[str]] = {}
+        self._pdf_bytes = 0
+        # Last roadmap state per client, for incremental regeneration; bounded like the entries
+        self._incremental: 'OrderedDict[str, IncrementalRoadmap]' = OrderedDict()
+        self._lock = threading.Lock()
+        if pdf_dir:
+            os.makedirs(pdf_dir, exist_ok=True)
+
+    def get_roadmap(self, generator, client_id: Optional[str], client_data: Dict[str, Any],
+                    lab_results: Dict[str, Any], hhq_responses: Dict[str, Any] = None) -> str:
+        """Cached generator.generate_roadmap()."""
+        key = roadmap_cache_key('roadmap', client_data, lab_results, hhq_responses,
+                                generator.compiled_template.version)
+        roadmap = self._get(key)
+        if roadmap is None:
+            if client_id is None:
+                roadmap = generator.generate_roadmap(client_data, lab_results, hhq_responses)
+            else:
+                roadmap = self._incremental_state(generator, client_id).update(client_data, lab_results, hhq_responses)
+            self._put(key, client_id, roadmap)
+        return roadmap
+
+    def get_visual_pdf(self, generator, client_id: Optional[str], client_data: Dict[str, Any],
+                       lab_results: Dict[str, Any], hhq_responses: Dict[str, Any] = None) -> str:
+        """Cached generator.generate_visual_pdf(); returns the PDF path."""
+        if not self.pdf_dir:
+            return generator.generate_visual_pdf(client_data, lab_results, hhq_responses)
+
+        key = roadmap_cache_key('visual_pdf', client_data, lab_results, hhq_responses,
+                                generator.compiled_template.version)
+        pdf_path = self._get(key)
+        if pdf_path is None or not os.path.exists(pdf_path):
+            pdf_path = self._store_pdf(key, client_id,
+                                       generator.render_visual_pdf(client_data, lab_results, hhq_responses))
+        return pdf_path
+
+    def visual_pdf_etag(self, generator, client_data: Dict[str, Any], lab_results: Dict[str, Any],
+                        hhq_responses: Dict[str, Any] = None) -> str:
+        """
+        The ETag get_visual_pdf_bytes() would return, computed without rendering, so a
+        revalidation whose If-None-Match still matches can get its 304 straight away.
+        """
+        return roadmap_cache_key('visual_pdf', client_data, lab_results, hhq_responses,
+                                 generator.compiled_template.version)
+
+    def get_visual_pdf_bytes(self, generator, client_id: Optional[str], client_data: Dict[str, Any],
+                             lab_results: Dict[str, Any], hhq_responses: Dict[str, Any] = None,
+                             render: Optional[Callable[..., bytes]] = None) -> Tuple[bytes, str]:
+        """
+        Cached generator.render_visual_pdf(); returns the PDF bytes and an ETag.
+
+        The ETag is the cache key, so it only changes when the roadmap inputs, the
+        template or the report date do. Without a pdf_dir the PDF is rendered in memory.
+        render replaces generator.render_visual_pdf on a miss, e.g. to use a process pool.
+        """
+        key = self.visual_pdf_etag(generator, client_data, lab_results, hhq_responses)
+        if self.pdf_dir:
+            pdf_path = self._get(key)
+            if pdf_path is not None:
+                try:
+                    with open(pdf_path, 'rb') as pdf_file:
+                        return pdf_file.read(), key
+                except OSError:
+                    pass
+        pdf = (render or generator.render_visual_pdf)(client_data, lab_results, hhq_responses)
+        if self.pdf_dir:
+            self._store_pdf(key, client_id, pdf)
+        return pdf, key
+
+    def _incremental_state(self, generator, client_id: str) -> IncrementalRoadmap:
+        """The client's incremental roadmap, started afresh when the template has changed."""
+        with self._lock:
+            state = self._incremental.get(str(client_id))
+            if state is None or state.template.version != generator.compiled_template.version:
+                state = self._incremental[str(client_id)] = IncrementalRoadmap(generator)
+            self._incremental.move_to_end(str(client_id))
+            while len(self._incremental) > self.max_entries:
+                self._incremental.popitem(last=False)
+            return state
+
+    def invalidate(self, client_id: Optional[str] = None) -> int:
+        """Drop every entry for a client, or the whole cache; returns the number dropped."""
+        with self._lock:
+            if client_id is None:
+                keys = list(self._entries)
+            else:
+                keys = list(self._client_keys.get(str(client_id), ()))
+            removed = [self._pop(key) for key in keys]
+            self.invalidations += 1
+        self._remove_files(entry for entry in removed if entry)
+        return sum(1 for entry in removed if entry)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for the debug views."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'invalidations': self.invalidations,
+                'pdf_dir': self.pdf_dir,
+                'pdf_bytes': self._pdf_bytes,
+                'incremental_clients': len(self._incremental),
+            }
+
+    def _get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['expires_at'] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry['value']
+            self.misses += 1
+            expired = self._pop(key) if entry is not None else None
+        if expired:
+            self._remove_files([expired])
+        return None
+
+    def _store_pdf(self, key: str, client_id: Optional[str], pdf: bytes) -> str:
+        pdf_path = os.path.join(self.pdf_dir, f"{key}.pdf")
+        # Write under a private name so readers never see a partial file
+        partial_path = f"{pdf_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(partial_path, 'wb') as pdf_file:
+            pdf_file.write(pdf)
+        os.replace(partial_path, pdf_path)
+        self._put(key, client_id, pdf_path, size=len(pdf))
+        return pdf_path
+
+    def _put(self, key: str, client_id: Optional[str], value: Any, size: Optional[int] = None) -> None:
+        """Store a value; size is given for PDF files, which count against the file budgets."""
+        with self._lock:
+            # A re-rendered PDF replaced the old file in place, so don't delete it below
+            self._pop(key)
+            evicted = []
+            self._entries[key] = {
+                'value': value,
+                'client_id': str(client_id) if client_id is not None else None,
+                'expires_at': time.monotonic() + self.ttl,
+                'is_file': size is not None,
+                'size': size or 0,
+            }
+            self._entries.move_to_end(key)
+            self._pdf_bytes += size or 0
+            if client_id is not None:
+                self._client_keys.setdefault(str(client_id), set()).add(key)
+
+            # Least recently used first, then the oldest PDFs beyond the file and byte budgets
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._pop(next(iter(self._entries))))
+            # (never the file just written, even when it alone exceeds max_pdf_bytes)
+            file_keys = [k for k, entry in self._entries.items() if entry['is_file'] and k != key]
+            while file_keys and (len(file_keys) >= self.max_pdf_files or self._pdf_bytes > self.max_pdf_bytes):
+                evicted.append(self._pop(file_keys.pop(0)))
+        self._remove_files(evicted)
+
+    def _pop(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.pop(key, None)
+        if entry:
+            self._pdf_bytes -= entry['size']
+        if entry and entry['client_id'] is not None:
+            keys = self._client_keys.get(entry['client_id'])
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._client_keys[entry['client_id']]
+        return entry
+
+    @staticmethod
+    def _remove_files(entries) -> None:
+        for entry in entries:
+            if entry and entry['is_file']:
+                try:
+                    os.remove(entry['value'])
+                except OSError:
+                    pass
+
+
+# Shared by every request in the process
+roadmap_cache = RoadmapCache(
+    pdf_dir=os.getenv('ROADMAP_PDF_CACHE_DIR'),
+    max_pdf_bytes=int(os.getenv('ROADMAP_PDF_CACHE_MAX_MB', DEFAULT_MAX_PDF_BYTES // (1024 * 1024))) * 1024 * 1024,
+)
@@ -1,21 +1,31 @@
 import re
 import json
+import io
 from datetime import datetime
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Mapping, Tuple
 import os
+import numpy as np
 from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image as RLImage, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
 from reportlab.lib.units import inch
-from reportlab.lib.colors import HexColor
 from reportlab.lib import colors
 from risk_factor_mapping import RiskFactorMapper
+from roadmap_template import CompiledTemplate, template_registry
+from pdf_theme import pdf_theme
+from lab_rule_engine import lab_rule_engine
 
 # Import configuration classes
 from config.lab_mappings import LAB_MAPPINGS
-from config.lab_ranges import LabRanges
+from config.lab_ranges import LabRanges, RangeBand
 from config.assets import AssetConfig
 
+# HHQ answers used by the lab compound conditions, in evaluate_batch() column order
+LAB_HHQ_COLUMNS = [
+    'hh_gout', 'hh_joint_pain', 'hh_arthritis',
+    'hh_alcohol_consumption', 'hh_drinks_alcohol', 'hh_alcohol_4days',
+    'hh_1to3_alcohol_week', 'hh_alcohol_daily',
+]
+
 class RoadmapGenerator:
     """
     Roadmap generation engine for Mind Stoke platform.
@@ -28,43 +38,17 @@ class RoadmapGenerator:
             template_path = "/Users/jstoker/Documents/mindstoke-server/roadmap-template/new-patient-roadmap.txt"
         
         self.template_path = template_path
-        self.template_content = self._load_template()
+        self.compiled_template = template_registry.get(template_path)
+        self.template_content = self.compiled_template.source
         
         # Initialize configuration objects
         self.asset_config = AssetConfig()
+        self.pdf_theme = pdf_theme
         self.lab_mappings = LAB_MAPPINGS
         
     def _load_template(self) -> str:
-        """Load the roadmap template file."""
-        encodings_to_try = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
-        
-        for encoding in encodings_to_try:
-            try:
-                with open(self.template_path, 'r', encoding=encoding) as file:
-                    content = file.read()
-                    # Clean up any problematic characters
-                    content = content.replace('\u2018', "'")  # Left single quotation mark
-                    content = content.replace('\u2019', "'")  # Right single quotation mark
-                    content = content.replace('\u201c', '"')  # Left double quotation mark
-                    content = content.replace('\u201d', '"')  # Right double quotation mark
-                    content = content.replace('\u2013', '-')  # En dash
-                    content = content.replace('\u2014', '—')  # Em dash
-                    content = content.replace('\u2026', '...')  # Horizontal ellipsis
-                    return content
-            except UnicodeDecodeError:
-                continue
-            except FileNotFoundError:
-                raise FileNotFoundError(f"Template file not found: {self.template_path}")
-            except Exception as e:
-                continue
-        
-        # If all encodings fail, try with error handling
-        try:
-            with open(self.template_path, 'r', encoding='utf-8', errors='replace') as file:
-                content = file.read()
-                return content
-        except Exception as e:
-            raise Exception(f"Error loading template: {str(e)}")
+        """Load the roadmap template, served from the process-wide template cache."""
+        return template_registry.get(self.template_path).source
     
     def generate_roadmap(self, client_data: Dict[str, Any], lab_results: Dict[str, Any], 
                         hhq_responses: Dict[str, Any] = None) -> str:
@@ -87,6 +71,11 @@ class RoadmapGenerator:
         # 2. Apply all processed content controls to the template
         roadmap = self._apply_content_controls_to_template(roadmap, processed_content)
         
+        return self._finish_roadmap(roadmap, client_data, lab_results, processed_content)
+    
+    def _finish_roadmap(self, roadmap: str, client_data: Dict[str, Any], lab_results: Dict[str, Any],
+                        processed_content: Dict[str, Any]) -> str:
+        """Whole-document passes that follow template rendering (steps 3-7 of generate_roadmap)."""
         # 3. Replace basic client information
         roadmap = self._replace_client_info(roadmap, client_data)
         
@@ -114,60 +103,18 @@ class RoadmapGenerator:
         """
         Apply all processed content controls to the roadmap template.
         This replaces content control placeholders with appropriate content or removes them.
+        The template is compiled once, so rendering is a single pass regardless of how many
+        controls were processed.
         """
-        # FIRST: Handle special MTHFR placeholders before general processing
         if 'MTHFR_C677T' in processed_content and 'MTHFR_A1298C' in processed_content:
-            mthfr_c677t = processed_content['MTHFR_C677T']
-            mthfr_a1298c = processed_content['MTHFR_A1298C']
-            
-            # Replace the literal placeholder text with variant names
-            roadmap = roadmap.replace('{{MTHFR_C677T}}', 'C677T')
-            roadmap = roadmap.replace('{{MTHFR_A1298C}}', 'A1298C')
-            
-            print(f"DEBUG: MTHFR placeholder replacement. C677T: {mthfr_c677t}, A1298C: {mthfr_a1298c}")
+            print(f"DEBUG: MTHFR placeholder replacement. C677T: {processed_content['MTHFR_C677T']}, A1298C: {processed_content['MTHFR_A1298C']}")
         
-        # THEN: Process all other content controls
-        for control_name, control_value in processed_content.items():
-            # Skip MTHFR placeholders as they're handled above
-            if control_name in ['MTHFR_C677T', 'MTHFR_A1298C']:
-                continue
-                
-            # Escape special regex characters in control name
-            escaped_control_name = re.escape(control_name)
-                
-            # Handle regular conditional blocks: {{#control_name}}content{{/control_name}}
-            block_pattern = f"{{{{#{escaped_control_name}}}}}(.*?){{{{/{escaped_control_name}}}}}"
-            
-            # Handle inverted conditional blocks: {{^control_name}}content{{/control_name}}
-            inverted_block_pattern = f"{{{{\\^{escaped_control_name}}}}}(.*?){{{{/{escaped_control_name}}}}}"
-            
-            if isinstance(control_value, bool):
-                if control_value:
-                    # Show regular conditional content, hide inverted conditional content
-                    def replace_block(match):
-                        return match.group(1)  # Return just the content without the markers
-                    roadmap = re.sub(block_pattern, replace_block, roadmap, flags=re.DOTALL)
-                    # Remove inverted conditional blocks (since condition is true)
-                    roadmap = re.sub(inverted_block_pattern, "", roadmap, flags=re.DOTALL)
-                else:
-                    # Hide regular conditional content, show inverted conditional content
-                    roadmap = re.sub(block_pattern, "", roadmap, flags=re.DOTALL)
-                    # Show inverted conditional content
-                    def replace_inverted_block(match):
-                        return match.group(1)  # Return just the content without the markers
-                    roadmap = re.sub(inverted_block_pattern, replace_inverted_block, roadmap, flags=re.DOTALL)
-            
-            # Handle simple placeholders: {{control_name}}
-            placeholder = f"{{{{{control_name}}}}}"
-            if isinstance(control_value, (str, int, float)):
-                # Replace with the actual value
-                roadmap = roadmap.replace(placeholder, str(control_value))
-            else:
-                # For complex values, convert to string or remove if empty
-                roadmap = roadmap.replace(placeholder, str(control_value) if control_value else "")
+        if roadmap == self.template_content:
+            template = self.compiled_template
+        else:
+            template = CompiledTemplate(roadmap)
         
-        # Remove the old MTHFR processing logic that was below
-        return roadmap
+        return template.render(processed_content)
     
     def _remove_content_control_section(self, roadmap: str, control_name: str) -> str:
         """
@@ -517,10 +464,18 @@ disease."""
         
         return recommendations
 
+    def render_visual_pdf(self, client_data: Dict[str, Any], lab_results: Dict[str, Any],
+                          hhq_responses: Dict[str, Any] = None) -> bytes:
+        """Build the visual roadmap PDF in memory and return its bytes; nothing is written to disk."""
+        buffer = io.BytesIO()
+        self.generate_visual_pdf(client_data, lab_results, hhq_responses, output_path=buffer)
+        return buffer.getvalue()
+
     def generate_visual_pdf(self, client_data: Dict[str, Any], lab_results: Dict[str, Any], 
-                           hhq_responses: Dict[str, Any] = None, output_path: str = None) -> str:
+                           hhq_responses: Dict[str, Any] = None, output_path=None):
         """
         Generate a professionally formatted roadmap PDF matching the A MIND template design.
+        output_path may be a file path or a binary file object (see render_visual_pdf).
         """
         if output_path is None:
             output_path = f"/tmp/roadmap_{client_data.get('name', 'client')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
@@ -534,60 +489,18 @@ disease."""
                                topMargin=50, bottomMargin=50)
         
         story = []
-        styles = getSampleStyleSheet()
-        
-        # Define custom styles matching the A MIND design
-        title_style = ParagraphStyle(
-            'AMindTitle',
-            parent=styles['Heading1'],
-            fontSize=18,
-            spaceAfter=20,
-            textColor=colors.white,
-            backColor=HexColor('#4A90A4'),  # Blue header color
-            alignment=1,  # Center
-            borderPadding=10
-        )
         
-        section_header_style = ParagraphStyle(
-            'SectionHeader',
-            parent=styles['Heading2'],
-            fontSize=14,
-            spaceAfter=15,
-            spaceBefore=20,
-            textColor=colors.white,
-            backColor=colors.black,
-            alignment=1,
-            borderPadding=8
-        )
-        
-        body_style = ParagraphStyle(
-            'AMindBody',
-            parent=styles['Normal'],
-            fontSize=10,
-            spaceAfter=8,
-            leading=12,
-            leftIndent=10,
-            rightIndent=10
-        )
-        
-        supplement_style = ParagraphStyle(
-            'SupplementHighlight',
-            parent=styles['Normal'],
-            fontSize=10,
-            textColor=colors.black,
-            backColor=HexColor('#90EE90'),  # Light green
-            borderPadding=5,
-            spaceAfter=8
-        )
+        # Styles and the logo come from the shared theme, built once per process
+        styles = self.pdf_theme.styles
+        title_style = styles['AMindTitle']
+        section_header_style = styles['SectionHeader']
+        body_style = styles['AMindBody']
+        supplement_style = styles['SupplementHighlight']
         
         # Add A MIND header/logo section
-        if self._image_exists('logos', 'main_logo'):
-            try:
-                logo = RLImage(self.asset_config.get_asset_path('logos', 'main_logo'), width=1.5*inch, height=0.75*inch)
-                logo.hAlign = 'LEFT'
-                story.append(logo)
-            except:
-                pass
+        logo = self.pdf_theme.image('logos', 'main_logo', width=1.5*inch, height=0.75*inch, h_align='LEFT')
+        if logo is not None:
+            story.append(logo)
         
         story.append(Spacer(1, 20))
         
@@ -661,9 +574,7 @@ baseline cognitive test so we can measure your progress.</b></font>"""
         
         # Supplements section
         supplements_title = "A Targeted Supplements Approach Can Improve Your Brain Health"
-        story.append(Paragraph(supplements_title, 
-                             ParagraphStyle('SupplementTitle', parent=styles['Heading1'], 
-                                          fontSize=16, spaceAfter=15, spaceBefore=20)))
+        story.append(Paragraph(supplements_title, styles['SupplementTitle']))
         
         supplements_intro = """Many individuals are using supplements on a regular basis. You may be using supplements because your 
 healthcare provider recommended it. You may be using supplements because you saw a commercial or read an 
@@ -1956,153 +1867,83 @@ METHYLPRO. The dosing is 1 capsule/day. We also recommend METHYLPRO B-COMPLEX +
             hhq_responses = {}
             
         processed_content = {}
-        
-        # 1. COMPREHENSIVE LAB VALUE PROCESSING
-        # Process every single lab value with intelligent thresholds
-        processed_content.update(self._process_all_lab_values_comprehensive(client_data, lab_results, hhq_responses))
-        
-        # 2. HHQ-BASED CONDITIONS
-        # Process all HHQ responses for content triggers
-        processed_content.update(self._process_hhq_based_conditions(hhq_responses, lab_results))
-        
-        # 3. COMPOUND CONDITIONS
-        # Create sophisticated lab + HHQ combination conditions
-        ranges = self._get_comprehensive_lab_ranges(client_data.get('gender', 'unknown'))
-        processed_content.update(self._process_compound_conditions(lab_results, hhq_responses, ranges))
-        
-        # 4. GENETIC PROCESSING
-        # Handle APO E and MTHFR genetics
-        processed_content.update(self._process_genetics_comprehensive(lab_results))
-        
-        # 5. CBC AND COAGULATION INSIGHTS PROCESSING
-        # Handle CBC and coagulation markers for Other Insights section
-        processed_content.update(self._process_cbc_and_coagulation_insights(lab_results, hhq_responses, ranges))
-        
-        # 6. BMI AND WEIGHT INSIGHTS PROCESSING
-        # Handle BMI calculations and weight-related conditions for Body Weight section
-        processed_content.update(self._process_bmi_and_weight_insights(client_data, hhq_responses))
-        
-        # 7. RISK PROFILE INSIGHTS PROCESSING
-        # Handle risk factor analysis for Other Insights section
-        processed_content.update(self._process_risk_profile_insights(hhq_responses))
-        
-        # 8. SAFETY NETS - Ensure critical controls are always evaluated
-        processed_content.update(self._apply_safety_nets(lab_results, hhq_responses, client_data))
+        for _, stage in self._content_control_stages(client_data):
+            processed_content.update(stage(lab_results, hhq_responses))
         
         return processed_content
     
+    def _content_control_stages(self, client_data: Dict[str, Any]) -> List[Tuple[str, Any]]:
+        """
+        The content control stages in evaluation order, as (name, stage(lab_results, hhq_responses)).
+        Each stage reads only its inputs, never the other stages' output, and later stages
+        win where they set the same control; roadmap_incremental relies on both.
+        """
+        ranges = self._get_comprehensive_lab_ranges(client_data.get('gender', 'unknown'))
+        return [
+            # 1. COMPREHENSIVE LAB VALUE PROCESSING
+            # Process every single lab value with intelligent thresholds
+            ('lab_values', lambda labs, hhq: self._process_all_lab_values_comprehensive(client_data, labs, hhq)),
+            
+            # 2. HHQ-BASED CONDITIONS
+            # Process all HHQ responses for content triggers
+            ('hhq', lambda labs, hhq: self._process_hhq_based_conditions(hhq, labs)),
+            
+            # 3. COMPOUND CONDITIONS
+            # Create sophisticated lab + HHQ combination conditions
+            ('compound', lambda labs, hhq: self._process_compound_conditions(labs, hhq, ranges)),
+            
+            # 4. GENETIC PROCESSING
+            # Handle APO E and MTHFR genetics
+            ('genetics', lambda labs, hhq: self._process_genetics_comprehensive(labs)),
+            
+            # 5. CBC AND COAGULATION INSIGHTS PROCESSING
+            # Handle CBC and coagulation markers for Other Insights section
+            ('cbc_coagulation', lambda labs, hhq: self._process_cbc_and_coagulation_insights(labs, hhq, ranges)),
+            
+            # 6. BMI AND WEIGHT INSIGHTS PROCESSING
+            # Handle BMI calculations and weight-related conditions for Body Weight section
+            ('bmi_weight', lambda labs, hhq: self._process_bmi_and_weight_insights(client_data, hhq)),
+            
+            # 7. RISK PROFILE INSIGHTS PROCESSING
+            # Handle risk factor analysis for Other Insights section
+            ('risk_profile', lambda labs, hhq: self._process_risk_profile_insights(hhq)),
+            
+            # 8. SAFETY NETS - Ensure critical controls are always evaluated
+            ('safety_nets', lambda labs, hhq: self._apply_safety_nets(labs, hhq, client_data)),
+        ]
+    
     def _process_all_lab_values_comprehensive(self, client_data: Dict[str, Any], lab_results: Dict[str, Any], hhq_responses: Dict[str, Any]) -> Dict[str, Any]:
         """
         Process ALL lab values comprehensively using intelligent thresholds.
         This ensures every lab result triggers appropriate content controls.
+        
+        Single-lab bands and derived ratios come from the rule table in config/lab_rules.py;
+        only conditions that combine several labs or HHQ answers are evaluated here.
         """
         if hhq_responses is None:
             hhq_responses = {}
             
-        processed = {}
         gender = client_data.get('gender', 'unknown').lower()
-        
-        # Get comprehensive lab ranges for this gender
-        ranges = self._get_comprehensive_lab_ranges(gender)
-        
-        # INFLAMMATORY MARKERS
-        self._evaluate_lab_threshold(processed, lab_results, 'INFLAM_CRP', 'C-Reactive Protein, Cardiac', 
-                                   'quick-CRP', ranges['CRP'])
-        self._evaluate_lab_threshold(processed, lab_results, 'INFLAM_HOMOCYS', 'Homocyst(e)ine', 
-                                   'quick-homocysteine', ranges['Homocysteine'])
-        self._evaluate_lab_threshold(processed, lab_results, 'INFLAM_URIC', 'Uric Acid', 
-                                   'quick-uric-acid', ranges['UricAcid'])
-        
-        # Add specific CRP processing for inflammation section
-        crp = self._get_lab_value(lab_results, ['INFLAM_CRP', 'C-Reactive Protein, Cardiac'])
-        if crp is not None:
-            processed['quick-CRP'] = crp
-            
-            if crp <= 1.0:  # Optimal CRP
-                processed['quick-CRP-above-optimal'] = True  # For optimal message
-                processed['quick-CRP-elevated'] = False
-            else:  # Elevated CRP > 1.0
-                processed['quick-CRP-above-optimal'] = False  # Hide optimal message  
-                processed['quick-CRP-elevated'] = True
-        
-        # Add homocysteine-specific processing
-        homocysteine = self._get_lab_value(lab_results, ['INFLAM_HOMOCYS', 'Homocyst(e)ine'])
-        if homocysteine:
-            processed['homocysteine-value'] = homocysteine
-            
-            # Check for elevated levels and sub-conditions
-            if homocysteine > 7.0:  # Above optimal goal
-                processed['quick-homocysteine'] = True  # Override any value set by threshold evaluation
-                
-                # Sub-condition: Levels > 12 → Trimethylglycine
-                if homocysteine > 12.0:
-                    processed['quick-Homo12'] = True
-                    
-                # Sub-condition: Levels > 15 → Creatine monohydrate 
-                if homocysteine > 15.0:
-                    processed['quick-Homo15'] = True
-            else:
-                # Explicitly set to False for optimal levels (override threshold evaluation)
-                processed['quick-homocysteine'] = False
-            
-            # Always store related B vitamin values for the template
-            b12 = self._get_lab_value(lab_results, ['VIT_B12', 'Vitamin B12'])
+        # Stored lab panels carry their derived ratios precomputed at upload
+        processed, labs = lab_rule_engine.evaluate(lab_results, gender, derived=getattr(lab_results, 'derived', None))
+        self._process_lab_compound_conditions(processed, labs, lab_results, hhq_responses)
+        return processed
+    
+    def _process_lab_compound_conditions(self, processed: Dict[str, Any], labs: Dict[str, float],
+                                         lab_results: Dict[str, Any], hhq_responses: Dict[str, Any]) -> None:
+        """Conditions that combine several labs, genetics or HHQ answers, applied to processed in place."""
+        # Related B vitamin values for the homocysteine section
+        if labs.get('INFLAM_HOMOCYS'):
+            b12 = labs.get('VIT_B12')
             if b12:
                 processed['quick-B12-value'] = b12
-                
-            # Look for folate/folic acid values
-            folate = self._get_lab_value(lab_results, ['VIT_FOLATE', 'Folate', 'Folic Acid'])
-            if folate:
-                processed['quick-folic-acid-value'] = folate
-            else:
-                processed['quick-folic-acid-value'] = 'Not Available'
-        
-        # COMPLETE BLOOD COUNT  
-        self._evaluate_lab_threshold(processed, lab_results, 'CBC_WBC', 'WBC', 
-                                   'quick-WBC', ranges['WBC'])
-        self._evaluate_lab_threshold(processed, lab_results, 'CBC_RBC', 'RBC', 
-                                   'quick-RBC', ranges['RBC'])
-        self._evaluate_lab_threshold(processed, lab_results, 'CBC_HGB', 'Hemoglobin', 
-                                   'quick-hemoglobin', ranges['Hemoglobin'])
-        self._evaluate_lab_threshold(processed, lab_results, 'CBC_PLT', 'Platelets', 
-                                   'quick-platelets', ranges['Platelets'])
-        
-        # COMPREHENSIVE METABOLIC PANEL
-        self._evaluate_lab_threshold(processed, lab_results, 'CHEM_GLU', 'Glucose', 
-                                   'quick-glucose', ranges['Glucose'])
-        self._evaluate_lab_threshold(processed, lab_results, 'CHEM_BUN', 'BUN', 
-                                   'quick-BUN', ranges['BUN'])
-        self._evaluate_lab_threshold(processed, lab_results, 'CHEM_CREAT', 'Creatinine', 
-                                   'quick-creatinine', ranges['Creatinine'])
-        self._evaluate_lab_threshold(processed, lab_results, 'CHEM_EGFR', 'eGFR', 
-                                   'quick-eGFR', ranges['eGFR'])
-        
-        # LIPID PANEL - COMPREHENSIVE CHOLESTEROL PROCESSING
-        self._evaluate_lab_threshold(processed, lab_results, 'LIPID_CHOL', 'Cholesterol, Total', 
-                                   'quick-TC', ranges['TotalCholesterol'])
-        self._evaluate_lab_threshold(processed, lab_results, 'LIPID_TRIG', 'Triglycerides', 
-                                   'quick-trigly', ranges['Triglycerides'])
-        self._evaluate_lab_threshold(processed, lab_results, 'LIPID_HDL', 'HDL Cholesterol', 
-                                   'quick-HDL', ranges['HDLCholesterol'])
-        self._evaluate_lab_threshold(processed, lab_results, 'LIPID_LDL', 'LDL Chol Calc (NIH)', 
-                                   'quick-LDL', ranges['LDLCholesterol'])
-        
-        # CALCULATE TRIGLYCERIDE TO HDL RATIO
-        triglycerides = self._get_lab_value(lab_results, ['LIPID_TRIG', 'Triglycerides'])
-        hdl = self._get_lab_value(lab_results, ['LIPID_HDL', 'HDL Cholesterol'])
-        
-        if triglycerides and hdl:
-            trig_hdl_ratio = round(triglycerides / hdl, 2)
-            processed['quick-trig-HDL'] = trig_hdl_ratio
-            
-            # Triglyceride to HDL ratio > 2 indicates insulin resistance
-            if trig_hdl_ratio > 2.0:
-                processed['quick-trig-HDL-elevated'] = True
-                processed['insulin-resistance-indicator'] = True
+            processed['quick-folic-acid-value'] = labs.get('VIT_FOLATE') or 'Not Available'
         
         # CHOLESTEROL THRESHOLD CONDITIONS
-        total_chol = self._get_lab_value(lab_results, ['LIPID_CHOL', 'Cholesterol, Total'])
-        ldl = self._get_lab_value(lab_results, ['LIPID_LDL', 'LDL Chol Calc (NIH)'])
+        total_chol = labs.get('LIPID_CHOL')
+        ldl = labs.get('LIPID_LDL')
+        triglycerides = labs.get('LIPID_TRIG')
+        hdl = labs.get('LIPID_HDL')
         
         # Trigger cholesterol-row for elevated total cholesterol or LDL
         if (total_chol and total_chol > 200) or (ldl and ldl > 100):
@@ -2120,78 +1961,10 @@ METHYLPRO. The dosing is 1 capsule/day. We also recommend METHYLPRO B-COMPLEX +
         if has_cardiovascular_risk:
             processed['quick-MK2'] = True
             processed['mk2-cardiovascular-support'] = True
-            
-        # VERY LOW TRIGLYCERIDES - PLASMALOGEN PATHWAY
-        if triglycerides and triglycerides < 50:  # Uncharacteristically low
-            processed['trig-plasmalogens-row'] = True
-            processed['trig-plasmalogens'] = True
-        
-        # ELECTROLYTES
-        self._evaluate_lab_threshold(processed, lab_results, 'CHEM_NA', 'Sodium', 
-                                   'quick-sodium', ranges['Sodium'])
-        self._evaluate_lab_threshold(processed, lab_results, 'CHEM_K', 'Potassium', 
-                                   'quick-potassium', ranges['Potassium'])
-        self._evaluate_lab_threshold(processed, lab_results, 'CHEM_CL', 'Chloride', 
-                                   'quick-chloride', ranges['Chloride'])
-        self._evaluate_lab_threshold(processed, lab_results, 'CHEM_CA', 'Calcium', 
-                                   'quick-calcium', ranges['Calcium'])
-        
-        # LIVER FUNCTION TESTS
-        self._evaluate_lab_threshold(processed, lab_results, 'LFT_ALT', 'ALT (SGPT)', 
-                                   'quick-ALT', ranges['ALT'])
-        self._evaluate_lab_threshold(processed, lab_results, 'LFT_AST', 'AST (SGOT)', 
-                                   'quick-AST', ranges['AST'])
-        self._evaluate_lab_threshold(processed, lab_results, 'LFT_ALKP', 'Alkaline Phosphatase', 
-                                   'quick-alkaline-phosphatase', ranges['AlkalinePhosphatase'])
-        self._evaluate_lab_threshold(processed, lab_results, 'LFT_ALB', 'Albumin', 
-                                   'quick-albumin', ranges['Albumin'])
-        
-        # ALBUMIN TO GLOBULIN RATIO (A/G RATIO) PROCESSING
-        albumin = self._get_lab_value(lab_results, ['LFT_ALB', 'Albumin'])
-        total_protein = self._get_lab_value(lab_results, ['LFT_TP', 'Total Protein'])
-        
-        if albumin and total_protein:
-            globulin = total_protein - albumin
-            if globulin > 0:
-                ag_ratio = round(albumin / globulin, 2)
-                processed['quick-AG-ratio'] = ag_ratio
-                
-                # A/G Ratio evaluation 
-                if ag_ratio >= 1.5:  # Optimal A/G ratio
-                    processed['quick-AG-15'] = True
-                    processed['ag-ratio-optimal'] = True
-                    processed['ag-ratio-low'] = False
-                else:  # Low A/G ratio <1.5
-                    processed['quick-AG-15'] = False
-                    processed['ag-ratio-low'] = True
-                    processed['ag-ratio-optimal'] = False
-                    
-                    # Very low A/G ratio requires more aggressive intervention
-                    if ag_ratio < 1.2:
-                        processed['ag-ratio-very-low'] = True
-                    else:
-                        processed['ag-ratio-very-low'] = False
         
-        # URIC ACID COMPREHENSIVE PROCESSING
-        uric_acid = self._get_lab_value(lab_results, ['INFLAM_URIC', 'Uric Acid'])
+        # Gout risk assessment - uric acid >6.5 + history of gout or joint pain
+        uric_acid = labs.get('INFLAM_URIC')
         if uric_acid is not None:
-            processed['quick-uric-acid'] = uric_acid
-            
-            # Uric acid threshold conditions
-            if uric_acid <= 6.5:  # Optimal uric acid
-                processed['UricAcid65'] = True
-                processed['uric-acid-elevated'] = False
-            else:  # Elevated uric acid >6.5 mg/dL
-                processed['UricAcid65'] = False
-                processed['uric-acid-elevated'] = True
-                
-                # Sub-condition for very high uric acid
-                if uric_acid > 8.0:
-                    processed['uric-acid-very-high'] = True
-                else:
-                    processed['uric-acid-very-high'] = False
-            
-            # Gout risk assessment - uric acid >6.5 + history of gout or joint pain
             gout_history = (hhq_responses and (
                 hhq_responses.get('hh_gout', False) or
                 hhq_responses.get('hh_joint_pain', False) or
@@ -2217,7 +1990,7 @@ METHYLPRO. The dosing is 1 capsule/day. We also recommend METHYLPRO B-COMPLEX +
         
         # A/G Ratio + Alcohol interaction
         # Low A/G ratio with alcohol consumption = compound liver/protein synthesis issue
-        if (albumin and total_protein and 
+        if (labs.get('LFT_ALB') and labs.get('LFT_TP') and 
             alcohol_consumption and 
             processed.get('ag-ratio-low', False)):
             processed['quick-AG-ETOH'] = True
@@ -2231,147 +2004,18 @@ METHYLPRO. The dosing is 1 capsule/day. We also recommend METHYLPRO B-COMPLEX +
         else:
             processed['quick-uric-acid-ETOH'] = False
         
-        # THYROID PANEL
-        self._evaluate_lab_threshold(processed, lab_results, 'THY_TSH', 'TSH', 
-                                   'quick-TSH', ranges['TSH'])
-        self._evaluate_lab_threshold(processed, lab_results, 'THY_T3F', 'Triiodothyronine (T3), Free', 
-                                   'quick-T3', ranges['T3'])
-        self._evaluate_lab_threshold(processed, lab_results, 'THY_T4F', 'T4, Free (Direct)', 
-                                   'quick-T4', ranges['T4'])
-        
-        # VITAMINS & MINERALS
-        self._evaluate_lab_threshold(processed, lab_results, 'VIT_D25', 'Vitamin D, 25-Hydroxy', 
-                                   'quick-VitD', ranges['VitaminD'])
-        self._evaluate_lab_threshold(processed, lab_results, 'VIT_B12', 'Vitamin B12', 
-                                   'quick-B12', ranges['VitB12'])
-        self._evaluate_lab_threshold(processed, lab_results, 'VIT_E', 'Vitamin E (Alpha Tocopherol)', 
-                                   'quick-vitE', ranges['VitaminE'])
-        
-        # Add vitamin E-specific processing
-        vit_e = self._get_lab_value(lab_results, ['VIT_E', 'Vitamin E (Alpha Tocopherol)'])
-        if vit_e:
-            processed['quick-vitE'] = f"{vit_e} mg/L"  # Display format with units
-            
-            # Sub-condition: VitE12 (levels >= 12 are optimal)
-            if vit_e >= 12.0:
-                processed['VitE12'] = True
-                
-            # Sub-condition: quick-vitE-row (levels < 12 need supplementation)  
-            elif vit_e < 12.0:
-                processed['quick-vitE-row'] = True
-                
-            # Sub-condition: quick-vitE-row-elevated (very high levels > 20)
-            if vit_e > 20.0:
-                processed['quick-vitE-row-elevated'] = True
-        
-        self._evaluate_lab_threshold(processed, lab_results, 'MIN_ZN', 'Zinc, Plasma or Serum', 
-                                   'quick-zinc', ranges['Zinc'])
-        self._evaluate_lab_threshold(processed, lab_results, 'MIN_CU', 'Copper, Serum or Plasma', 
-                                   'quick-copper', ranges['Copper'])
-        self._evaluate_lab_threshold(processed, lab_results, 'MIN_SE', 'Selenium, Serum/Plasma', 
-                                   'quick-selenium', ranges['Selenium'])
-        self._evaluate_lab_threshold(processed, lab_results, 'MIN_MG_RBC', 'Magnesium, RBC', 
-                                   'quick-MagRBC', ranges['Magnesium'])
-        
-        # CALCULATE COPPER TO ZINC RATIO
-        copper = self._get_lab_value(lab_results, ['MIN_CU', 'Copper, Serum or Plasma'])
-        zinc = self._get_lab_value(lab_results, ['MIN_ZN', 'Zinc, Plasma or Serum'])
-        
-        if copper and zinc:
-            cz_ratio = round(copper / zinc, 2)
-            processed['quick-CZratio-14'] = cz_ratio
-            
-            # Trigger elevated condition if ratio > 1.4
-            if cz_ratio > 1.4:
-                processed['quick-CZratio-14-elevated'] = True
-                
-                # Enhanced treatment for significantly elevated ratios (>1.8) or additional risk factors
-                if cz_ratio > 1.8:
-                    processed['zinc-liposomalC'] = True
-            else:
-                processed['quick-CZratio-14-optimal'] = True
-        
-        # HORMONES (Gender-specific)
-        if gender == 'female':
-            self._evaluate_lab_threshold(processed, lab_results, 'FHt_E2', 'Estradiol', 
-                                       'quick-estradiol', ranges['Estradiol'])
-            self._evaluate_lab_threshold(processed, lab_results, 'FHt_PROG', 'Progesterone', 
-                                       'quick-progesterone', ranges['Progesterone'])
-            self._evaluate_lab_threshold(processed, lab_results, 'FHt_TEST', 'Testosterone', 
-                                       'quick-testosterone', ranges['Testosterone'])
-        elif gender == 'male':
-            self._evaluate_lab_threshold(processed, lab_results, 'MHt_TEST_TOT', 'Testosterone', 
-                                       'quick-testosterone', ranges['Testosterone'])
-            self._evaluate_lab_threshold(processed, lab_results, 'MHt_TEST_FREE', 'Free Testosterone', 
-                                       'quick-free-testosterone', ranges['FreeTestosterone'])
-            self._evaluate_lab_threshold(processed, lab_results, 'MHt_PSA', 'PSA', 
-                                       'quick-PSA', ranges['PSA'])
-        
-        # OMEGA FATTY ACIDS
-        self._evaluate_lab_threshold(processed, lab_results, 'OMEGA_CHECK', 'OmegaCheck(TM)', 
-                                   'OmegaCheck', ranges['OmegaCheck'])
-        self._evaluate_lab_threshold(processed, lab_results, 'OMEGA_6_3_RATIO', 'Omega-6/Omega-3 Ratio', 
-                                   'lab-omega-6-3-ratio', ranges['Omega63Ratio'])
-        self._evaluate_lab_threshold(processed, lab_results, 'OMEGA_AA_EPA', 'Arachidonic Acid/EPA Ratio', 
-                                   'AAEPA', ranges['AAEPARatio'])
-        self._evaluate_lab_threshold(processed, lab_results, 'OMEGA_AA', 'Arachidonic Acid', 
-                                   'AA', ranges['ArachidonicAcid'])
-        
-        # METABOLIC MARKERS
-        self._evaluate_lab_threshold(processed, lab_results, 'METAB_INS', 'Insulin', 
-                                   'quick-insulin', ranges['Insulin'])
-        self._evaluate_lab_threshold(processed, lab_results, 'METAB_HBA1C', 'Hemoglobin A1c', 
-                                   'quick-HbA1c', ranges['HbA1c'])
-        
-        # Add comprehensive blood sugar/metabolic processing
-        glucose = self._get_lab_value(lab_results, ['CHEM_GLU', 'Glucose'])
-        insulin = self._get_lab_value(lab_results, ['METAB_INS', 'Insulin'])
-        hba1c = self._get_lab_value(lab_results, ['METAB_HBA1C', 'Hemoglobin A1c'])
-        homa_ir = None  # Initialize to avoid UnboundLocalError
-        
-        # Process glucose levels
-        if glucose:
-            processed['quick-glucose'] = glucose
-            if glucose >= 100:  # Above optimal fasting glucose
-                processed['quick-glucose-elevated'] = True
-                processed['glucose-elevated'] = True
-            
-        # Process fasting insulin levels  
-        if insulin:
-            processed['quick-fasting-insulin'] = insulin
-            if insulin >= 7:  # Above optimal fasting insulin
-                processed['quick-fasting-insulin-elevated'] = True
-                processed['insulin-elevated'] = True
-                
-        # Calculate and process HOMA-IR
-        if glucose and insulin:
-            homa_ir = round((insulin * glucose) / 405, 2)
-            processed['quick-homa-IR'] = homa_ir
-            processed['HOMA_IR'] = homa_ir  # Alternative name
-            
-            if homa_ir >= 1.2:  # Above optimal HOMA-IR
-                processed['quick-homa-IR-elevated'] = True
-                processed['HOMA-IR-elevated'] = True
-                
-        # Process A1c levels with APO E4 considerations
+        # A1c goals with APO E4 considerations
+        hba1c = labs.get('METAB_HBA1C')
         if hba1c:
-            processed['quick-a1c'] = hba1c
+            glucose = labs.get('CHEM_GLU')
+            insulin = labs.get('METAB_INS')
+            homa_ir = processed.get('quick-homa-IR')
             
             # Check for APO E4 status for stricter A1c goals
             apo_e = lab_results.get('APO1') or lab_results.get('APO E Genotyping Result')
             has_apo_e4 = apo_e and 'E4' in str(apo_e)
             has_double_e4 = apo_e and 'E4/E4' in str(apo_e)
             
-            # A1c threshold conditions
-            if hba1c > 6.0:
-                processed['quick-A1c>6'] = True
-                processed['quick-diabetes-risk'] = True
-            elif hba1c > 5.6:
-                processed['quick-A1c>56'] = True
-                processed['quick-diabetes-risk'] = True
-            else:
-                processed['quick-A1c<56'] = True
-                
             # APO E4-specific A1c goals
             if has_double_e4 and hba1c > 5.3:
                 processed['quick-A1c-E4E4-elevated'] = True
@@ -2384,159 +2028,98 @@ METHYLPRO. The dosing is 1 capsule/day. We also recommend METHYLPRO B-COMPLEX +
                 (insulin and insulin > 7) or 
                 (homa_ir and homa_ir > 1.2)):
                 processed['lab-a1c-L2b'] = True
-        
-        return processed
     
-    def _evaluate_lab_threshold(self, processed: Dict, lab_results: Dict, lab_key: str, 
-                               lab_display_name: str, control_name: str, thresholds: Dict) -> None:
+    def evaluate_batch(self, clients: List[Dict[str, Any]], labs_matrix: np.ndarray,
+                       hhq_matrix: Optional[np.ndarray] = None) -> Dict[str, Any]:
         """
-        Intelligent threshold evaluation for a single lab value.
-        Creates multiple content controls based on value ranges.
+        Evaluate the lab content controls for a whole cohort at once.
+        
+        labs_matrix is clients x lab_rule_engine.lab_columns with NaN for missing labs
+        (see lab_rule_engine.build_lab_matrix); hhq_matrix is clients x LAB_HHQ_COLUMNS
+        booleans. Genotype strings are read from each client dict's 'APO1' key. Every
+        client's controls match _process_all_lab_values_comprehensive for the same data.
+        
+        Returns the control names, a clients x controls boolean matrix (True where the
+        control is set to True) and the per-client control dicts.
         """
-        # Try multiple possible keys for this lab
-        possible_keys = [lab_key, lab_display_name]
-        value = self._get_lab_value(lab_results, possible_keys)
-        
-        if value is None:
-            return
-            
-        # Store the raw value for template replacement
-        processed[control_name] = value
-        
-        # Evaluate against thresholds to create conditional content controls
-        if 'critical_high' in thresholds and value >= thresholds['critical_high']:
-            processed[f"{control_name}-critical-high"] = True
-            processed[f"{control_name}-elevated"] = True
-        elif 'high' in thresholds and value >= thresholds['high']:
-            processed[f"{control_name}-high"] = True
-            processed[f"{control_name}-elevated"] = True
-        elif 'optimal_max' in thresholds and value > thresholds['optimal_max']:
-            processed[f"{control_name}-above-optimal"] = True
-        elif 'optimal_min' in thresholds and value >= thresholds['optimal_min']:
-            processed[f"{control_name}-optimal"] = True
-        elif 'low' in thresholds and value <= thresholds['low']:
-            processed[f"{control_name}-low"] = True
-        elif 'critical_low' in thresholds and value <= thresholds['critical_low']:
-            processed[f"{control_name}-critical-low"] = True
-            processed[f"{control_name}-low"] = True
-        
-        # Create range-specific controls for vitamins
-        if control_name == 'quick-VitD':
-            # MUTUALLY EXCLUSIVE vitamin D conditions
-            if value >= 60:
-                processed['D-60+'] = True
-                processed['D-55-59'] = False
-                processed['D-50-55'] = False
-                processed['D-50-59'] = False  # Add missing template condition
-                processed['D-40-49'] = False
-                processed['D-30-39'] = False
-                processed['D-less-30'] = False
-                # Set parent conditions - optimal range
-                processed['D-optimal'] = True
-                processed['quick-VitD-row'] = False
-                processed['quick-vitD-simple'] = True
-                processed['quick-VitD-row-takingD'] = False
-            elif value >= 55:
-                processed['D-60+'] = False
-                processed['D-55-59'] = True
-                processed['D-50-55'] = False
-                processed['D-50-59'] = False  # Add missing template condition
-                processed['D-40-49'] = False
-                processed['D-30-39'] = False
-                processed['D-less-30'] = False
-                # Set parent conditions - close to optimal
-                processed['D-optimal'] = False
-                processed['quick-VitD-row'] = False
-                processed['quick-vitD-simple'] = True
-                processed['quick-VitD-row-takingD'] = False
-            elif value >= 50:
-                processed['D-60+'] = False
-                processed['D-55-59'] = False
-                processed['D-50-55'] = True
-                processed['D-50-59'] = False  # Add missing template condition
-                processed['D-40-49'] = False
-                processed['D-30-39'] = False
-                processed['D-less-30'] = False
-                # Set parent conditions - close to optimal
-                processed['D-optimal'] = False
-                processed['quick-VitD-row'] = False
-                processed['quick-vitD-simple'] = True
-                processed['quick-VitD-row-takingD'] = False
-            elif value >= 40:
-                processed['D-60+'] = False
-                processed['D-55-59'] = False
-                processed['D-50-55'] = False
-                processed['D-50-59'] = False  # Add missing template condition
-                processed['D-40-49'] = True
-                processed['D-30-39'] = False
-                processed['D-less-30'] = False
-                # Set parent conditions - suboptimal, needs supplementation
-                processed['D-optimal'] = False
-                processed['quick-VitD-row'] = True
-                processed['quick-vitD-simple'] = False
-                processed['quick-VitD-row-takingD'] = False
-            elif value >= 30:
-                processed['D-60+'] = False
-                processed['D-55-59'] = False
-                processed['D-50-55'] = False
-                processed['D-50-59'] = False  # Add missing template condition
-                processed['D-40-49'] = False
-                processed['D-30-39'] = True
-                processed['D-less-30'] = False
-                # Set parent conditions - suboptimal, needs supplementation
-                processed['D-optimal'] = False
-                processed['quick-VitD-row'] = True
-                processed['quick-vitD-simple'] = False
-                processed['quick-VitD-row-takingD'] = False
-            else:
-                processed['D-60+'] = False
-                processed['D-55-59'] = False
-                processed['D-50-55'] = False
-                processed['D-50-59'] = False  # Add missing template condition
-                processed['D-40-49'] = False
-                processed['D-30-39'] = False
-                processed['D-less-30'] = True
-                # Set parent conditions - very low, needs supplementation
-                processed['D-optimal'] = False
-                processed['quick-VitD-row'] = True
-                processed['quick-vitD-simple'] = False
-                processed['quick-VitD-row-takingD'] = False
-        
-        elif control_name == 'quick-vitE':
-            if value >= 12:
-                processed['VitE12'] = True
-            elif value >= 8:
-                processed['quick-vitE-row'] = True
-            else:
-                processed['quick-vitE-row-elevated'] = True
-        
-        elif control_name == 'quick-MagRBC':
-            # Special handling for Magnesium RBC - trigger low if below optimal minimum
-            if value < thresholds.get('optimal_min', 5.2):  # Below 5.2 mg/dL
-                processed['quick-MagRBC-low'] = True
-            else:  # 5.2 mg/dL or above
-                processed['quick-MagRBC-optimal'] = True
-                
-            # Add specific quick-MagRBC-52 condition for values around the 5.2 threshold
-            if 5.0 <= value <= 5.2:  # Borderline low range around 5.2 threshold
-                processed['quick-MagRBC-52'] = True
-        
-        elif control_name == 'quick-selenium':
-            # Special handling for Selenium - trigger low if below optimal minimum
-            if value < thresholds.get('optimal_min', 125):  # Below 125 ug/L
-                processed['quick-selenium-low'] = True
-                
-                # Specific sub-condition for very low selenium requiring CLEAR WAY COFACTORS
-                if value < 110:  # Very low selenium
-                    processed['quick-selen-110'] = True
-            else:  # 125 ug/L or above
-                processed['quick-selenium-optimal'] = True
-                processed['Selenium125'] = True  # Alternative name for optimal condition
+        labs_matrix = np.asarray(labs_matrix, dtype=float)
+        genders = [client.get('gender', 'unknown').lower() for client in clients]
+        columns = lab_rule_engine.evaluate_batch(labs_matrix, genders)
+        self._process_lab_compound_conditions_batch(columns, clients, labs_matrix, hhq_matrix)
+        
+        control_names, controls = columns.matrix()
+        return {
+            'control_names': control_names,
+            'controls': controls,
+            'client_controls': columns.rows(),
+        }
+    
+    def _process_lab_compound_conditions_batch(self, columns, clients: List[Dict[str, Any]],
+                                               labs_matrix: np.ndarray, hhq_matrix: Optional[np.ndarray]) -> None:
+        """Vectorized _process_lab_compound_conditions; NaN labs are missing, like absent keys."""
+        rows = np.arange(len(clients))
+        lab_index = {lab: index for index, lab in enumerate(lab_rule_engine.lab_columns)}
+        
+        def lab(name):
+            return labs_matrix[:, lab_index[name]]
+        
+        def truthy(values):
+            return ~np.isnan(values) & (values != 0)
+        
+        def answered(*names):
+            if hhq_matrix is None:
+                return np.zeros(len(clients), dtype=bool)
+            hhq = np.asarray(hhq_matrix, dtype=bool)
+            return np.logical_or.reduce([hhq[:, LAB_HHQ_COLUMNS.index(name)] for name in names])
+        
+        # Related B vitamin values for the homocysteine section
+        homocysteine = truthy(lab('INFLAM_HOMOCYS'))
+        b12, folate = lab('VIT_B12'), lab('VIT_FOLATE')
+        with_b12 = homocysteine & truthy(b12)
+        columns.write('quick-B12-value', rows[with_b12], b12[with_b12].tolist())
+        with_folate = homocysteine & truthy(folate)
+        columns.write('quick-folic-acid-value', rows[with_folate], folate[with_folate].tolist())
+        columns.write('quick-folic-acid-value', rows[homocysteine & ~with_folate], 'Not Available')
+        
+        # Cholesterol and cardiovascular supplement conditions
+        elevated_cholesterol = (lab('LIPID_CHOL') > 200) | (lab('LIPID_LDL') > 100)
+        for control in ('cholesterol-row', 'quick-CAC'):
+            columns.write(control, rows[elevated_cholesterol], True)
+        hdl = lab('LIPID_HDL')
+        cardiovascular_risk = elevated_cholesterol | (lab('LIPID_TRIG') > 150) | (truthy(hdl) & (hdl < 40))
+        for control in ('quick-MK2', 'mk2-cardiovascular-support'):
+            columns.write(control, rows[cardiovascular_risk], True)
+        
+        # Gout risk and alcohol interactions
+        uric_acid = lab('INFLAM_URIC')
+        with_uric = ~np.isnan(uric_acid)
+        gout_history = answered('hh_gout', 'hh_joint_pain', 'hh_arthritis')
+        columns.write_flags('UAAcid-Gout', rows[with_uric], ((uric_acid > 6.5) & gout_history)[with_uric])
+        alcohol_consumption = answered('hh_alcohol_consumption', 'hh_drinks_alcohol', 'hh_alcohol_4days',
+                                       'hh_1to3_alcohol_week', 'hh_alcohol_daily')
+        columns.write_flags('quick-AG-ETOH', rows,
+                            truthy(lab('LFT_ALB')) & truthy(lab('LFT_TP')) & alcohol_consumption &
+                            columns.flag('ag-ratio-low'))
+        columns.write_flags('quick-uric-acid-ETOH', rows, (uric_acid > 6.5) & alcohol_consumption)
+        
+        # A1c goals with APO E4 considerations
+        hba1c = lab('METAB_HBA1C')
+        with_a1c = truthy(hba1c)
+        apo_e = [str(client.get('APO1') or client.get('APO E Genotyping Result') or '') for client in clients]
+        has_apo_e4 = np.array(['E4' in genotype for genotype in apo_e], dtype=bool)
+        has_double_e4 = np.array(['E4/E4' in genotype for genotype in apo_e], dtype=bool)
+        double_e4_elevated = with_a1c & has_double_e4 & (hba1c > 5.3)
+        columns.write('quick-A1c-E4E4-elevated', rows[double_e4_elevated], True)
+        columns.write('quick-A1c-E4-elevated',
+                      rows[with_a1c & ~double_e4_elevated & has_apo_e4 & (hba1c > 5.6)], True)
+        metabolic = ((hba1c > 5.6) | (lab('CHEM_GLU') > 100) | (lab('METAB_INS') > 7) |
+                     (columns.numbers('quick-homa-IR') > 1.2))
+        columns.write('lab-a1c-L2b', rows[with_a1c & metabolic], True)
     
-    def _get_comprehensive_lab_ranges(self, gender: str) -> Dict[str, Dict[str, float]]:
+    def _get_comprehensive_lab_ranges(self, gender: str) -> Mapping[str, RangeBand]:
         """
         Get comprehensive lab ranges for intelligent threshold evaluation.
-        Delegates to LabRanges configuration class.
+        Delegates to LabRanges configuration class, which shares one read-only table per gender.
         """
         return LabRanges.get_comprehensive_ranges(gender)
     
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+
+"""
+Incremental roadmap regeneration for Mind Stoke.
+Records which lab keys and HHQ variables each content control stage reads, and which
+template blocks read each content control, so that after an edit only the affected
+stages are re-evaluated and only the affected blocks are re-rendered.
+"""
+
+import threading
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+# Marks a stage that iterated over a whole input, so any change to it is relevant
+ALL = '*'
+
+
+class TracingMapping(Mapping):
+    """Read-only view of a stage's input that records every key looked up."""
+
+    def __init__(self, source: Mapping, reads: Set[str]):
+        self._source = source
+        self._reads = reads
+
+    @property
+    def derived(self):
+        # Precomputed ratios of a stored LabPanel (see lab_rule_engine.evaluate)
+        return getattr(self._source, 'derived', None)
+
+    def __getitem__(self, key):
+        self._reads.add(key)
+        return self._source[key]
+
+    def __contains__(self, key) -> bool:
+        self._reads.add(key)
+        return key in self._source
+
+    def get(self, key, default=None):
+        self._reads.add(key)
+        return self._source.get(key, default)
+
+    def __iter__(self) -> Iterator[str]:
+        self._reads.add(ALL)
+        return iter(self._source)
+
+    def __len__(self) -> int:
+        self._reads.add(ALL)
+        return len(self._source)
+
+
+def changed_keys(previous: Mapping, current: Mapping) -> Set[str]:
+    """Keys added, removed or given a different value."""
+    return {key for key in set(previous) | set(current)
+            if key not in previous or key not in current or previous[key] != current[key]}
+
+
+def _affected(reads: Set[str], changes: Set[str]) -> bool:
+    return bool(changes) and (ALL in reads or not reads.isdisjoint(changes))
+
+
+class IncrementalRoadmap:
+    """
+    One client's roadmap, kept with everything needed to update it after an edit.
+
+    The first generate() runs every content control stage with traced inputs, which
+    yields the dependency graph: stage -> lab keys and HHQ variables read, and through
+    the template's block_controls, content control -> template blocks. update() diffs
+    the new inputs against the last ones, re-runs only the stages that read a changed
+    key, and re-renders only the blocks that read a control whose value changed; the
+    other stage outputs and blocks are reused. The whole-document passes that follow
+    rendering run again only if the rendered text or its other inputs changed. A change
+    to the client record (gender, name) regenerates everything; a new template version
+    needs a new IncrementalRoadmap (RoadmapCache takes care of that).
+    """
+
+    def __init__(self, generator):
+        self.generator = generator
+        self.template = generator.compiled_template
+        self.last_stats: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._client_data: Optional[Dict[str, Any]] = None
+        self._labs: Dict[str, Any] = {}
+        self._hhq: Dict[str, Any] = {}
+        self._date: Optional[str] = None
+        self._stage_outputs: List[Dict[str, Any]] = []
+        self._stage_reads: List[Dict[str, Set[str]]] = []
+        self._controls: Dict[str, Any] = {}
+        self._blocks: Dict[int, str] = {}
+        self._rendered = ''
+        self._roadmap: Optional[str] = None
+
+    def generate(self, client_data: Dict[str, Any], lab_results: Dict[str, Any],
+                 hhq_responses: Dict[str, Any] = None) -> str:
+        """Full generation, same output as RoadmapGenerator.generate_roadmap()."""
+        with self._lock:
+            return self._update(client_data, lab_results, hhq_responses or {}, full=True)
+
+    def update(self, client_data: Dict[str, Any], lab_results: Dict[str, Any],
+               hhq_responses: Dict[str, Any] = None) -> str:
+        """The roadmap for new inputs, recomputing only what the changes reach."""
+        with self._lock:
+            full = self._roadmap is None or client_data != self._client_data
+            return self._update(client_data, lab_results, hhq_responses or {}, full=full)
+
+    def dependencies(self) -> Dict[str, Dict[str, List[str]]]:
+        """The traced graph, for the debug views: stage -> sorted lab keys, HHQ variables and controls."""
+        stages = self.generator._content_control_stages(self._client_data or {})
+        return {
+            name: {
+                'labs': sorted(reads['labs']),
+                'hhq': sorted(reads['hhq']),
+                'controls': sorted(output),
+            }
+            for (name, _), reads, output in zip(stages, self._stage_reads, self._stage_outputs)
+        }
+
+    def _update(self, client_data, lab_results, hhq_responses, full: bool) -> str:
+        generator = self.generator
+        date = datetime.now().strftime('%Y-%m-%d')
+        stages = generator._content_control_stages(client_data)
+        if full:
+            self._stage_outputs = [{} for _ in stages]
+            self._stage_reads = [{'labs': {ALL}, 'hhq': {ALL}} for _ in stages]
+            lab_changes = hhq_changes = {ALL}
+        else:
+            lab_changes = changed_keys(self._labs, lab_results)
+            hhq_changes = changed_keys(self._hhq, hhq_responses)
+
+        # Content controls: re-run the stages that read a changed key
+        recomputed = []
+        for index, (name, stage) in enumerate(stages):
+            if not (_affected(self._stage_reads[index]['labs'], lab_changes)
+                    or _affected(self._stage_reads[index]['hhq'], hhq_changes)):
+                continue
+            reads = {'labs': set(), 'hhq': set()}
+            self._stage_outputs[index] = stage(TracingMapping(lab_results, reads['labs']),
+                                               TracingMapping(hhq_responses, reads['hhq']))
+            self._stage_reads[index] = reads
+            recomputed.append(name)
+
+        controls: Dict[str, Any] = {}
+        for output in self._stage_outputs:
+            controls.update(output)
+
+        # Template blocks: re-render those that read a control whose value changed
+        if full:
+            self._blocks = self.template.render_blocks(controls)
+            rerendered = len(self._blocks)
+        else:
+            indexes = self.template.blocks_reading(changed_keys(self._controls, controls))
+            self._blocks.update(self.template.render_blocks(controls, indexes))
+            rerendered = len(indexes)
+        rendered = ''.join(self._blocks[index] for index in range(len(self._blocks)))
+
+        # Whole-document passes also read the labs, the client and today's date
+        if full or rendered != self._rendered or lab_changes or date != self._date:
+            self._roadmap = generator._finish_roadmap(rendered, client_data, lab_results, controls)
+
+        self._client_data = dict(client_data)
+        self._labs = dict(lab_results)
+        self._hhq = dict(hhq_responses)
+        self._date = date
+        self._controls = controls
+        self._rendered = rendered
+        self.last_stats = {
+            'full': full,
+            'stages_recomputed': recomputed,
+            'blocks_rerendered': rerendered,
+            'blocks': len(self._blocks),
+        }
+        return self._roadmap
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+
+"""
+Compiled template engine for the Mind Stoke roadmap generator.
+Parses the {{#control}}...{{/control}}, {{^control}}...{{/control}} and {{control}}
+content control syntax once and renders it against a content control dict in one pass.
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+from typing import Dict, Any, FrozenSet, Iterable, Iterator, List, Optional, Tuple, Union
+
+# Matches every content control tag: {{#name}}, {{^name}}, {{/name}} and {{name}}
+TAG_PATTERN = re.compile(r'\{\{([#^/]?)([^{}]*)\}\}')
+
+# MTHFR placeholders are rewritten to their variant names rather than their control values
+MTHFR_PLACEHOLDERS = {
+    'MTHFR_C677T': 'C677T',
+    'MTHFR_A1298C': 'A1298C',
+}
+
+# Typographic characters normalized to plain text when the template is loaded
+CHARACTER_REPLACEMENTS = [
+    ('\u2018', "'"),  # Left single quotation mark
+    ('\u2019', "'"),  # Right single quotation mark
+    ('\u201c', '"'),  # Left double quotation mark
+    ('\u201d', '"'),  # Right double quotation mark
+    ('\u2013', '-'),  # En dash
+    ('\u2014', '—'),  # Em dash
+    ('\u2026', '...'),  # Horizontal ellipsis
+]
+
+
+class Section:
+    """A {{#name}} or {{^name}} block and everything up to its closing {{/name}}."""
+
+    __slots__ = ('name', 'inverted', 'open_tag', 'close_tag', 'children')
+
+    def __init__(self, name: str, inverted: bool, open_tag: str, close_tag: str):
+        self.name = name
+        self.inverted = inverted
+        self.open_tag = open_tag
+        self.close_tag = close_tag
+        self.children: List['Node'] = []
+
+
+class Variable:
+    """A {{name}} placeholder."""
+
+    __slots__ = ('name', 'tag')
+
+    def __init__(self, name: str, tag: str):
+        self.name = name
+        self.tag = tag
+
+
+Node = Union[str, Section, Variable]
+
+
+class CompiledTemplate:
+    """
+    Roadmap template parsed into a tree of text, section and variable nodes.
+
+    Sections are paired exactly the way the original per-control regex passes paired them:
+    the leftmost {{#name}} is closed by the nearest following {{/name}}, and {{^name}} blocks
+    are closed by whichever {{/name}} tags remain after that. Tags that never pair (the
+    template has a handful of stray openers) are kept as literal text so the placeholder
+    cleanup strips them, just as before.
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        # Content hash of the source, used to key cached roadmaps
+        self.version = hashlib.sha1(source.encode('utf-8')).hexdigest()[:16]
+        self.warnings: List[str] = []
+        self.nodes = self._parse(source)
+        # Content controls each top-level node (block) reads, for re-rendering only what changed
+        self.block_controls: List[FrozenSet[str]] = [frozenset(self._node_controls(node)) for node in self.nodes]
+
+    def render(self, controls: Dict[str, Any]) -> str:
+        """Render the template against the content controls in a single pass."""
+        parts: List[str] = []
+        mthfr_active = all(name in controls for name in MTHFR_PLACEHOLDERS)
+        self._render_nodes(self.nodes, controls, mthfr_active, parts)
+        return ''.join(parts)
+
+    def render_blocks(self, controls: Dict[str, Any], indexes: Optional[Iterable[int]] = None) -> Dict[int, str]:
+        """Render top-level blocks separately (all of them by default); joined in order they equal render()."""
+        mthfr_active = all(name in controls for name in MTHFR_PLACEHOLDERS)
+        rendered = {}
+        for index in range(len(self.nodes)) if indexes is None else indexes:
+            parts: List[str] = []
+            self._render_nodes([self.nodes[index]], controls, mthfr_active, parts)
+            rendered[index] = ''.join(parts)
+        return rendered
+
+    def blocks_reading(self, controls: Iterable[str]) -> List[int]:
+        """Indexes of the top-level blocks that read any of these content controls."""
+        controls = set(controls)
+        return [index for index, names in enumerate(self.block_controls) if names & controls]
+
+    def _node_controls(self, node: 'Node') -> Iterator[str]:
+        if isinstance(node, Section):
+            yield node.name
+            for child in node.children:
+                yield from self._node_controls(child)
+        elif isinstance(node, Variable):
+            yield node.name
+            if node.name in MTHFR_PLACEHOLDERS:
+                # Rendered only when both MTHFR controls are present
+                yield from MTHFR_PLACEHOLDERS
+
+    def _render_nodes(self, nodes: List[Node], controls: Dict[str, Any],
+                      mthfr_active: bool, parts: List[str]) -> None:
+        for node in nodes:
+            if isinstance(node, str):
+                parts.append(node)
+            elif isinstance(node, Section):
+                value = controls.get(node.name)
+                if not isinstance(value, bool) or node.name in MTHFR_PLACEHOLDERS:
+                    # Only boolean controls open or close blocks; anything else leaves the
+                    # markers in place for _cleanup_placeholders to strip
+                    parts.append(node.open_tag)
+                    self._render_nodes(node.children, controls, mthfr_active, parts)
+                    parts.append(node.close_tag)
+                elif value != node.inverted:
+                    self._render_nodes(node.children, controls, mthfr_active, parts)
+            else:
+                parts.append(self._render_variable(node, controls, mthfr_active))
+
+    def _render_variable(self, node: Variable, controls: Dict[str, Any], mthfr_active: bool) -> str:
+        if node.name in MTHFR_PLACEHOLDERS:
+            return MTHFR_PLACEHOLDERS[node.name] if mthfr_active else node.tag
+        if node.name not in controls:
+            return node.tag
+        value = controls[node.name]
+        if isinstance(value, (str, int, float)):
+            return str(value)
+        return str(value) if value else ""
+
+    def _parse(self, source: str) -> List[Node]:
+        tokens = [(m.group(1), m.group(2), m.start(), m.end()) for m in TAG_PATTERN.finditer(source)]
+        closers = self._pair_sections(tokens)
+
+        root: List[Node] = []
+        stack: List[Tuple[Section, int]] = []
+        position = 0
+        for index, (sigil, name, start, end) in enumerate(tokens):
+            children = stack[-1][0].children if stack else root
+            if start > position:
+                children.append(source[position:start])
+            position = end
+            tag = source[start:end]
+
+            if index in closers:
+                section = Section(name, sigil == '^', tag, source[tokens[closers[index]][2]:tokens[closers[index]][3]])
+                children.append(section)
+                stack.append((section, closers[index]))
+            elif stack and stack[-1][1] == index:
+                stack.pop()
+            elif sigil == '':
+                children.append(Variable(name, tag))
+            else:
+                children.append(tag)
+
+        if position < len(source):
+            root.append(source[position:])
+        return root
+
+    def _pair_sections(self, tokens: List[Tuple[str, str, int, int]]) -> Dict[int, int]:
+        """Map each section opener's token index to the index of its closing tag."""
+        by_name: Dict[str, List[int]] = {}
+        for index, (sigil, name, _, _) in enumerate(tokens):
+            if sigil:
+                by_name.setdefault(name, []).append(index)
+
+        pairs: Dict[int, int] = {}
+        for name, indexes in by_name.items():
+            used = set()
+            for opener_sigil in ('#', '^'):
+                opener = None
+                for index in indexes:
+                    sigil = tokens[index][0]
+                    if opener is None and sigil == opener_sigil:
+                        opener = index
+                    elif opener is not None and sigil == '/' and index not in used:
+                        pairs[opener] = index
+                        used.add(index)
+                        opener = None
+
+        # Blocks that overlap without nesting cannot be represented as a tree; keep the
+        # outer one and leave the inner one's tags as literal text
+        open_stack: List[int] = []
+        for opener in sorted(pairs):
+            while open_stack and pairs[open_stack[-1]] < opener:
+                open_stack.pop()
+            if open_stack and pairs[opener] > pairs[open_stack[-1]]:
+                sigil, name, start, _ = tokens[opener]
+                self.warnings.append(f"Overlapping section {{{{{sigil}{name}}}}} at offset {start} left unpaired")
+                del pairs[opener]
+                continue
+            open_stack.append(opener)
+        return pairs
+
+
+def load_template_file(template_path: str) -> str:
+    """Read a roadmap template from disk and normalize its typographic characters."""
+    encodings_to_try = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
+
+    for encoding in encodings_to_try:
+        try:
+            with open(template_path, 'r', encoding=encoding) as file:
+                content = file.read()
+                for original, replacement in CHARACTER_REPLACEMENTS:
+                    content = content.replace(original, replacement)
+                return content
+        except UnicodeDecodeError:
+            continue
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Template file not found: {template_path}")
+        except Exception as e:
+            continue
+
+    # If all encodings fail, try with error handling
+    try:
+        with open(template_path, 'r', encoding='utf-8', errors='replace') as file:
+            return file.read()
+    except Exception as e:
+        raise Exception(f"Error loading template: {str(e)}")
+
+
+class TemplateRegistry:
+    """
+    Process-wide cache of loaded and compiled roadmap templates.
+
+    Entries are keyed by absolute path and validated against the file's mtime and size.
+    The file is only stat'ed once per check interval, and only re-read when that
+    signature changes, so concurrent roadmap requests share one compiled template.
+    """
+
+    def __init__(self, check_interval: float = 5.0):
+        self.check_interval = check_interval
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, template_path: str) -> CompiledTemplate:
+        """Return the compiled template for a path, loading it on first use or after a change."""
+        path = os.path.abspath(template_path)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry and now - entry['checked_at'] < self.check_interval:
+                self.hits += 1
+                return entry['template']
+
+        signature = self._signature(path)
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry and entry['signature'] == signature:
+                entry['checked_at'] = now
+                self.hits += 1
+                return entry['template']
+
+            self.misses += 1
+            template = CompiledTemplate(load_template_file(path))
+            self._entries[path] = {'signature': signature, 'template': template, 'checked_at': now}
+            return template
+
+    def invalidate(self, template_path: Optional[str] = None) -> None:
+        """Drop one cached template, or all of them, so the next get() reloads from disk."""
+        with self._lock:
+            if template_path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(os.path.abspath(template_path), None)
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters for the debug views."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+    def _signature(self, path: str) -> Tuple[int, int]:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Template file not found: {path}")
+        return (stat.st_mtime_ns, stat.st_size)
+
+
+# Shared by every RoadmapGenerator in the process
+template_registry = TemplateRegistry()
@@ -3,16 +3,19 @@ import sys
 import os
 from app import create_app
 
-app = create_app()
-
 def signal_handler(sig, frame):
     print('\n🛑 Gracefully shutting down Flask server...')
     sys.exit(0)
 
-# Register signal handler for graceful shutdown
-signal.signal(signal.SIGINT, signal_handler)
-
+# The app is only created when run as a script (`flask run` finds create_app itself):
+# PDF render workers are spawned processes that re-import this file, and must not
+# each build a full app with its database, Supabase pool and job queues
 if __name__ == '__main__':
+    app = create_app()
+
+    # Register signal handler for graceful shutdown
+    signal.signal(signal.SIGINT, signal_handler)
+    
     # Get port from environment variable or default to 5001
     port = int(os.environ.get('FLASK_PORT', 5001))
     
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import tempfile
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from autosave_buffer import AutosaveBuffer
+
+
+class RecordingWriter:
+    """Stands in for the Supabase bulk upsert and records each batch"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.batches = []
+
+    def __call__(self, client_id, answers, attempt_id):
+        if self.fail:
+            raise ConnectionError("Supabase unavailable")
+        self.batches.append((client_id, dict(answers), attempt_id))
+        return len(answers)
+
+
+def _buffer(tmp_dir, writer, **kwargs):
+    return AutosaveBuffer(os.path.join(tmp_dir, 'instance', 'mindstoke.db'), writer, **kwargs)
+
+
+def test_autosaves_are_merged_into_one_write():
+    """Successive autosaves for an attempt reach the writer as a single merged batch"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        writer = RecordingWriter()
+        buffer = _buffer(tmp_dir, writer)
+        buffer.add('c1', 'a1', {'hh_heart_attack': True})
+        buffer.add('c1', 'a1', {'hh_heart_attack': False, 'hh_taking_statin': True})
+        buffer.add('c2', 'a2', {'hh_family_dementia': True})
+        assert buffer.pending('c1', 'a1') == {'hh_heart_attack': False, 'hh_taking_statin': True}
+        assert not writer.batches
+
+        assert buffer.flush('c1', 'a1') == 2
+        assert writer.batches == [('c1', {'hh_heart_attack': False, 'hh_taking_statin': True}, 'a1')]
+        assert buffer.pending('c1', 'a1') == {}
+        assert buffer.pending('c2', 'a2') == {'hh_family_dementia': True}
+        assert buffer.flush('c1', 'a1') == 0
+        buffer.shutdown()
+
+
+def test_journal_survives_restart_and_failed_writes():
+    """Unflushed answers are still there for a new process and stay when the writer fails"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        crashed = _buffer(tmp_dir, RecordingWriter())
+        crashed.add('c1', 'a1', {'hh_heart_attack': True})
+
+        failing = _buffer(tmp_dir, RecordingWriter(fail=True))
+        assert failing.flush_all() == 0
+        assert failing.stats()['failures'] == 1 and failing.stats()['pending'] == 1
+
+        writer = RecordingWriter()
+        assert _buffer(tmp_dir, writer).shutdown() == 1
+        assert writer.batches == [('c1', {'hh_heart_attack': True}, 'a1')]
+        assert crashed.shutdown() == 0
+
+
+def test_answers_changed_during_a_flush_are_kept():
+    """An answer re-saved while its batch is being written is not dropped from the journal"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        calls = []
+
+        def writer(client_id, answers, attempt_id):
+            if len(calls) == 0:
+                buffer.add(client_id, attempt_id, {'hh_heart_attack': False})
+            calls.append(dict(answers))
+
+        buffer = _buffer(tmp_dir, writer)
+        buffer.add('c1', 'a1', {'hh_heart_attack': True, 'hh_taking_statin': True})
+        buffer.flush('c1', 'a1')
+        assert buffer.pending('c1', 'a1') == {'hh_heart_attack': False}
+        buffer.flush('c1', 'a1')
+        assert calls[-1] == {'hh_heart_attack': False}
+        assert buffer.pending('c1', 'a1') == {}
+        buffer.shutdown()
+
+
+def test_flush_due_respects_the_interval():
+    """The background flush only writes attempts whose answers have waited long enough"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        writer = RecordingWriter()
+        buffer = _buffer(tmp_dir, writer, flush_interval=60)
+        buffer.add('c1', 'a1', {'hh_heart_attack': True})
+        assert buffer.flush_due() == 0
+        assert buffer.flush_due(older_than=0) == 1
+        assert buffer.stats()['pending'] == 0
+        buffer.shutdown()
+
+
+if __name__ == "__main__":
+    test_autosaves_are_merged_into_one_write()
+    test_journal_survives_restart_and_failed_writes()
+    test_answers_changed_during_a_flush_are_kept()
+    test_flush_due_respects_the_interval()
+    print("✅ Autosave buffer tests passed")
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import random
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from roadmap_generator import RoadmapGenerator, LAB_HHQ_COLUMNS
+from lab_rule_engine import lab_rule_engine
+from config.lab_ranges import LabRanges
+
+
+def _random_cohort(size, seed=7):
+    """Lab panels with values scattered around and exactly on the configured thresholds"""
+    rng = random.Random(seed)
+    thresholds = sorted({value for gender in ('male', 'female')
+                         for bands in LabRanges.get_comprehensive_ranges(gender).values()
+                         for value in bands.values()})
+    clients, panels, answers = [], [], []
+    for index in range(size):
+        panel = {}
+        for lab in lab_rule_engine.lab_columns:
+            if rng.random() < 0.7:
+                panel[lab] = rng.choice([0, rng.choice(thresholds), round(rng.uniform(0, 400), 2)])
+        client = {'gender': rng.choice(['male', 'female', 'unknown', 'Male'])}
+        if rng.random() < 0.5:
+            client['APO1'] = rng.choice(['E3/E3', 'E3/E4', 'E4/E4'])
+        clients.append(client)
+        panels.append(panel)
+        answers.append([rng.random() < 0.2 for _ in LAB_HHQ_COLUMNS])
+    return clients, panels, answers
+
+
+def test_batch_matches_single_client_evaluation():
+    """Every client's batch controls equal the per-client lab processing"""
+    generator = RoadmapGenerator()
+    clients, panels, answers = _random_cohort(400)
+    result = generator.evaluate_batch(clients, lab_rule_engine.build_lab_matrix(panels), np.array(answers))
+
+    for index, (client, panel, answer) in enumerate(zip(clients, panels, answers)):
+        lab_results = dict(panel, **{key: client[key] for key in ('APO1',) if key in client})
+        hhq = {name: True for name, flag in zip(LAB_HHQ_COLUMNS, answer) if flag}
+        expected = generator._process_all_lab_values_comprehensive(client, lab_results, hhq)
+        assert result['client_controls'][index] == expected, f"Batch controls differ for client {index}"
+
+
+def test_control_matrix_marks_true_controls():
+    """The control matrix is True exactly where a client's control is True"""
+    generator = RoadmapGenerator()
+    clients = [{'gender': 'female'}, {'gender': 'male'}]
+    matrix = lab_rule_engine.build_lab_matrix([{'VIT_D25': 25}, {'Vitamin D, 25-Hydroxy': 65, 'VIT_B12': '900'}])
+    result = generator.evaluate_batch(clients, matrix)
+
+    column = result['control_names'].index('D-less-30')
+    assert result['controls'][:, column].tolist() == [True, False]
+    column = result['control_names'].index('D-60+')
+    assert result['controls'][:, column].tolist() == [False, True]
+    assert result['client_controls'][1]['quick-VitD'] == 65.0
+    assert result['controls'].shape == (2, len(result['control_names']))
+
+
+if __name__ == "__main__":
+    test_batch_matches_single_client_evaluation()
+    test_control_matrix_marks_true_controls()
+    print("✅ Batch evaluation tests passed")
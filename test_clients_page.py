@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+
+import app.utils.supabase_client as supabase_client
+from app.utils.supabase_client import client_page_params, decode_client_cursor, encode_client_cursor, fetch_clients_page
+
+CLIENTS = [
+    {'id': f'id-{n}', 'first_name': 'Client', 'last_name': str(n), 'created_at': f'2025-05-{n:02d}T10:00:00+00:00'}
+    for n in range(5, 0, -1)
+]
+
+
+def test_params_project_search_and_seek():
+    """Pages select only list columns, search every word server-side and seek past the cursor"""
+    params = client_page_params(search='ann smith', limit=20, columns=('first_name', 'password'))
+    assert params['select'] == 'first_name,created_at,id'
+    assert params['order'] == 'created_at.desc,id.desc'
+    assert params['limit'] == '21'
+    assert params['and'] == (
+        '(or(first_name.ilike."*ann*",last_name.ilike."*ann*",email.ilike."*ann*"),'
+        'or(first_name.ilike."*smith*",last_name.ilike."*smith*",email.ilike."*smith*"))'
+    )
+
+    cursor = encode_client_cursor(CLIENTS[0])
+    assert decode_client_cursor(cursor) == ('2025-05-05T10:00:00+00:00', 'id-5')
+    params = client_page_params(after=cursor)
+    assert params['and'] == ('(or(created_at.lt."2025-05-05T10:00:00+00:00",'
+                             'and(created_at.eq."2025-05-05T10:00:00+00:00",id.lt."id-5")))')
+    assert 'and' not in client_page_params(after='not-a-cursor')
+    assert client_page_params(limit=10_000)['limit'] == str(supabase_client.CLIENT_PAGE_MAX + 1)
+
+
+def test_pages_walk_the_list():
+    """Following next_cursor visits every client once and stops on the last page"""
+    def handler(request):
+        limit = int(request.url.params['limit'])
+        rows = CLIENTS
+        position = request.url.params.get('and')
+        if position:
+            created_at = position.split('created_at.lt."')[1].split('"')[0]
+            rows = [row for row in CLIENTS if row['created_at'] < created_at]
+        return httpx.Response(200, json=rows[:limit])
+
+    original = supabase_client.rest_http
+    supabase_client.rest_http = httpx.Client(base_url='http://supabase.test/rest/v1', transport=httpx.MockTransport(handler))
+    try:
+        seen, cursor = [], None
+        for _ in range(5):
+            page = fetch_clients_page(after=cursor, limit=2)
+            seen.extend(client['id'] for client in page['clients'])
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+        assert seen == [client['id'] for client in CLIENTS]
+        assert cursor is None
+    finally:
+        supabase_client.rest_http = original
+
+
+if __name__ == "__main__":
+    test_params_project_search_and_seek()
+    test_pages_walk_the_list()
+    print("✅ Client page tests passed")
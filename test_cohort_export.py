@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import io
+import tempfile
+import zipfile
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+from flask import Flask
+from flask_login import LoginManager, UserMixin
+from flask_wtf.csrf import CSRFProtect, generate_csrf
+
+import app.utils.supabase_client as supabase_client
+from app.routes import roadmap
+from app.utils import pdf_rendering
+from app.utils.cohort_export import CohortExport, load_cohort
+from pdf_render_pool import PDFRenderPool
+
+JANE = 'aaaa1111-0000-4000-8000-000000000001'
+JOHN = 'bbbb2222-0000-4000-8000-000000000002'
+MISSING = 'cccc3333-0000-4000-8000-000000000003'
+CLIENTS = [
+    {'id': JANE, 'first_name': 'Jane', 'last_name': 'Doe', 'sex': 'female'},
+    {'id': JOHN, 'first_name': 'John', 'last_name': 'Smith', 'sex': 'male'},
+]
+TABLES = {
+    'clients': CLIENTS,
+    'lab_panels': [
+        {'client_id': JANE, 'collected_on': '2025-06-01', 'panel_version': supabase_client.LAB_PANEL_VERSION,
+         'lab_values': {'VIT_D25': 42.0}, 'test_names': {}, 'derived': {}},
+    ],
+    'lab_results': [
+        {'client_id': JOHN, 'original_test_name': 'Vitamin D, 25-Hydroxy', 'original_value': '28',
+         'armgasys_variable_name': 'VIT_D25'},
+    ],
+    'hhq_responses': [
+        {'client_id': JANE, 'question_variable_name': 'hh_gout', 'response_value': 'True'},
+        {'client_id': JOHN, 'question_variable_name': 'hh-height', 'response_value': '70'},
+    ],
+}
+
+
+class MockSupabase:
+    """Serves TABLES over the REST client and counts the requests made"""
+
+    def __init__(self, failing_table=None):
+        self.requests = []
+        self.failing_table = failing_table
+
+    def __call__(self, request):
+        table = request.url.path.rsplit('/', 1)[-1]
+        self.requests.append(table)
+        if table == self.failing_table:
+            return httpx.Response(503, json={'message': 'unavailable'})
+        params = request.url.params
+        key = 'id' if table == 'clients' else 'client_id'
+        wanted = params[key][len('in.('):-1].split(',')
+        rows = [row for row in TABLES[table] if row.get(key) in wanted]
+        offset = int(params.get('offset', 0))
+        return httpx.Response(200, json=rows[offset:offset + int(params['limit'])])
+
+    def __enter__(self):
+        self.original = supabase_client.rest_http
+        supabase_client.rest_http = httpx.Client(base_url='http://supabase.test/rest/v1', transport=httpx.MockTransport(self))
+        return self
+
+    def __exit__(self, *exc):
+        supabase_client.rest_http = self.original
+
+
+def test_cohort_is_loaded_in_bulk():
+    """Clients, panels and answers for a chunk come from one request per table"""
+    with MockSupabase() as supabase:
+        cohort = list(load_cohort([JANE, JOHN, MISSING]))
+    assert supabase.requests == ['clients', 'lab_panels', 'lab_results', 'hhq_responses']
+    assert [data.client_id for data in cohort] == [JANE, JOHN]
+    assert cohort[0].labs.number('VIT_D25') == 42.0 and cohort[0].hhq_responses == {'hh_gout': True}
+    assert cohort[1].labs.number('VIT_D25') == 28.0 and cohort[1].hhq_responses == {'hh-height': '70'}
+
+
+def test_export_to_zip_and_directory():
+    """Every client's PDF lands in the ZIP or directory, and unknown ids are reported"""
+    reports = []
+    with MockSupabase():
+        export = CohortExport([JANE, JOHN, MISSING], PDFRenderPool(workers=0), progress=reports.append)
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(export.stream_zip())))
+    assert sorted(archive.namelist()) == ['failed.txt', 'visual_roadmap_Jane_Doe_aaaa1111.pdf',
+                                          'visual_roadmap_John_Smith_bbbb2222.pdf']
+    assert archive.read('visual_roadmap_Jane_Doe_aaaa1111.pdf').startswith(b'%PDF')
+    assert export.failed == {MISSING: 'Client not found'}
+    assert reports[-1]['done'] == 2 and reports[-1]['failed'] == 1
+    assert export.stats()['roadmaps_per_second'] > 0
+
+    with MockSupabase(), tempfile.TemporaryDirectory() as output_dir:
+        stats = CohortExport([JOHN], PDFRenderPool(workers=0)).write_directory(output_dir)
+        assert stats['done'] == 1 and os.listdir(output_dir) == ['visual_roadmap_John_Smith_bbbb2222.pdf']
+
+
+def test_bad_ids_and_failed_reads_do_not_stop_the_export():
+    """Malformed ids and a chunk whose reads fail are listed in failed.txt and the archive completes"""
+    with MockSupabase():
+        export = CohortExport([JANE, "x'),or(id.neq.", JOHN], PDFRenderPool(workers=0))
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(export.stream_zip())))
+    assert len(archive.namelist()) == 3
+    assert export.failed == {"x'),or(id.neq.": 'Invalid client id'} and export.done == 2
+
+    with MockSupabase(failing_table='hhq_responses'):
+        export = CohortExport([JANE, JOHN], PDFRenderPool(workers=0))
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(export.stream_zip())))
+    assert archive.namelist() == ['failed.txt']
+    assert set(export.failed) == {JANE, JOHN} and export.done == 0
+    assert all(error.startswith('Could not load client data') for error in export.failed.values())
+
+
+class Admin(UserMixin):
+    id = 1
+    username = 'admin'
+
+
+def test_export_route_requires_a_csrf_token():
+    """The export form's POST passes CSRF with its token and streams the ZIP; without one it is refused"""
+    app = Flask(__name__)
+    app.config.update(SECRET_KEY='test')
+    CSRFProtect(app)
+    login_manager = LoginManager(app)
+    login_manager.request_loader(lambda request: Admin())
+    app.register_blueprint(roadmap.bp)
+    app.add_url_rule('/token', 'token', generate_csrf)
+
+    original = pdf_rendering.pdf_render_pool
+    pdf_rendering.pdf_render_pool = PDFRenderPool(workers=0)
+    try:
+        with MockSupabase(), app.test_client() as http:
+            assert http.post('/roadmap/export', data={'client_ids': JANE}).status_code == 400
+            token = http.get('/token').get_data(as_text=True)
+            response = http.post('/roadmap/export', data={'csrf_token': token, 'client_ids': f"{JANE},{JOHN}"})
+            assert response.status_code == 200 and response.mimetype == 'application/zip'
+            archive = zipfile.ZipFile(io.BytesIO(response.get_data()))
+        assert sorted(archive.namelist()) == ['visual_roadmap_Jane_Doe_aaaa1111.pdf', 'visual_roadmap_John_Smith_bbbb2222.pdf']
+    finally:
+        pdf_rendering.pdf_render_pool = original
+
+
+if __name__ == "__main__":
+    test_cohort_is_loaded_in_bulk()
+    test_export_to_zip_and_directory()
+    test_bad_ids_and_failed_reads_do_not_stop_the_export()
+    test_export_route_requires_a_csrf_token()
+    print("✅ Cohort export tests passed")
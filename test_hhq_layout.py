@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.hhq_layout import HHQLayoutIndex, build_layout
+
+CATALOG = [
+    {'variable_name': 'hh-heart-attack', 'section': 'Cardiovascular', 'question_order': '2'},
+    {'variable_name': 'hh_atherosclerosis', 'section': 'Cardiovascular', 'question_order': '1'},
+    {'variable_name': 'hh_low_libido_m', 'section': 'Male Hormone Health History', 'question_order': '1'},
+    {'variable_name': 'hh_hot_flashes', 'section': 'Female Hormone Health', 'question_order': '1'},
+    {'variable_name': 'hh_notes', 'question_order': '10'},
+]
+
+
+def test_layouts_follow_client_sex():
+    """Each sex sees the shared sections plus only its own hormone section, in question_order"""
+    male = build_layout(CATALOG, 'male')
+    assert [section.name for section in male.sections] == ['Cardiovascular', 'Male Hormone Health History', 'Unknown']
+    assert male.sections[0].field_names == ('hh_atherosclerosis', 'hh_heart_attack')
+    assert male.sections[2].title == 'Section 3'
+    assert male.form_fields['hh-heart-attack'] == 'hh_heart_attack'
+    assert 'hh_hot_flashes' not in male.form_fields
+
+    female = build_layout(CATALOG, 'female')
+    assert [section.name for section in female.sections] == ['Cardiovascular', 'Female Hormone Health', 'Unknown']
+    assert len(build_layout(CATALOG, 'unknown')) == 4
+
+    assert male.step(-3)[0] == 0
+    index, section = male.step(99)
+    assert index == 2 and section.name == 'Unknown'
+
+
+def test_layouts_are_built_once_per_catalog_version():
+    """All three layouts are built together and reused until the catalog version changes"""
+    catalog = {'version': 1}
+    index = HHQLayoutIndex(loader=lambda: (catalog['version'], CATALOG))
+    male = index.get('Male')
+    assert index.get('male') is male and index.get('female') is not male
+    assert index.get(None).sex == 'unknown' and index.get('other').sex == 'unknown'
+    assert index.builds == 1
+
+    catalog['version'] = 2
+    assert index.get('male') is not male and index.builds == 2
+
+    failed = HHQLayoutIndex(loader=lambda: (None, []))
+    assert failed.get('male') is None
+
+
+if __name__ == "__main__":
+    test_layouts_follow_client_sex()
+    test_layouts_are_built_once_per_catalog_version()
+    print("✅ HHQ layout tests passed")
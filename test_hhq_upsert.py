@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import json
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+from postgrest import SyncPostgrestClient
+from postgrest.utils import SyncClient
+
+import app.utils.supabase_client as supabase_client
+from app.utils.supabase_client import changed_hhq_answers, upsert_hhq_answers_partial, upsert_individual_hhq_answers
+
+
+def recording_client(requests):
+    """PostgREST client whose HTTP requests are recorded instead of sent"""
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(201 if request.method == 'POST' else 200, json=[])
+
+    postgrest = SyncPostgrestClient('http://supabase.test/rest/v1')
+    postgrest.session = SyncClient(base_url='http://supabase.test/rest/v1', transport=httpx.MockTransport(handler))
+    return postgrest
+
+
+def with_client(test):
+    def run():
+        requests = []
+        original = (supabase_client.get_supabase_client, supabase_client.return_supabase_client)
+        supabase_client.get_supabase_client = lambda: recording_client(requests)
+        supabase_client.return_supabase_client = lambda client: None
+        try:
+            test(requests)
+        finally:
+            supabase_client.get_supabase_client, supabase_client.return_supabase_client = original
+    run.__name__ = test.__name__
+    return run
+
+
+def test_changed_answers():
+    """Diff mode compares stored values, so bools and their text forms are equal"""
+    previous = {'hh_gout': True, 'hh_arthritis': False, 'hh-height': '70'}
+    answers = {'hh_gout': True, 'hh_arthritis': True, 'hh-height': 70, 'hh_new': False}
+    assert changed_hhq_answers(answers, previous) == {'hh_arthritis': True, 'hh_new': False}
+
+
+@with_client
+def test_partial_save_is_one_upsert(requests):
+    """A section autosave sends one on_conflict upsert, and nothing when no answer changed"""
+    answers = {f'hh_q{i}': True for i in range(60)}
+    assert upsert_hhq_answers_partial('c1', answers, 'a1') == 60
+    assert len(requests) == 1
+    request = requests[0]
+    assert request.method == 'POST'
+    assert request.url.params['on_conflict'] == 'client_id,attempt_id,question_variable_name'
+    assert 'resolution=merge-duplicates' in request.headers['prefer']
+    assert len(json.loads(request.content)) == 60
+
+    assert upsert_hhq_answers_partial('c1', answers, 'a1', previous=answers) == 0
+    assert upsert_hhq_answers_partial('c1', dict(answers, hh_q0=False), 'a1', previous=answers) == 1
+    assert len(requests) == 2
+
+
+@with_client
+def test_final_save_removes_only_stale_rows(requests):
+    """The final submit upserts every answer and only deletes rows that are no longer answered"""
+    answers = {'hh_gout': True, 'hh_arthritis': False}
+    upsert_individual_hhq_answers('c1', answers, 'a1', previous={'hh_gout': False})
+    assert [r.method for r in requests] == ['POST']
+    rows = json.loads(requests[0].content)
+    assert all(json.loads(row['responses']) == answers for row in rows)
+
+    upsert_individual_hhq_answers('c1', answers, 'a1', previous={'hh_gout': False, 'hh_removed': True})
+    assert [r.method for r in requests] == ['POST', 'POST', 'DELETE']
+    assert requests[-1].url.params['question_variable_name'] == 'in.(hh_removed)'
+
+
+if __name__ == "__main__":
+    test_changed_answers()
+    test_partial_save_is_one_upsert()
+    test_final_save_removes_only_stale_rows()
+    print("✅ HHQ upsert tests passed")
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import time
+import tempfile
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from job_queue import JobQueue, PermanentJobError, QUEUED, RETRYING, RUNNING, SUCCEEDED, FAILED
+
+
+def _queue(tmp_dir, **kwargs):
+    kwargs.setdefault('retry_delay', 0)
+    return JobQueue(os.path.join(tmp_dir, 'instance', 'jobs.db'), **kwargs)
+
+
+def test_job_runs_with_stage_timings():
+    """A job moves from queued to succeeded and records its result and stage timings"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        queue = _queue(tmp_dir)
+
+        def handler(payload, stages):
+            with stages.stage('extract'):
+                values = {'WBC': payload['wbc']}
+            with stages.stage('save'):
+                pass
+            return {'extracted': len(values)}
+
+        queue.register('lab_upload', handler)
+        job_id = queue.submit('lab_upload', {'wbc': '5.5'}, start_workers=False)
+        assert queue.get(job_id)['status'] == QUEUED
+        assert queue.run_next() == job_id
+        assert queue.run_next() is None
+
+        job = queue.get(job_id)
+        assert job['status'] == SUCCEEDED and job['attempts'] == 1
+        assert job['result'] == {'extracted': 1}
+        assert set(job['timings']) == {'extract', 'save'}
+
+
+def test_retries_then_permanent_failure():
+    """Transient errors are retried up to max_attempts; permanent ones fail at once"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        queue = _queue(tmp_dir, max_attempts=3)
+        calls, finalized = [], []
+
+        def flaky(payload, stages):
+            calls.append(payload)
+            if len(calls) < 3:
+                raise ConnectionError("Supabase unavailable")
+            return 'ok'
+
+        def empty_pdf(payload, stages):
+            raise PermanentJobError("No lab results could be extracted")
+
+        queue.register('flaky', flaky, finalizer=finalized.append)
+        queue.register('empty', empty_pdf, finalizer=finalized.append)
+
+        flaky_id = queue.submit('flaky', {'n': 1}, start_workers=False)
+        queue.run_next()
+        job = queue.get(flaky_id)
+        assert job['status'] == RETRYING and job['error'] == "Supabase unavailable"
+        assert not finalized
+        while queue.run_next():
+            pass
+        job = queue.get(flaky_id)
+        assert job['status'] == SUCCEEDED and job['attempts'] == 3 and job['error'] is None
+        assert finalized == [{'n': 1}]
+
+        empty_id = queue.submit('empty', {'n': 2}, start_workers=False)
+        queue.run_next()
+        job = queue.get(empty_id)
+        assert job['status'] == FAILED and job['attempts'] == 1
+        assert finalized[-1] == {'n': 2}
+
+
+def test_abandoned_jobs_are_reclaimed():
+    """A running job whose lease ran out (its worker died) is picked up again"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        queue = _queue(tmp_dir, lease_timeout=0)
+        queue.register('noop', lambda payload, stages: payload)
+        job_id = queue.submit('noop', {'n': 1}, start_workers=False)
+        claimed = queue._claim()
+        assert queue.get(job_id)['status'] == RUNNING and claimed['attempts'] == 1
+
+        time.sleep(0.01)
+        assert queue.run_next() == job_id
+        job = queue.get(job_id)
+        assert job['status'] == SUCCEEDED and job['attempts'] == 2
+
+
+def test_worker_threads_drain_the_queue():
+    """Submitted jobs are run by the worker pool off the calling thread"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        queue = _queue(tmp_dir, workers=2, poll_interval=0.05)
+        queue.register('square', lambda payload, stages: payload['n'] ** 2)
+        job_ids = [queue.submit('square', {'n': n}) for n in range(6)]
+        try:
+            deadline = time.time() + 10
+            while time.time() < deadline and any(queue.get(j)['status'] != SUCCEEDED for j in job_ids):
+                time.sleep(0.02)
+        finally:
+            queue.stop(timeout=5)
+        assert [queue.get(j)['result'] for j in job_ids] == [n ** 2 for n in range(6)]
+
+
+if __name__ == "__main__":
+    test_job_runs_with_stage_timings()
+    test_retries_then_permanent_failure()
+    test_abandoned_jobs_are_reclaimed()
+    test_worker_threads_drain_the_queue()
+    print("✅ Job queue tests passed")
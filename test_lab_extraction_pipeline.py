@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pdfplumber
+
+from app.utils.lab_extractor import (
+    GENERAL_MATCHERS, PAGE_MATCHERS, lab_patterns, lab_tests, page_patterns,
+    clean_value, extract_reference_range, extract_unit, process_pdf, ANCHOR_LOCATOR, LAB_NAME_LOCATOR, _search,
+    ExtractionContext, LabExtractor, process_page_patterns, process_remaining_labs
+)
+
+SAMPLE_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'labs.pdf')
+
+
+def legacy_process_pages(texts):
+    """Reference implementation: the sequential per-test re.search loop the pipeline replaced."""
+    extracted_data = {}
+    for page_num, text in enumerate(texts, 1):
+        for test, pattern in page_patterns.get(page_num, {}).items():
+            match = re.search(pattern, text)
+            if match:
+                cleaned_value = clean_value(match.group(1), test)
+                if cleaned_value:
+                    extracted_data[test] = {'value': cleaned_value, 'unit': extract_unit(text, test),
+                                            'reference_range': extract_reference_range(text, test)}
+        for test in lab_tests:
+            if test not in extracted_data and test in lab_patterns:
+                match = re.search(lab_patterns[test], text)
+                if match:
+                    cleaned_value = clean_value(match.group(1), test)
+                    if cleaned_value:
+                        extracted_data[test] = {'value': cleaned_value, 'unit': extract_unit(text, test),
+                                                'reference_range': extract_reference_range(text, test)}
+    return extracted_data
+
+
+def test_anchored_search_matches_re_search():
+    """Starting each search at its first anchor finds exactly what re.search finds"""
+    pages = [
+        "Hemoglobin A1c 01 5.4 %\nHemoglobin 01 14.2 g/dL\nFree Testosterone(Direct) 04 12.1 pg/mL",
+        "Testosterone 01 512 ng/dL\nTestosterone, Total, LC/MS A, 04 498.0 ng/dL",
+        "Thyroxine (T4) Free, Direct 01 1.21\nZinc, Plasma or Serum A, 04 88 ug/dL",
+        "MTHFR, DNA Analysis 01 Result: C677T - Not Detected\nA1298C: Detected (Heterozygous)",
+        "No lab names on this page",
+    ]
+    for text in pages:
+        positions = ANCHOR_LOCATOR.positions(text)
+        for matchers in [GENERAL_MATCHERS, *PAGE_MATCHERS.values()]:
+            for matcher in matchers:
+                expected = matcher[1].search(text)
+                actual = _search(matcher, text, positions)
+                assert (actual and actual.span()) == (expected and expected.span()), f"{matcher[0]} differs"
+
+
+def test_lab_name_locator_matches_substring_scan():
+    """One locator scan finds the same tests as checking every name, overlaps and aliases included"""
+    lines = [
+        "Hemoglobin A1c 5.4 % 01",
+        "Testosterone, Free and Total Testosterone",
+        "Thyroxine (T4) Free, Direct 1.2 ng/dL",
+        "Vitamin E(Alpha Tocopherol) 12.1",
+        "No lab names on this line",
+    ]
+    with pdfplumber.open(SAMPLE_PDF) as pdf:
+        lines += [line for page in pdf.pages for line in (page.extract_text() or '').split('\n')]
+
+    for line in lines:
+        expected = [test for test in lab_tests if test in line]
+        found = LAB_NAME_LOCATOR.find(line)
+        assert [test for test in found if test in line] == expected, line
+
+    assert "T4, Free (Direct)" in LAB_NAME_LOCATOR.find("Thyroxine (T4) Free, Direct 1.2")
+    assert "Vitamin E (Alpha Tocopherol)" in LAB_NAME_LOCATOR.find("Vitamin E(Alpha Tocopherol) 12.1")
+
+
+def test_pipeline_matches_sequential_extraction():
+    """Sequential and page-parallel extraction both reproduce the original merge order"""
+    with pdfplumber.open(SAMPLE_PDF) as pdf:
+        texts = [page.extract_text() or '' for page in pdf.pages]
+    expected = legacy_process_pages(texts)
+
+    for parallel in (False, True):
+        results = process_pdf(SAMPLE_PDF, parallel=parallel)
+        assert results == expected
+        assert list(results) == list(expected)
+
+
+def test_concurrent_extractions_do_not_share_state():
+    """Each document gets its own context, so concurrent uploads cannot mix values"""
+    extractor = LabExtractor(parallel=False)
+    expected = extractor.extract(SAMPLE_PDF)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda _: extractor.extract(SAMPLE_PDF), range(8)))
+    assert all(result == expected for result in results)
+
+    male, female = ExtractionContext(), ExtractionContext()
+    process_page_patterns(male, "Sex: Male", 1)
+    process_page_patterns(female, "Sex: Female", 1)
+    for context in (male, female):
+        process_remaining_labs(context, "Estradiol 01 42.0 pg/mL", [], None, 2)
+    assert male.patient_sex == "Male" and "Estradiol" not in male.extracted_values
+    assert female.patient_sex == "Female" and female.extracted_values["Estradiol"] == "42.0"
+
+
+if __name__ == "__main__":
+    test_anchored_search_matches_re_search()
+    test_lab_name_locator_matches_substring_scan()
+    test_pipeline_matches_sequential_extraction()
+    test_concurrent_extractions_do_not_share_state()
+    print("✅ Lab extraction pipeline tests passed")
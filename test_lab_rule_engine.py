@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from lab_rule_engine import BandLookup, LabRuleEngine, lab_rule_engine
+from config.lab_rules import VITAMIN_D_BANDS
+from config.lab_ranges import LabRanges, RangeBand
+
+
+def test_band_lookup_matches_ladder():
+    """The bisect lookup takes the same branch as walking the ladder in order"""
+    bands = [
+        ('>=', 10.0, {'critical': True}),
+        ('>', 5.0, {'high': True}),
+        ('>=', 2.0, {'optimal': True}),
+        ('<=', 1.0, {'low': True}),
+    ]
+    lookup = BandLookup(bands)
+    for value in [-5, 0, 1.0, 1.5, 2.0, 3, 5.0, 5.01, 9.99, 10.0, 250]:
+        expected = next((controls for op, threshold, controls in bands
+                         if (op == '>=' and value >= threshold) or (op == '>' and value > threshold)
+                         or (op == '<=' and value <= threshold)), {})
+        assert lookup.lookup(value) == expected, f"Wrong band for {value}"
+
+
+def test_vitamin_d_bands_are_mutually_exclusive():
+    """Exactly one Vitamin D band is set for every level"""
+    for level, band in [(25, 'D-less-30'), (30, 'D-30-39'), (45, 'D-40-49'), (52, 'D-50-55'),
+                        (57, 'D-55-59'), (60, 'D-60+'), (95, 'D-60+')]:
+        processed, _ = lab_rule_engine.evaluate({'VIT_D25': level}, 'female')
+        assert processed['quick-VitD'] == level
+        assert [name for name in VITAMIN_D_BANDS if processed[name]] == [band]
+        assert processed['D-optimal'] == (level >= 60)
+        assert processed['quick-VitD-row'] == (level < 50)
+
+
+def test_alias_priority_and_parsing():
+    """Primary keys win over display names and unparseable values fall through"""
+    engine = LabRuleEngine()
+    values = engine.resolve({'Vitamin B12': '650', 'VIT_B12': 'pending', 'CBC_WBC': '5.5', 'WBC': 9})
+    assert values['VIT_B12'] == 650.0
+    assert values['CBC_WBC'] == 5.5
+
+
+def test_derived_ratios():
+    """Ratios are only derived when both inputs are present and non-zero"""
+    processed, _ = lab_rule_engine.evaluate({'MIN_CU': 150, 'MIN_ZN': 80, 'LFT_ALB': 4.0, 'LFT_TP': 7.0}, 'male')
+    assert processed['quick-CZratio-14'] == 1.88
+    assert processed['zinc-liposomalC'] is True
+    assert processed['quick-AG-ratio'] == 1.33
+    assert processed['ag-ratio-low'] is True and processed['ag-ratio-very-low'] is False
+
+    processed, _ = lab_rule_engine.evaluate({'MIN_CU': 150, 'MIN_ZN': 0}, 'male')
+    assert 'quick-CZratio-14' not in processed
+
+
+def test_precomputed_derived_values():
+    """Derived values computed once (e.g. at upload) give the same controls as evaluating from the labs"""
+    labs = {'MIN_CU': 150, 'MIN_ZN': 80, 'CHEM_GLU': 90, 'METAB_INS': 6, 'LIPID_TRIG': 120, 'LIPID_HDL': 40}
+    derived = lab_rule_engine.derive(lab_rule_engine.resolve(labs))
+    assert derived == {'TRIG_HDL_RATIO': 3.0, 'CU_ZN_RATIO': 1.88, 'HOMA_IR': 1.33}
+    assert lab_rule_engine.evaluate(labs, 'male', derived=derived) == lab_rule_engine.evaluate(labs, 'male')
+    assert lab_rule_engine.evaluate(labs, 'male', derived={})[0].get('quick-homa-IR') is None
+
+
+def test_gender_specific_hormones():
+    """Hormone rules only apply to the matching gender"""
+    labs = {'Testosterone': 500}
+    assert lab_rule_engine.evaluate(labs, 'male')[0]['quick-testosterone-optimal'] is True
+    assert lab_rule_engine.evaluate(labs, 'female')[0]['quick-testosterone-high'] is True
+    assert 'quick-testosterone' not in lab_rule_engine.evaluate(labs, 'unknown')[0]
+
+
+def test_range_tables_are_shared_and_read_only():
+    """Range tables are built once per gender, share base bands and cannot be modified"""
+    male = LabRanges.get_comprehensive_ranges('male')
+    female = LabRanges.get_comprehensive_ranges('female')
+    assert male is LabRanges.get_comprehensive_ranges('male')
+    assert male['CRP'] is female['CRP']
+    assert male['Testosterone'] is not female['Testosterone']
+    assert 'PSA' not in LabRanges.get_comprehensive_ranges('unknown')
+
+    band = male['VitaminD']
+    assert band['optimal_min'] == 50 and band.get('critical_high') is None
+    for mutate in (lambda: setattr(band, 'high', 1), lambda: male.__setitem__('CRP', band)):
+        try:
+            mutate()
+            assert False, "Range tables should be read-only"
+        except (AttributeError, TypeError):
+            pass
+
+
+def test_range_band_classify():
+    """classify() follows the same first-match ladder as the rule engine"""
+    band = RangeBand({'critical_low': 20, 'low': 30, 'optimal_min': 50, 'optimal_max': 80, 'high': 100})
+    expected = [(10, 'low'), (30, 'low'), (40, None), (50, 'optimal'), (80, 'optimal'),
+                (81, 'above_optimal'), (100, 'high'), (250, 'high')]
+    for value, label in expected:
+        assert band.classify(value) == label, f"Wrong label for {value}"
+
+
+if __name__ == "__main__":
+    test_band_lookup_matches_ladder()
+    test_vitamin_d_bands_are_mutually_exclusive()
+    test_alias_priority_and_parsing()
+    test_derived_ratios()
+    test_precomputed_derived_values()
+    test_gender_specific_hormones()
+    test_range_tables_are_shared_and_read_only()
+    test_range_band_classify()
+    print("✅ Lab rule engine tests passed")
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from pdf_render_pool import ROADMAP_PDF, PDFRenderPool, RenderPoolSaturated
+
+SPEC = {
+    'client_data': {'name': 'Jane Doe', 'gender': 'female', 'labs_date': 'June 02, 2025'},
+    'lab_results': {'VIT_D25': 42.0, 'INFLAM_CRP': 2.1, 'APO1': 'E3/E4'},
+    'hhq_responses': {'hh_gout': False},
+}
+
+
+def test_inline_rendering_records_latency():
+    """With no worker processes jobs render in the caller and are still counted"""
+    pool = PDFRenderPool(workers=0)
+    pdf = pool.render(ROADMAP_PDF, SPEC)
+    assert pdf.startswith(b'%PDF')
+    stats = pool.stats()
+    assert stats['completed'] == 1 and stats['pending'] == 0
+    assert stats['latency_p50'] >= stats['render_mean'] > 0
+
+    try:
+        pool.render('unknown', SPEC)
+        assert False, "unknown kinds are rejected"
+    except ValueError:
+        pass
+
+
+def test_worker_processes_and_backpressure():
+    """Jobs run in worker processes and a full queue is refused with a Retry-After"""
+    pool = PDFRenderPool(workers=1, max_pending=1)
+    try:
+        job = pool.submit(ROADMAP_PDF, SPEC)
+        try:
+            pool.submit(ROADMAP_PDF, SPEC)
+            assert False, "a second job must not queue past max_pending"
+        except RenderPoolSaturated as e:
+            assert e.retry_after >= 1
+        assert job.result(120).startswith(b'%PDF')
+        assert pool.stats()['rejected'] == 1 and pool.stats()['completed'] == 1
+        assert pool.render(ROADMAP_PDF, SPEC).startswith(b'%PDF')
+    finally:
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    test_inline_rendering_records_latency()
+    test_worker_processes_and_backpressure()
+    print("✅ PDF render pool tests passed")
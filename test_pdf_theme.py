@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import tempfile
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image
+from reportlab.lib.units import inch
+
+from config.assets import AssetConfig
+from pdf_theme import PDFTheme, pdf_theme
+from roadmap_generator import RoadmapGenerator
+
+CLIENT = {'name': 'Jane Doe', 'gender': 'female', 'labs_date': 'June 02, 2025'}
+LABS = {'VIT_D25': 42.0, 'INFLAM_CRP': 2.1, 'APO1': 'E3/E4'}
+
+
+def test_styles_are_shared():
+    """Both PDF builders read the same prebuilt style sheet"""
+    generator = RoadmapGenerator()
+    assert generator.pdf_theme is pdf_theme
+    for name in ('AMindTitle', 'SectionHeader', 'AMindBody', 'SupplementHighlight', 'SupplementTitle',
+                 'HHQSectionHeader', 'HHQQuestion', 'HHQAnswer'):
+        assert name in pdf_theme.styles
+    assert pdf_theme.styles['AMindTitle'].fontSize == 18
+
+
+def test_images_are_decoded_once():
+    """Asset images are opened once and reused; missing assets give no flowable"""
+    with tempfile.TemporaryDirectory() as base_path:
+        theme = PDFTheme(AssetConfig(base_path=base_path))
+        assert theme.image('logos', 'main_logo', width=inch, height=inch) is None
+
+        os.makedirs(os.path.join(base_path, 'logos'))
+        Image.new('RGB', (30, 15), 'navy').save(os.path.join(base_path, 'logos', 'main_logo.png'))
+        reader = theme.image_reader('logos', 'main_logo')
+        assert reader is not None and reader.getSize() == (30, 15)
+        assert theme.image_reader('logos', 'main_logo') is reader
+        assert theme.image('logos', 'unknown', width=inch, height=inch) is None
+
+        generator = RoadmapGenerator()
+        generator.pdf_theme = theme
+        pdf = generator.render_visual_pdf(CLIENT, LABS, {})
+        assert pdf.startswith(b'%PDF') and b'/Subtype /Image' in pdf
+
+
+if __name__ == "__main__":
+    test_styles_are_shared()
+    test_images_are_decoded_once()
+    print("✅ PDF theme tests passed")
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+
+import app.utils.supabase_client as supabase_client
+from app.utils.supabase_client import (
+    QuestionCatalogCache, forget_request_memo, invalidate_question_cache, request_memo
+)
+
+flask_app = Flask(__name__)
+
+
+def test_request_memo_is_scoped_to_one_request():
+    """Repeat reads in a request hit the memo; the next request fetches again"""
+    calls = []
+
+    @request_memo('client')
+    def fetch(client_id):
+        calls.append(client_id)
+        return {'id': client_id}
+
+    with flask_app.test_request_context():
+        assert fetch(7) is fetch('7')
+        fetch(8)
+        forget_request_memo('client', 8)
+        fetch(8)
+    assert calls == [7, 8, 8]
+
+    with flask_app.test_request_context():
+        fetch(7)
+    fetch(7)  # no request: calls through
+    assert calls == [7, 8, 8, 7, 7]
+
+
+def test_question_catalog_is_fetched_once():
+    """One questions fetch serves every request until the TTL runs out or it is invalidated"""
+    calls = []
+
+    def load():
+        calls.append(1)
+        return [{'variable_name': 'hh_gout', 'section': 'Family History'}]
+
+    original = (supabase_client._fetch_health_history_questions, supabase_client.question_catalog_cache)
+    supabase_client._fetch_health_history_questions = load
+    supabase_client.question_catalog_cache = QuestionCatalogCache(ttl=60)
+    try:
+        for _ in range(3):
+            with flask_app.test_request_context():
+                for _ in range(4):
+                    assert supabase_client.fetch_health_history_questions()[0]['variable_name'] == 'hh_gout'
+        assert len(calls) == 1
+
+        invalidate_question_cache()
+        with flask_app.test_request_context():
+            supabase_client.fetch_health_history_questions()
+        assert len(calls) == 2
+    finally:
+        supabase_client._fetch_health_history_questions, supabase_client.question_catalog_cache = original
+
+
+def test_failed_catalog_fetch_is_not_cached():
+    """An empty result (the fetch failed) is retried on the next call"""
+    cache = QuestionCatalogCache(ttl=60)
+    assert cache.get(lambda: []) == []
+    assert cache.get(lambda: [{'variable_name': 'hh_gout'}]) == [{'variable_name': 'hh_gout'}]
+    assert cache.stats()['misses'] == 2
+
+
+def test_variable_index_shares_the_cached_catalog():
+    """Known variable names come from the cached catalog and accept form field spellings"""
+    calls = []
+
+    def load():
+        calls.append(1)
+        return [{'variable_name': 'hh-heart-attack'}, {'variable_name': 'hh_gout'}]
+
+    cache = QuestionCatalogCache(ttl=60)
+    cache.get(load)
+    index = cache.variable_index(load)
+    assert index == {'hh-heart-attack': 'hh-heart-attack', 'hh_heart_attack': 'hh-heart-attack', 'hh_gout': 'hh_gout'}
+    assert cache.variable_index(load) is index and len(calls) == 1
+
+    cache.invalidate()
+    assert cache.variable_index(lambda: []) == {}
+    assert cache.variable_index(load) == index and len(calls) == 2
+
+
+if __name__ == "__main__":
+    test_request_memo_is_scoped_to_one_request()
+    test_question_catalog_is_fetched_once()
+    test_failed_catalog_fetch_is_not_cached()
+    test_variable_index_shares_the_cached_catalog()
+    print("✅ Request cache tests passed")
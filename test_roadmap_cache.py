@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import time
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from roadmap_generator import RoadmapGenerator
+from roadmap_cache import RoadmapCache, roadmap_cache_key
+
+CLIENT = {'name': 'Jane Doe', 'gender': 'female', 'labs_date': 'June 02, 2025'}
+LABS = {'VIT_D25': 42.0, 'INFLAM_CRP': 2.1, 'APO1': 'E3/E4'}
+HHQ = {'hh_gout': False, 'hh_alcohol_daily': True}
+
+
+def test_cache_key_is_order_insensitive():
+    """Key order does not change the hash, but any value change does"""
+    key = roadmap_cache_key('roadmap', CLIENT, LABS, HHQ, 'v1')
+    reordered = dict(reversed(list(LABS.items())))
+    assert roadmap_cache_key('roadmap', CLIENT, reordered, HHQ, 'v1') == key
+    assert roadmap_cache_key('roadmap', CLIENT, dict(LABS, VIT_D25=43.0), HHQ, 'v1') != key
+    assert roadmap_cache_key('roadmap', CLIENT, LABS, HHQ, 'v2') != key
+    assert roadmap_cache_key('roadmap', CLIENT, LABS, None, 'v1') == roadmap_cache_key('roadmap', CLIENT, LABS, {}, 'v1')
+
+
+def test_roadmap_hits_and_client_invalidation():
+    """Repeat requests are served from the cache until the client's data is written"""
+    generator = RoadmapGenerator()
+    cache = RoadmapCache()
+
+    first = cache.get_roadmap(generator, 'client-1', CLIENT, LABS, HHQ)
+    assert first == generator.generate_roadmap(CLIENT, LABS, HHQ)
+    assert cache.get_roadmap(generator, 'client-1', CLIENT, LABS, HHQ) is first
+    assert cache.stats()['hits'] == 1
+
+    cache.get_roadmap(generator, 'client-2', CLIENT, dict(LABS, VIT_D25=70.0), HHQ)
+    assert cache.invalidate('client-1') == 1
+    assert cache.stats()['entries'] == 1
+    misses = cache.stats()['misses']
+    assert cache.get_roadmap(generator, 'client-1', CLIENT, LABS, HHQ) == first
+    assert cache.stats()['misses'] == misses + 1
+
+
+def test_misses_update_the_previous_roadmap():
+    """After a client's data changes the roadmap is updated incrementally and matches a full run"""
+    generator = RoadmapGenerator()
+    cache = RoadmapCache()
+    cache.get_roadmap(generator, 'client-1', CLIENT, LABS, HHQ)
+    cache.invalidate('client-1')
+
+    edited = dict(HHQ, hh_gout=True)
+    assert cache.get_roadmap(generator, 'client-1', CLIENT, LABS, edited) == generator.generate_roadmap(CLIENT, LABS, edited)
+    assert cache.stats()['incremental_clients'] == 1
+
+
+def test_lru_and_ttl_eviction():
+    """Least recently used entries are evicted first and expired entries are regenerated"""
+    generator = RoadmapGenerator()
+    cache = RoadmapCache(max_entries=2)
+    panels = [dict(LABS, VIT_D25=float(level)) for level in (20, 45, 65)]
+
+    cache.get_roadmap(generator, 'a', CLIENT, panels[0])
+    cache.get_roadmap(generator, 'b', CLIENT, panels[1])
+    cache.get_roadmap(generator, 'a', CLIENT, panels[0])
+    cache.get_roadmap(generator, 'c', CLIENT, panels[2])
+    misses = cache.stats()['misses']
+    cache.get_roadmap(generator, 'a', CLIENT, panels[0])
+    assert cache.stats()['misses'] == misses
+    cache.get_roadmap(generator, 'b', CLIENT, panels[1])
+    assert cache.stats()['misses'] == misses + 1
+
+    cache = RoadmapCache(ttl=0.01)
+    cache.get_roadmap(generator, 'a', CLIENT, LABS)
+    time.sleep(0.02)
+    cache.get_roadmap(generator, 'a', CLIENT, LABS)
+    assert cache.stats()['hits'] == 0
+
+
+def test_pdf_tier_reuses_files(tmp_path):
+    """Rendered PDFs are kept on disk and removed when the client is invalidated"""
+    generator = RoadmapGenerator()
+    cache = RoadmapCache(pdf_dir=str(tmp_path))
+
+    pdf_path = cache.get_visual_pdf(generator, 'client-1', CLIENT, LABS, HHQ)
+    assert os.path.dirname(pdf_path) == str(tmp_path)
+    mtime = os.stat(pdf_path).st_mtime_ns
+    assert cache.get_visual_pdf(generator, 'client-1', CLIENT, LABS, HHQ) == pdf_path
+    assert os.stat(pdf_path).st_mtime_ns == mtime
+    assert os.listdir(tmp_path) == [os.path.basename(pdf_path)]
+
+    cache.invalidate('client-1')
+    assert not os.path.exists(pdf_path)
+
+
+def test_pdf_bytes_in_memory_and_byte_budget(tmp_path):
+    """PDFs are rendered in memory with a stable ETag, and the disk tier stays within its byte budget"""
+    generator = RoadmapGenerator()
+    pdf, etag = RoadmapCache().get_visual_pdf_bytes(generator, 'client-1', CLIENT, LABS, HHQ)
+    assert pdf.startswith(b'%PDF')
+    assert etag == roadmap_cache_key('visual_pdf', CLIENT, LABS, HHQ, generator.compiled_template.version)
+    # Known before rendering, so revalidations can be answered without a render
+    assert RoadmapCache().visual_pdf_etag(generator, CLIENT, LABS, HHQ) == etag
+
+    cache = RoadmapCache(pdf_dir=str(tmp_path), max_pdf_bytes=len(pdf) + len(pdf) // 2)
+    first, first_etag = cache.get_visual_pdf_bytes(generator, 'a', CLIENT, LABS, HHQ)
+    assert first_etag == etag
+    assert cache.get_visual_pdf_bytes(generator, 'a', CLIENT, LABS, HHQ) == (first, etag)
+    assert cache.stats()['hits'] == 1 and cache.stats()['pdf_bytes'] == len(first)
+
+    cache.get_visual_pdf_bytes(generator, 'b', CLIENT, dict(LABS, VIT_D25=70.0), HHQ)
+    assert len(os.listdir(tmp_path)) == 1
+    assert cache.stats()['pdf_bytes'] <= cache.max_pdf_bytes
+
+
+if __name__ == "__main__":
+    import tempfile
+    test_cache_key_is_order_insensitive()
+    test_roadmap_hits_and_client_invalidation()
+    test_misses_update_the_previous_roadmap()
+    test_lru_and_ttl_eviction()
+    with tempfile.TemporaryDirectory() as pdf_dir:
+        from pathlib import Path
+        test_pdf_tier_reuses_files(Path(pdf_dir))
+    with tempfile.TemporaryDirectory() as pdf_dir:
+        test_pdf_bytes_in_memory_and_byte_budget(Path(pdf_dir))
+    print("✅ Roadmap cache tests passed")
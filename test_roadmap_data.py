@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import time
+
+import httpx
+from postgrest import SyncPostgrestClient
+from postgrest.utils import SyncClient
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import app.utils.supabase_client as supabase_client
+from app.routes.roadmap import _generate_key_findings
+from app.utils.lab_mapping import get_all_mapped_results
+from app.utils.lab_panel import LabPanel
+from app.utils.roadmap_data import RoadmapDataLoader
+
+
+def test_lab_panel():
+    """Stored Armgasys variables win, known lab names fall back to the mapping, values are parsed once"""
+    labs = LabPanel.from_rows([
+        {'original_test_name': 'Vitamin D, 25-Hydroxy', 'original_value': '42.5', 'armgasys_variable_name': 'vit_d25'},
+        {'original_test_name': 'Homocyst(e)ine', 'original_value': '9', 'armgasys_variable_name': ''},
+        {'original_test_name': 'APO E Genotyping Result', 'original_value': 'E3/E4', 'armgasys_variable_name': None},
+        {'original_test_name': 'Unmapped Test', 'original_value': '-1.5'},
+        {'original_test_name': 'Insulin', 'original_value': '<2.0'},
+    ])
+    assert dict(labs) == {'VIT_D25': 42.5, 'INFLAM_HOMOCYS': 9.0, 'APO1': 'E3/E4', 'UNMAPPED TEST': -1.5,
+                          'METAB_INS': '<2.0'}
+    assert labs.numeric_mask == [True, True, False, True, False]
+    assert labs.number('VIT_D25') == 42.5 and labs.number('APO1') is None and labs.number('TSH', 0) == 0
+    assert labs.text('APO1') == 'E3/E4' and labs.text('VIT_D25') is None
+    assert labs.get('TSH', 0) == 0 and 'APO1' in labs and len(labs) == 5
+    assert labs.test_name('INFLAM_HOMOCYS') == 'Homocyst(e)ine'
+
+    # A later result for the same variable replaces the earlier one, text or number
+    labs.set('APO1', '3.5')
+    assert labs['APO1'] == 3.5 and labs.text('APO1') is None
+
+    assert dict(LabPanel.from_results([{'test_name': 'TSH', 'value': '1.2', 'armgasys_variable': ''}])) == {'THY_TSH': 1.2}
+
+
+def test_lab_panel_snapshot():
+    """Stored snapshots round-trip with their derived ratios and older formats are ignored"""
+    panel = LabPanel.from_rows([
+        {'original_test_name': 'Insulin', 'original_value': '10', 'armgasys_variable_name': 'METAB_INS'},
+        {'original_test_name': 'Glucose', 'original_value': '99', 'armgasys_variable_name': 'CHEM_GLU'},
+        {'original_test_name': 'APO E Genotyping Result', 'original_value': 'E3/E4', 'armgasys_variable_name': 'APO1'},
+    ])
+    snapshot = panel.to_snapshot()
+    assert snapshot['lab_values'] == {'METAB_INS': 10.0, 'CHEM_GLU': 99.0, 'APO1': 'E3/E4'}
+    assert snapshot['derived']['HOMA_IR'] == round(10 * 99 / 405, 2)
+
+    restored = LabPanel.from_snapshot(snapshot)
+    assert dict(restored) == dict(panel) and restored.derived == snapshot['derived']
+    assert restored.test_name('APO1') == 'APO E Genotyping Result'
+    assert LabPanel.from_snapshot(dict(snapshot, panel_version=0)) is None
+
+    restored.merge(LabPanel.from_rows([{'original_test_name': 'Insulin', 'original_value': '20', 'armgasys_variable_name': 'METAB_INS'}]))
+    assert restored.derived is None and restored.number('METAB_INS') == 20.0
+    assert restored.to_snapshot()['derived']['HOMA_IR'] == round(20 * 99 / 405, 2)
+
+
+def test_lab_panel_combines_every_upload():
+    """Every snapshot counts, newer draws win, and legacy rows fill in labs no snapshot has"""
+    genotype = LabPanel.from_rows([
+        {'original_test_name': 'APO E Genotyping Result', 'original_value': 'E3/E4', 'armgasys_variable_name': 'APO1'},
+        {'original_test_name': 'Insulin', 'original_value': '10', 'armgasys_variable_name': 'METAB_INS'},
+    ]).to_snapshot()
+    latest = LabPanel.from_rows([
+        {'original_test_name': 'Insulin', 'original_value': '6', 'armgasys_variable_name': 'METAB_INS'},
+        {'original_test_name': 'Glucose', 'original_value': '90', 'armgasys_variable_name': 'CHEM_GLU'},
+    ]).to_snapshot()
+    legacy_rows = [
+        {'original_test_name': 'Vitamin D, 25-Hydroxy', 'original_value': '30', 'armgasys_variable_name': 'VIT_D25'},
+        {'original_test_name': 'Insulin', 'original_value': '25', 'armgasys_variable_name': 'METAB_INS'},
+    ]
+
+    labs = LabPanel.combine([genotype, latest], legacy_rows)
+    assert dict(labs) == {'VIT_D25': 30.0, 'APO1': 'E3/E4', 'METAB_INS': 6.0, 'CHEM_GLU': 90.0}
+    assert labs.test_name('APO1') == 'APO E Genotyping Result'
+    assert labs.to_snapshot()['derived']['HOMA_IR'] == round(6 * 90 / 405, 2)
+
+    # A single snapshot covering every row keeps its stored derived values
+    single = LabPanel.combine([latest], legacy_rows[1:])
+    assert single.derived == latest['derived']
+    assert dict(LabPanel.combine([], legacy_rows)) == {'VIT_D25': 30.0, 'METAB_INS': 25.0}
+
+
+def test_key_findings_from_mapped_uploads():
+    """Findings match the report's test names, whatever variable the upload was mapped to"""
+    rows = get_all_mapped_results({'Vitamin D, 25-Hydroxy': {'value': '22'}, 'Homocyst(e)ine': {'value': '11.2'},
+                                   'TSH': {'value': '1.5'}}, 'female')
+    findings = _generate_key_findings(LabPanel.from_rows(rows))
+    assert [finding['finding'] for finding in findings] == ['Vitamin D, 25-Hydroxy: 22', 'Homocyst(e)ine: 11.2']
+    assert [finding['priority'] for finding in findings] == ['high', 'medium']
+    assert _generate_key_findings(LabPanel.from_rows(get_all_mapped_results({'Vitamin D, 25-Hydroxy': '45'}))) == []
+
+
+def test_newest_upload_wins_whatever_the_row_ids():
+    """lab_results rows are read oldest upload first; their random UUIDs say nothing about age"""
+    client_id = 'aaaa1111-0000-4000-8000-000000000001'
+    rows = [
+        {'client_id': client_id, 'id': 'ffffffff-0000-4000-8000-000000000000', 'uploaded_at': '2025-01-10T09:00:00',
+         'original_test_name': 'Vitamin D, 25-Hydroxy', 'original_value': '25', 'armgasys_variable_name': 'VIT_D25'},
+        {'client_id': client_id, 'id': '00000000-0000-4000-8000-000000000000', 'uploaded_at': '2025-06-02T09:00:00',
+         'original_test_name': 'Vitamin D, 25-Hydroxy', 'original_value': '48', 'armgasys_variable_name': 'VIT_D25'},
+    ]
+
+    def handler(request):
+        if not request.url.path.endswith('/lab_results'):
+            return httpx.Response(200, json=[])
+        columns = request.url.params['order'].split(',')
+        return httpx.Response(200, json=sorted(rows, key=lambda row: [row[column] for column in columns]))
+
+    class MockPool(supabase_client.SupabaseClientPool):
+        def _create(self):
+            # Only the PostgREST part of a Supabase client is used by these reads
+            client = SyncPostgrestClient('http://supabase.test/rest/v1')
+            client.session = SyncClient(base_url='http://supabase.test/rest/v1', transport=httpx.MockTransport(handler))
+            return client
+
+    originals = supabase_client.rest_http, supabase_client.supabase_pool
+    supabase_client.rest_http = httpx.Client(base_url='http://supabase.test/rest/v1', transport=httpx.MockTransport(handler))
+    supabase_client.supabase_pool = MockPool()
+    try:
+        assert supabase_client.fetch_lab_panel_for_client(client_id).number('VIT_D25') == 48.0
+        assert supabase_client.fetch_lab_panels_for_clients([client_id])[client_id].number('VIT_D25') == 48.0
+    finally:
+        supabase_client.rest_http, supabase_client.supabase_pool = originals
+
+
+def test_loader_fetches_concurrently():
+    """The three reads overlap and every fetch is timed"""
+    def slow(result):
+        def fetch(client_id):
+            time.sleep(0.2)
+            return result
+        return fetch
+
+    class Loader(RoadmapDataLoader):
+        FETCHES = {
+            'client': slow({'id': 7, 'first_name': 'Jane', 'last_name': 'Doe', 'sex': 'female'}),
+            'labs': slow(LabPanel.from_results([{'test_name': 'Insulin', 'value': '6.1'}])),
+            'hhq_responses': slow(None),
+        }
+
+    data = Loader().load(7)
+    assert data.timings['total'] < 0.5
+    assert all(data.timings[name] >= 0.2 for name in Loader.FETCHES)
+    assert data.hhq_responses == {}
+    assert dict(data.labs) == {'METAB_INS': 6.1}
+    assert data.client_data(labs_date='Recent') == {'name': 'Jane Doe', 'gender': 'female', 'dob': None, 'labs_date': 'Recent'}
+
+
+if __name__ == "__main__":
+    test_lab_panel()
+    test_lab_panel_snapshot()
+    test_lab_panel_combines_every_upload()
+    test_key_findings_from_mapped_uploads()
+    test_newest_upload_wins_whatever_the_row_ids()
+    test_loader_fetches_concurrently()
+    print("✅ Roadmap data loader tests passed")
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from roadmap_generator import RoadmapGenerator
+from roadmap_incremental import ALL, IncrementalRoadmap, TracingMapping, changed_keys
+
+CLIENT = {'name': 'Jane Doe', 'gender': 'female', 'labs_date': 'June 02, 2025'}
+LABS = {'VIT_D25': 42.0, 'INFLAM_CRP': 2.1, 'APO1': 'E3/E4', 'INFLAM_HOMOCYS': 12.0, 'VIT_B12': 400.0}
+HHQ = {'hh_gout': False, 'hh_snores': True}
+
+
+def test_tracing_records_reads():
+    """Lookups record their keys, including missing ones, and iteration records ALL"""
+    reads = set()
+    view = TracingMapping({'VIT_D25': 42.0}, reads)
+    assert view.get('VIT_D25') == 42.0 and view.get('MIN_ZN') is None and 'APO1' not in view
+    assert reads == {'VIT_D25', 'MIN_ZN', 'APO1'}
+    list(view.items())
+    assert ALL in reads
+    assert changed_keys({'a': 1, 'b': 2}, {'a': 1, 'b': 3, 'c': 4}) == {'b', 'c'}
+
+
+def test_updates_match_full_generation():
+    """Each incremental update equals a full run, and unrelated stages are not re-run"""
+    generator = RoadmapGenerator()
+    roadmap = IncrementalRoadmap(generator)
+    assert roadmap.generate(CLIENT, LABS, HHQ) == generator.generate_roadmap(CLIENT, LABS, HHQ)
+    assert roadmap.last_stats['full']
+    assert 'VIT_D25' in roadmap.dependencies()['lab_values']['labs'] or ALL in roadmap.dependencies()['lab_values']['labs']
+
+    edits = [
+        (LABS, dict(HHQ, hh_gout=True)),
+        (dict(LABS, VIT_D25=70.0), HHQ),
+        (dict(LABS, MIN_ZN=90.0), dict(HHQ, hh_breast_cancer=True)),
+        ({key: value for key, value in LABS.items() if key != 'APO1'}, HHQ),
+    ]
+    for labs, hhq in edits:
+        assert roadmap.update(CLIENT, labs, hhq) == generator.generate_roadmap(CLIENT, labs, hhq)
+        assert not roadmap.last_stats['full']
+
+    roadmap.update(CLIENT, LABS, HHQ)
+    roadmap.update(CLIENT, LABS, dict(HHQ, hh_gout=True))
+    assert 'genetics' not in roadmap.last_stats['stages_recomputed']
+    assert roadmap.update(CLIENT, LABS, dict(HHQ, hh_gout=True)) == generator.generate_roadmap(CLIENT, LABS, dict(HHQ, hh_gout=True))
+    assert roadmap.last_stats['stages_recomputed'] == [] and roadmap.last_stats['blocks_rerendered'] == 0
+
+    male = dict(CLIENT, gender='male')
+    assert roadmap.update(male, LABS, HHQ) == generator.generate_roadmap(male, LABS, HHQ)
+    assert roadmap.last_stats['full']
+
+
+if __name__ == "__main__":
+    test_tracing_records_reads()
+    test_updates_match_full_generation()
+    print("✅ Incremental roadmap tests passed")
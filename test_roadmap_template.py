@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import re
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from roadmap_generator import RoadmapGenerator
+from roadmap_template import CompiledTemplate, TemplateRegistry
+from test_roadmap_comparison import RoadmapTester
+
+
+def legacy_apply_content_controls(roadmap, processed_content):
+    """Reference implementation: the per-control regex passes the compiled engine replaced."""
+    if 'MTHFR_C677T' in processed_content and 'MTHFR_A1298C' in processed_content:
+        roadmap = roadmap.replace('{{MTHFR_C677T}}', 'C677T')
+        roadmap = roadmap.replace('{{MTHFR_A1298C}}', 'A1298C')
+
+    for control_name, control_value in processed_content.items():
+        if control_name in ['MTHFR_C677T', 'MTHFR_A1298C']:
+            continue
+        escaped = re.escape(control_name)
+        block_pattern = f"{{{{#{escaped}}}}}(.*?){{{{/{escaped}}}}}"
+        inverted_block_pattern = f"{{{{\\^{escaped}}}}}(.*?){{{{/{escaped}}}}}"
+        if isinstance(control_value, bool):
+            if control_value:
+                roadmap = re.sub(block_pattern, lambda m: m.group(1), roadmap, flags=re.DOTALL)
+                roadmap = re.sub(inverted_block_pattern, "", roadmap, flags=re.DOTALL)
+            else:
+                roadmap = re.sub(block_pattern, "", roadmap, flags=re.DOTALL)
+                roadmap = re.sub(inverted_block_pattern, lambda m: m.group(1), roadmap, flags=re.DOTALL)
+        placeholder = f"{{{{{control_name}}}}}"
+        if isinstance(control_value, (str, int, float)):
+            roadmap = roadmap.replace(placeholder, str(control_value))
+        else:
+            roadmap = roadmap.replace(placeholder, str(control_value) if control_value else "")
+    return roadmap
+
+
+def test_compiled_template_matches_legacy_engine():
+    """Compiled rendering is byte-identical to the regex engine for the sample clients"""
+    generator = RoadmapGenerator()
+    tester = RoadmapTester()
+    lab_data = tester.create_comprehensive_lab_data()
+    hhq_data = tester.create_comprehensive_hhq_data()
+
+    for name, gender, age in [("John Smith", "male", 45), ("Jane Doe", "female", 38)]:
+        client_data = tester.create_sample_client_data(name, gender, age)
+        processed = generator._process_all_content_controls(client_data, lab_data, hhq_data)
+
+        expected = legacy_apply_content_controls(generator.template_content, processed)
+        actual = generator._apply_content_controls_to_template(generator.template_content, processed)
+        assert actual == expected, f"Compiled template output differs for {name}"
+
+    assert generator.compiled_template.warnings == []
+
+
+def test_sections_and_placeholders():
+    """Boolean controls toggle blocks, other values only fill placeholders"""
+    template = CompiledTemplate("A{{#on}}1{{/on}}{{^on}}2{{/on}}B{{#off}}3{{/off}}{{^off}}4{{/off}}C{{value}}{{missing}}")
+    assert template.render({'on': True, 'off': False, 'value': 7}) == "A1B4C7{{missing}}"
+
+    # Non-boolean and unknown controls leave block markers for placeholder cleanup
+    template = CompiledTemplate("{{#text}}kept{{/text}}|{{#unknown}}kept{{/unknown}}|{{text}}")
+    assert template.render({'text': 'hello'}) == "{{#text}}kept{{/text}}|{{#unknown}}kept{{/unknown}}|hello"
+
+
+def test_unpaired_tags_stay_literal():
+    """Stray openers inside a block close at the nearest closer, like the regex engine"""
+    source = "{{#kidney}}one {{#kidney}}\n{{/kidney}} tail {{#stray}}"
+    template = CompiledTemplate(source)
+    for value in (True, False):
+        controls = {'kidney': value, 'stray': True}
+        assert template.render(controls) == legacy_apply_content_controls(source, controls)
+
+
+def test_mthfr_placeholders():
+    """MTHFR placeholders become variant names only when both genotypes were processed"""
+    template = CompiledTemplate("{{MTHFR_C677T}}/{{MTHFR_A1298C}}")
+    assert template.render({'MTHFR_C677T': 'Heterozygous', 'MTHFR_A1298C': 'Not Detected'}) == "C677T/A1298C"
+    assert template.render({'MTHFR_C677T': 'Heterozygous'}) == "{{MTHFR_C677T}}/{{MTHFR_A1298C}}"
+
+
+def test_template_registry_reloads_only_on_change(tmp_path):
+    """Templates are served from the registry until the file's mtime or size changes"""
+    template_file = tmp_path / "roadmap.txt"
+    template_file.write_text("Hello {{firstname}} \u2019", encoding='utf-8')
+    registry = TemplateRegistry(check_interval=0)
+
+    first = registry.get(str(template_file))
+    assert first.source == "Hello {{firstname}} '"
+    assert registry.get(str(template_file)) is first
+    assert registry.stats() == {'hits': 1, 'misses': 1, 'entries': 1}
+
+    template_file.write_text("Changed {{firstname}}", encoding='utf-8')
+    os.utime(template_file, ns=(0, 10**9))
+    reloaded = registry.get(str(template_file))
+    assert reloaded is not first
+    assert reloaded.source == "Changed {{firstname}}"
+    assert registry.stats()['misses'] == 2
+
+
+def test_generators_share_compiled_template():
+    """Every RoadmapGenerator in the process reuses the same compiled template"""
+    assert RoadmapGenerator().compiled_template is RoadmapGenerator().compiled_template
+
+
+if __name__ == "__main__":
+    test_compiled_template_matches_legacy_engine()
+    test_sections_and_placeholders()
+    test_unpaired_tags_stay_literal()
+    test_mthfr_placeholders()
+    test_generators_share_compiled_template()
+    print("✅ Compiled roadmap template tests passed")
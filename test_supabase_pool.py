@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+import threading
+import time
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+
+import app.utils.supabase_client as supabase_client
+from app.routes.client_images import client_images_bp
+from app.utils.supabase_client import SupabaseClientPool
+
+
+class FakeQuery:
+    """Chainable stand-in for a PostgREST query that returns no rows"""
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        return type('Result', (), {'data': []})()
+
+
+class FakeClient:
+    def table(self, name):
+        return FakeQuery()
+
+
+class FakePool(SupabaseClientPool):
+    """Pool of plain objects, so the pooling logic runs without a Supabase project"""
+
+    def __init__(self, healthy=True, **kwargs):
+        super().__init__(**kwargs)
+        self.healthy = healthy
+        self.created = []
+
+    def _create(self):
+        client = FakeClient()
+        self.created.append(client)
+        return client
+
+    def _healthy(self, client):
+        with self._available:
+            self._metrics['health_checks'] += 1
+        return self.healthy
+
+
+def test_clients_are_reused_without_health_checks():
+    """Recently returned clients are handed out again without a probe query"""
+    pool = FakePool(max_size=2, idle_check_after=60)
+    client = pool.acquire()
+    pool.release(client)
+    assert pool.acquire() is client
+    stats = pool.stats()
+    assert stats['created'] == 1 and stats['reused'] == 1 and stats['health_checks'] == 0
+
+
+def test_pool_is_bounded_and_waits():
+    """Borrowers wait for a returned client and time out when none comes back"""
+    pool = FakePool(max_size=1, timeout=0.2)
+    client = pool.acquire()
+    try:
+        pool.acquire()
+        assert False, "Pool should not grow beyond max_size"
+    except TimeoutError:
+        pass
+
+    threading.Timer(0.05, pool.release, [client]).start()
+    assert pool.acquire() is client
+    stats = pool.stats()
+    assert stats['size'] == 1 and stats['timeouts'] == 1 and stats['waited'] >= 1
+    assert stats['wait_time_max'] >= 0.04
+
+
+def test_idle_clients_are_checked_and_replaced():
+    """Only clients idle past the threshold are probed; failed ones are replaced"""
+    pool = FakePool(healthy=False, max_size=2, idle_check_after=0.01)
+    stale = pool.acquire()
+    pool.release(stale)
+    time.sleep(0.03)
+    fresh = pool.acquire()
+    assert fresh is not stale
+    stats = pool.stats()
+    assert stats['health_checks'] == 1 and stats['discarded'] == 1 and stats['size'] == 1
+
+
+def test_routes_return_their_clients():
+    """Listing a client's images over and over never drains the bounded pool"""
+    pool = FakePool(max_size=2, timeout=0.2)
+    original = supabase_client.supabase_pool
+    supabase_client.supabase_pool = pool
+    try:
+        app = Flask(__name__)
+        app.register_blueprint(client_images_bp)
+        with app.test_client() as http:
+            for _ in range(10):
+                response = http.get('/clients/client-1/images')
+                assert response.status_code == 200 and response.get_json()['success']
+        stats = pool.stats()
+        assert stats['timeouts'] == 0 and stats['created'] == 1 and stats['acquired'] == 10
+    finally:
+        supabase_client.supabase_pool = original
+
+
+if __name__ == "__main__":
+    test_clients_are_reused_without_health_checks()
+    test_pool_is_bounded_and_waits()
+    test_idle_clients_are_checked_and_replaced()
+    test_routes_return_their_clients()
+    print("✅ Supabase pool tests passed")